@@ -0,0 +1,89 @@
+"""
+bench_dist.py — Confronta dimensioni e tempi di parsing tra sorgenti JSON e build di distribuzione.
+
+Uso:
+    python scripts/build_dist.py --compress zstd
+    python scripts/bench_dist.py [--dist dist] [--repeat 5]
+
+Per ogni modalità misura i byte letti da disco e il tempo medio per caricare
+tutto il corpus (lettura + decompressione + json). Riporta anche lo streaming
+con `iter_questions`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from quiz_corpus import ROOT
+from quiz_dist import DistReader
+
+DEFAULT_DIST = "dist"
+DEFAULT_REPEAT = 5
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark della build di distribuzione contro i JSON sorgente.")
+    parser.add_argument("--dist", default=DEFAULT_DIST, help=f"Cartella della build (default: {DEFAULT_DIST})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"Ripetizioni per misura, si usa la mediana (default: {DEFAULT_REPEAT})")
+    args = parser.parse_args(argv)
+
+    dist_dir = Path(args.dist)
+    if not dist_dir.is_absolute():
+        dist_dir = ROOT / dist_dir
+    reader = DistReader(dist_dir)
+    entries = reader.files()
+    sources = [ROOT / e["source"] for e in entries]
+
+    def load_raw() -> int:
+        n = 0
+        for path in sources:
+            with open(path, encoding="utf-8") as f:
+                n += len(json.load(f))
+        return n
+
+    def load_dist() -> int:
+        return sum(len(reader.load(e["path"])) for e in entries)
+
+    def stream_dist() -> int:
+        return sum(1 for e in entries for _ in reader.iter_questions(e["path"]))
+
+    assert load_raw() == load_dist() == stream_dist(), "Numero di domande diverso tra sorgenti e build"
+
+    totals = reader.manifest["totals"]
+    dict_bytes = (reader.manifest.get("dictionary") or {}).get("bytes", 0)
+    rows = [
+        ("sorgenti (indent=2)", totals["raw_bytes"], timed(load_raw, args.repeat)),
+        (f"build {reader.compression} load()", totals["bytes"] + dict_bytes, timed(load_dist, args.repeat)),
+        (f"build {reader.compression} iter_questions()", totals["bytes"] + dict_bytes, timed(stream_dist, args.repeat)),
+    ]
+
+    base_bytes, base_time = rows[0][1], rows[0][2]
+    print(f"\n📊 {totals['files']} file, {totals['questions']} domande (mediana su {args.repeat} run)\n")
+    print(f"| {'Modalità':<40} | {'Byte':>10} | {'vs sorgenti':>11} | {'Parse (ms)':>10} | {'vs sorgenti':>11} |")
+    print(f"|{'-' * 42}|{'-' * 12}|{'-' * 13}|{'-' * 12}|{'-' * 13}|")
+    for label, size, elapsed in rows:
+        print(
+            f"| {label:<40} | {size:>10} | {size / base_bytes:>10.2f}x | "
+            f"{elapsed * 1000:>10.2f} | {elapsed / base_time:>10.2f}x |"
+        )
+    print(f"\nℹ️  JSON minificato senza compressione: {totals['minified_bytes']} byte "
+          f"({totals['minified_bytes'] / base_bytes:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
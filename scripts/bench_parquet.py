@@ -0,0 +1,153 @@
+"""
+bench_parquet.py — Confronta l'export Parquet con la lettura diretta dei JSON del corpus.
+
+Uso:
+    python scripts/bench_parquet.py [--copies 20] [--repeat 5]
+
+Crea in una cartella temporanea un corpus di `--copies` copie di `quizzes/` (con università
+rinominate, così i gruppi restano distinti) e misura:
+- tempo dell'export completo e di un export incrementale dopo la modifica di un file;
+- tempo di tre query tipiche (distribuzione di correctIndex per sorgente, copertura
+  explanation/hint per facoltà, testi duplicati) leggendo i JSON oppure le tabelle Parquet.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import statistics
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import export_parquet
+from quiz_corpus import QUIZZES_DIR, iter_json_files, load_json_list, normalize_text, path_parts, rel_path
+
+DEFAULT_COPIES = 20
+DEFAULT_REPEAT = 5
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def make_corpus(dest: Path, copies: int) -> Path:
+    quizzes = dest / "quizzes"
+    for path in iter_json_files(QUIZZES_DIR):
+        rel = rel_path(path, QUIZZES_DIR)
+        university, rest = rel.split("/", 1)
+        for k in range(copies):
+            target = quizzes / f"{university}-{k}" / rest
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(path, target)
+    return quizzes
+
+
+def json_queries(quizzes: Path) -> dict:
+    def iter_questions():
+        for path in iter_json_files(quizzes):
+            rel = rel_path(path, quizzes)
+            parts = path_parts(rel)
+            for q in load_json_list(path) or []:
+                yield parts, q
+
+    def answer_bias():
+        return Counter((parts["source_dir"], q.get("correctIndex")) for parts, q in iter_questions())
+
+    def coverage():
+        totals, complete = Counter(), Counter()
+        for parts, q in iter_questions():
+            key = (parts["university"], parts["faculty"])
+            totals[key] += 1
+            if str(q.get("explanation", "")).strip() and str(q.get("hint", "")).strip():
+                complete[key] += 1
+        return totals, complete
+
+    def duplicates():
+        counts = Counter(normalize_text(q.get("question", "")) for _, q in iter_questions())
+        return sum(1 for n in counts.values() if n > 1)
+
+    return {"answer_bias": answer_bias, "coverage": coverage, "duplicates": duplicates}
+
+
+def parquet_queries(out_dir: Path) -> dict:
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    def questions(columns):
+        return pq.read_table(out_dir / "questions.parquet", columns=columns)
+
+    def answer_bias():
+        t = questions(["source_dir", "correct_index"])
+        return t.group_by(["source_dir", "correct_index"]).aggregate([([], "count_all")])
+
+    def coverage():
+        t = questions(["university", "faculty", "explanation", "hint"])
+        complete = pc.and_(pc.greater(pc.utf8_length(pc.utf8_trim_whitespace(t["explanation"])), 0),
+                           pc.greater(pc.utf8_length(pc.utf8_trim_whitespace(t["hint"])), 0))
+        t = t.select(["university", "faculty"]).append_column("complete", complete)
+        return t.group_by(["university", "faculty"]).aggregate([([], "count_all"), ("complete", "sum")])
+
+    def duplicates():
+        t = questions(["question"])
+        normalized = pc.utf8_lower(pc.utf8_trim_whitespace(pc.replace_substring_regex(t["question"], r"\s+", " ")))
+        counts = pc.value_counts(normalized)
+        return pc.sum(pc.greater(counts.field("counts"), 1)).as_py()
+
+    return {"answer_bias": answer_bias, "coverage": coverage, "duplicates": duplicates}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark export Parquet contro lettura dei JSON.")
+    parser.add_argument("--copies", type=int, default=DEFAULT_COPIES,
+                        help=f"Copie del corpus nel dataset di prova (default: {DEFAULT_COPIES})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"Ripetizioni per misura, si usa la mediana (default: {DEFAULT_REPEAT})")
+    args = parser.parse_args(argv)
+    export_parquet.require_pyarrow()
+
+    tmp = Path(tempfile.mkdtemp(prefix="quiz-parquet-"))
+    try:
+        quizzes = make_corpus(tmp, args.copies)
+        out_dir = tmp / "parquet"
+        sources = (("quiz", quizzes),)
+
+        start = time.perf_counter()
+        stats = export_parquet.export(out_dir, sources=sources, base_dir=tmp)
+        full_time = time.perf_counter() - start
+
+        first = next(iter_json_files(quizzes))
+        data = load_json_list(first)
+        data[0]["hint"] = str(data[0].get("hint", "")) + " "
+        first.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        start = time.perf_counter()
+        incremental = export_parquet.export(out_dir, sources=sources, base_dir=tmp)
+        incremental_time = time.perf_counter() - start
+
+        json_bytes = sum(p.stat().st_size for p in iter_json_files(quizzes))
+        parquet_bytes = sum(p.stat().st_size for p in out_dir.rglob("*.parquet"))
+        print(f"\n📚 {stats['files']} file, {stats['questions']} domande "
+              f"(JSON {json_bytes / 2**20:.1f} MB, Parquet {parquet_bytes / 2**20:.1f} MB)")
+        print(f"📦 Export completo: {full_time:.2f}s | incrementale ({incremental['written']} file): {incremental_time:.2f}s\n")
+
+        jq, pq_ = json_queries(quizzes), parquet_queries(out_dir)
+        print(f"| {'Query':<12} | {'JSON (ms)':>10} | {'Parquet (ms)':>12} | {'Speedup':>7} |")
+        print(f"|{'-' * 14}|{'-' * 12}|{'-' * 14}|{'-' * 9}|")
+        for name in jq:
+            t_json = timed(jq[name], args.repeat) * 1000
+            t_parquet = timed(pq_[name], args.repeat) * 1000
+            print(f"| {name:<12} | {t_json:>10.1f} | {t_parquet:>12.1f} | {t_json / t_parquet:>6.1f}x |")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+"""
+bench_server.py — Load test di `serve_quizzes.py`: richieste/secondo e latenze p50/p99.
+
+Uso:
+    python scripts/bench_server.py [--workers 1 4] [--clients 8] [--duration 10]
+
+Per ogni valore di `--workers` avvia il servizio su una porta libera, genera traffico
+misto (liste, pagine di domande, domande per ID, esami con seed; una parte con
+`If-None-Match`) da `--clients` processi con connessioni keep-alive e riporta throughput
+sostenuto e percentili di latenza.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+
+from quiz_corpus import ROOT
+
+DEFAULT_WORKERS = [1, 4]
+DEFAULT_CLIENTS = 8
+DEFAULT_DURATION = 10.0
+DEFAULT_CONDITIONAL = 0.3
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port: int, timeout: float = 30.0) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/health")
+            return json.loads(conn.getresponse().read())
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("Il servizio non risponde")
+
+
+def build_paths(port: int) -> list[str]:
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", "/v1/courses?kind=quiz")
+    courses = json.loads(conn.getresponse().read())
+    paths = ["/v1/universities", "/v1/faculties", "/v1/courses"]
+    for c in courses:
+        course = quote(c["course"])
+        paths.append(f"/v1/questions?course={course}&limit=20")
+        paths.append(f"/v1/exam?course={course}&n=20&seed={len(paths)}")
+        conn.request("GET", f"/v1/questions?course={course}&limit=5")
+        for item in json.loads(conn.getresponse().read())["items"]:
+            paths.append(f"/v1/questions/{item['id']}")
+    return paths
+
+
+def client(port: int, paths: list[str], duration: float, conditional: float, seed: int, out) -> None:
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    etags: dict[str, str] = {}
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        path = rng.choice(paths)
+        headers = {}
+        if path in etags and rng.random() < conditional:
+            headers["If-None-Match"] = etags[path]
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            continue
+        latencies.append(time.perf_counter() - now)
+        if resp.status not in (200, 304):
+            errors += 1
+        etag = resp.getheader("ETag")
+        if etag:
+            etags[path] = etag
+    out.put((latencies, errors))
+
+
+def run(workers: int, clients: int, duration: float, conditional: float) -> dict:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, str(ROOT / "scripts" / "serve_quizzes.py"), "--port", str(port),
+         "--workers", str(workers), "--poll", "0"],
+        cwd=str(ROOT),
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port)
+        time.sleep(0.5 if workers > 1 else 0)
+        paths = build_paths(port)
+        out = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=client, args=(port, paths, duration, conditional, i, out))
+            for i in range(clients)
+        ]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(lat for lats, _ in results for lat in lats)
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": len(latencies),
+        "errors": sum(e for _, e in results),
+        "rps": len(latencies) / duration,
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test del servizio HTTP sul corpus.")
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKERS,
+                        help=f"Numero di processi del servizio da provare (default: {' '.join(map(str, DEFAULT_WORKERS))})")
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS,
+                        help=f"Processi client concorrenti (default: {DEFAULT_CLIENTS})")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION,
+                        help=f"Durata di ogni prova in secondi (default: {DEFAULT_DURATION})")
+    parser.add_argument("--conditional", type=float, default=DEFAULT_CONDITIONAL,
+                        help=f"Frazione di richieste con If-None-Match quando l'ETag è noto (default: {DEFAULT_CONDITIONAL})")
+    args = parser.parse_args(argv)
+
+    print(f"\n📊 {args.clients} client, {args.duration:.0f}s per prova\n")
+    print(f"| {'Worker':>6} | {'Richieste':>9} | {'Errori':>6} | {'Req/s':>8} | {'p50 (ms)':>8} | {'p99 (ms)':>8} |")
+    print(f"|{'-' * 8}|{'-' * 11}|{'-' * 8}|{'-' * 10}|{'-' * 10}|{'-' * 10}|")
+    for workers in args.workers:
+        r = run(workers, args.clients, args.duration, args.conditional)
+        print(f"| {workers:>6} | {r['requests']:>9} | {r['errors']:>6} | {r['rps']:>8.0f} | "
+              f"{r['p50_ms']:>8.2f} | {r['p99_ms']:>8.2f} |")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+"""
+bench_startup.py — Misura il tempo di avvio degli script con `python -X importtime`.
+
+Uso:
+    python scripts/bench_startup.py [--repeat 5] [--max-ms 100]
+
+Per ogni comando riporta il tempo totale (mediana), il tempo speso negli import
+e i moduli più pesanti. Con `--max-ms` termina con exit code 1 se un comando
+supera la soglia.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from quiz_corpus import ROOT
+
+DEFAULT_REPEAT = 5
+DEFAULT_TOP = 3
+
+COMMANDS = [
+    ("quiz_cli --help", ["scripts/quiz_cli.py", "--help"]),
+    ("generate_quiz --help", ["scripts/generate_quiz.py", "--help"]),
+    ("ollama_enrich_quiz --help", ["scripts/ollama_enrich_quiz.py", "--help"]),
+    ("ollama_enrich_quiz --plan-only",
+     ["scripts/ollama_enrich_quiz.py", "--quiz", "sapienza/informatica/uniquizzes/so1.json", "--plan-only"]),
+    ("validate", ["scripts/validate.py"]),
+    ("quiz_cli validate", ["scripts/quiz_cli.py", "validate"]),
+]
+
+_IMPORT_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( +)(\S+)")
+
+
+def parse_importtime(stderr: str) -> tuple[float, list[tuple[str, float]]]:
+    """Somma i tempi cumulativi degli import di primo livello; restituisce (ms totali, [(modulo, ms)])."""
+    top_level = []
+    for line in stderr.splitlines():
+        m = _IMPORT_RE.match(line)
+        if m and len(m.group(3)) == 1:
+            top_level.append((m.group(4), int(m.group(2)) / 1000))
+    return sum(ms for _, ms in top_level), top_level
+
+
+def run_once(cmd: list[str]) -> tuple[float, str, int]:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *cmd],
+        cwd=str(ROOT),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return (time.perf_counter() - start) * 1000, proc.stderr, proc.returncode
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del tempo di avvio degli script (-X importtime).")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"Ripetizioni per comando, si usa la mediana (default: {DEFAULT_REPEAT})")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP,
+                        help=f"Import più pesanti da mostrare per comando (default: {DEFAULT_TOP})")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Soglia in ms sul tempo totale: exit code 1 se superata")
+    args = parser.parse_args(argv)
+
+    baseline = statistics.median(run_once(["-c", "pass"])[0] for _ in range(args.repeat))
+    print(f"\n⏱️  Interprete vuoto (python -c pass): {baseline:.1f} ms\n")
+    print(f"| {'Comando':<32} | {'Totale (ms)':>11} | {'Import (ms)':>11} | Import più pesanti")
+    print(f"|{'-' * 34}|{'-' * 13}|{'-' * 13}|{'-' * 40}")
+
+    slow = []
+    for label, cmd in COMMANDS:
+        walls, imports, heaviest = [], [], []
+        for _ in range(args.repeat):
+            wall, stderr, code = run_once(cmd)
+            if code != 0:
+                print(f"⚠️  {label}: exit code {code}")
+            total, top_level = parse_importtime(stderr)
+            walls.append(wall)
+            imports.append(total)
+            heaviest = sorted(top_level, key=lambda x: x[1], reverse=True)[: args.top]
+        wall = statistics.median(walls)
+        detail = ", ".join(f"{name} {ms:.1f}" for name, ms in heaviest)
+        print(f"| {label:<32} | {wall:>11.1f} | {statistics.median(imports):>11.1f} | {detail}")
+        if args.max_ms is not None and wall > args.max_ms:
+            slow.append(label)
+
+    if slow:
+        print(f"\n❌ Sopra {args.max_ms:.0f} ms: {', '.join(slow)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
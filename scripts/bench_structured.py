@@ -0,0 +1,158 @@
+"""
+bench_structured.py — Confronta output libero e output strutturato (schema JSON) nelle chiamate di enrich.
+
+Uso:
+    python scripts/bench_structured.py --model llama3.2 [--quiz sapienza/informatica/uniquizzes/so1.json] [--batches 10]
+    python scripts/bench_structured.py --model gemini-2.0-flash --pdf esame.pdf [--batches 3]
+
+Ollama (default): invia gli stessi batch di domande con e senza il parametro `format` e riporta
+per ogni modalità: batch riusciti, tentativi extra (retry rate), risposte non valide,
+token totali e token sprecati nei tentativi scartati. Il file quiz non viene modificato.
+
+Gemini (`--pdf`): genera `--batches` volte il quiz dallo stesso PDF con `generate_quiz.py`,
+con e senza `response_schema`, ritentando fino a `--retries` volte le generazioni non valide, e
+riporta le stesse colonne di Ollama (token dai `usage_metadata` di Gemini) più le domande prodotte.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from ollama_enrich_quiz import DEFAULT_BASE_URL, build_prompt, request_enrichment, verify_connection
+from quiz_corpus import QUIZZES_DIR
+
+DEFAULT_QUIZ = "sapienza/informatica/uniquizzes/so1.json"
+DEFAULT_BATCHES = 10
+DEFAULT_BATCH_SIZE = 5
+DEFAULT_RETRIES = 2
+
+
+def run_mode(args: argparse.Namespace, batches: list[list[dict]], structured: bool) -> dict:
+    mode_args = argparse.Namespace(**vars(args), structured=structured)
+    usage: dict = {}
+    ok = 0
+    extra_attempts = 0
+    start = time.perf_counter()
+    for batch in batches:
+        results, _, attempts = request_enrichment(mode_args, args.model, build_prompt(batch), usage)
+        ok += results is not None
+        extra_attempts += attempts - 1
+    return {
+        "batches": len(batches),
+        "ok": ok,
+        "retry_rate": extra_attempts / len(batches),
+        "invalid": usage.get("parse_failures", 0),
+        "calls": usage.get("calls", 0),
+        "tokens": usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0),
+        "wasted_tokens": usage.get("wasted_tokens", 0),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def run_gemini(args: argparse.Namespace, text: str, structured: bool) -> dict:
+    from generate_quiz import generate_quiz
+
+    usage: dict = {}
+    ok = questions = extra_attempts = 0
+    start = time.perf_counter()
+
+    def spent() -> int:
+        return usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+
+    for _ in range(args.batches):
+        for attempt in range(args.retries + 1):
+            before = spent()
+            quiz = generate_quiz(text, args.model, structured=structured, usage=usage)
+            if isinstance(quiz, list):
+                ok += 1
+                questions += len(quiz)
+                break
+            if quiz is not None:
+                # JSON valido ma non un array di domande: tentativo comunque da scartare.
+                usage["parse_failures"] = usage.get("parse_failures", 0) + 1
+                usage["wasted_tokens"] = usage.get("wasted_tokens", 0) + spent() - before
+        extra_attempts += attempt
+    return {
+        "batches": args.batches,
+        "ok": ok,
+        "questions": questions,
+        "retry_rate": extra_attempts / args.batches,
+        "invalid": usage.get("parse_failures", 0),
+        "calls": usage.get("calls", 0),
+        "tokens": spent(),
+        "wasted_tokens": usage.get("wasted_tokens", 0),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def print_table(results: list[tuple[str, dict]], with_questions: bool = False) -> None:
+    extra_head = f" {'Domande':>7} |" if with_questions else ""
+    extra_rule = f"{'-' * 9}|" if with_questions else ""
+    print(f"| {'Modalità':<12} | {'OK':>5} |{extra_head} {'Retry rate':>10} | {'Non valide':>10} | {'Chiamate':>8} | "
+          f"{'Token':>8} | {'Sprecati':>8} | {'Tempo (s)':>9} |")
+    print(f"|{'-' * 14}|{'-' * 7}|{extra_rule}{'-' * 12}|{'-' * 12}|{'-' * 10}|{'-' * 10}|{'-' * 10}|{'-' * 11}|")
+    for label, r in results:
+        extra = f" {r['questions']:>7} |" if with_questions else ""
+        print(f"| {label:<12} | {r['ok']:>2}/{r['batches']:<2} |{extra} {r['retry_rate']:>10.2f} | {r['invalid']:>10} | "
+              f"{r['calls']:>8} | {r['tokens']:>8} | {r['wasted_tokens']:>8} | {r['seconds']:>9.1f} |")
+
+
+def bench_gemini(args: argparse.Namespace) -> int:
+    from generate_quiz import extract_text_with_colors, get_client
+
+    if args.batches <= 0 or args.retries < 0:
+        print("❌ --batches deve essere > 0, --retries >= 0")
+        return 1
+    pdf = Path(args.pdf)
+    if not pdf.is_file():
+        print(f"❌ PDF non trovato: {pdf}")
+        return 1
+    get_client()
+    text = extract_text_with_colors(pdf)
+    results = [(label, run_gemini(args, text, structured))
+               for label, structured in (("libero", False), ("strutturato", True))]
+
+    print(f"\n📊 {args.model}: {args.batches} generazioni per modalità da {pdf.name}, retry max {args.retries}\n")
+    print_table(results, with_questions=True)
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark output libero vs strutturato (enrich con Ollama, generazione con Gemini).")
+    parser.add_argument("--model", required=True, help="Modello da usare (Ollama, oppure Gemini con --pdf)")
+    parser.add_argument("--pdf", default=None, help="Misura invece la generazione del quiz da questo PDF con Gemini")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help=f"URL base di Ollama (default: {DEFAULT_BASE_URL})")
+    parser.add_argument("--api-key", default=None, help="API key opzionale (per istanze Ollama con autenticazione)")
+    parser.add_argument("--quiz", default=DEFAULT_QUIZ, help=f"Quiz da usare, relativo a quizzes/ (default: {DEFAULT_QUIZ})")
+    parser.add_argument("--batches", type=int, default=DEFAULT_BATCHES,
+                        help=f"Batch (o generazioni con --pdf) per modalità (default: {DEFAULT_BATCHES})")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Domande per batch (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help=f"Tentativi extra per batch (default: {DEFAULT_RETRIES})")
+    args = parser.parse_args(argv)
+    if args.pdf:
+        return bench_gemini(args)
+
+    with open(QUIZZES_DIR / args.quiz, encoding="utf-8") as f:
+        quiz_data = json.load(f)
+    batches = [
+        quiz_data[start:start + args.batch_size]
+        for start in range(0, len(quiz_data), args.batch_size)
+    ][: args.batches]
+    if not batches:
+        print("❌ Il quiz non contiene domande.")
+        return 1
+
+    verify_connection(args.base_url)
+    print(f"\n📊 {args.model}: {len(batches)} batch × {args.batch_size} domande, retry max {args.retries}\n")
+    print_table([(label, run_mode(args, batches, structured))
+                 for label, structured in (("libero", False), ("strutturato", True))])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+"""
+bench_study.py — Benchmark dello stato di ripasso di `study.py` su un dataset sintetico.
+
+Uso:
+    python scripts/bench_study.py [--users 10000] [--questions 50000] [--cards-per-user 500]
+
+Crea in una cartella temporanea un database con `--questions` domande distribuite su
+`--courses` corsi e `--users` utenti, ciascuno con `--cards-per-user` carte già ripassate a
+scadenze casuali (±30 giorni). Misura:
+- caricamento, dimensione su disco e byte per carta;
+- latenza di `due()` (prossime N carte di un utente, su tutti i corsi o su un solo corso) dopo
+  aver caricato il 10% e il 100% degli utenti, per mostrare che non cresce con la tabella;
+- throughput di `review()` (una transazione per risposta, come nella sessione di studio).
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from study import AGAIN, DAY, EASY, START_EASE, StudyStore
+
+DEFAULT_USERS = 10_000
+DEFAULT_QUESTIONS = 50_000
+DEFAULT_CARDS = 500
+DEFAULT_COURSES = 200
+DEFAULT_QUERIES = 2000
+DEFAULT_N = 20
+
+
+def percentiles(samples: list[float]) -> tuple[float, float]:
+    samples = sorted(samples)
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.99) - 1] * 1000
+
+
+def load_users(store: StudyStore, users: range, questions: int, cards: int, now: int, rng: random.Random) -> None:
+    def rows():
+        for user in users:
+            for question in sorted(rng.sample(range(1, questions + 1), cards)):
+                interval = rng.choice((1, 3, 6, 15, 40, 100))
+                yield user, question, now + rng.randint(-30 * DAY, 30 * DAY), interval, START_EASE, 3, 0
+
+    store.conn.executemany("INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?)", rows())
+    store.conn.commit()
+
+
+def measure_due(store: StudyStore, users: int, queries: int, n: int, now: int, prefix: str,
+                rng: random.Random) -> tuple[float, float]:
+    samples = []
+    for _ in range(queries):
+        user = rng.randint(1, users)
+        start = time.perf_counter()
+        store.due(user, now, n, prefix)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark dello stato di ripasso (SM-2) su dati sintetici.")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS, help=f"Utenti (default: {DEFAULT_USERS})")
+    parser.add_argument("--questions", type=int, default=DEFAULT_QUESTIONS, help=f"Domande (default: {DEFAULT_QUESTIONS})")
+    parser.add_argument("--cards-per-user", type=int, default=DEFAULT_CARDS,
+                        help=f"Carte già ripassate da ogni utente (default: {DEFAULT_CARDS})")
+    parser.add_argument("--courses", type=int, default=DEFAULT_COURSES, help=f"Corsi (default: {DEFAULT_COURSES})")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES,
+                        help=f"Query e ripassi misurati per fase (default: {DEFAULT_QUERIES})")
+    parser.add_argument("-n", type=int, default=DEFAULT_N, help=f"Carte restituite da due() (default: {DEFAULT_N})")
+    parser.add_argument("--seed", type=int, default=42, help="Seed del generatore casuale")
+    args = parser.parse_args(argv)
+    if not 0 < args.cards_per_user <= args.questions:
+        parser.error("--cards-per-user deve essere compreso fra 1 e --questions")
+
+    rng = random.Random(args.seed)
+    now = int(time.time())
+    tmp = Path(tempfile.mkdtemp(prefix="quiz-study-"))
+    try:
+        db = tmp / "study.sqlite"
+        store = StudyStore(db)
+        store.conn.executemany("INSERT INTO users (num, name) VALUES (?, ?)",
+                               ((u, f"user{u}") for u in range(1, args.users + 1)))
+        store.conn.executemany(
+            "INSERT INTO questions (num, question_id, rel) VALUES (?, ?, ?)",
+            ((q, f"{q:016x}", f"uni/fac/src/course{q % args.courses:03d}.json") for q in range(1, args.questions + 1)),
+        )
+        prefix = "uni/fac/src/course000.json"
+
+        print(f"👥 {args.users} utenti × {args.cards_per_user} carte su {args.questions} domande "
+              f"({args.users * args.cards_per_user:,} righe)\n")
+        print(f"| {'Utenti caricati':<16} | {'Carte':>11} | {'Load (s)':>8} | {'due() p50/p99 (ms)':>19} "
+              f"| {'due(corso) p50/p99 (ms)':>24} |")
+        print(f"|{'-' * 18}|{'-' * 13}|{'-' * 10}|{'-' * 21}|{'-' * 26}|")
+        loaded, load_time = 0, 0.0
+        for target in (max(1, args.users // 10), args.users):
+            start = time.perf_counter()
+            load_users(store, range(loaded + 1, target + 1), args.questions, args.cards_per_user, now, rng)
+            load_time += time.perf_counter() - start
+            loaded = target
+            all_p50, all_p99 = measure_due(store, loaded, args.queries, args.n, now, "", rng)
+            course_p50, course_p99 = measure_due(store, loaded, args.queries, args.n, now, prefix, rng)
+            print(f"| {loaded:<16} | {loaded * args.cards_per_user:>11,} | {load_time:>8.1f} "
+                  f"| {all_p50:>8.3f} / {all_p99:<8.3f} | {course_p50:>11.3f} / {course_p99:<10.3f} |")
+
+        samples = []
+        for _ in range(args.queries):
+            user = rng.randint(1, args.users)
+            question = rng.randint(1, args.questions)
+            grade = rng.randint(AGAIN, EASY)
+            start = time.perf_counter()
+            store.review(user, f"{question:016x}", f"uni/fac/src/course{question % args.courses:03d}.json", grade, now)
+            samples.append(time.perf_counter() - start)
+        review_p50, review_p99 = percentiles(samples)
+        store.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        store.close()
+
+        size = sum(p.stat().st_size for p in tmp.iterdir())
+        cards = args.users * args.cards_per_user
+        print(f"\n✍️  review(): p50 {review_p50:.3f} ms, p99 {review_p99:.3f} ms "
+              f"(~{1000 / review_p50:.0f} risposte/s con commit singolo)")
+        print(f"💾 Database: {size / 2**20:.1f} MB ({size / cards:.1f} byte per carta, indice incluso)")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
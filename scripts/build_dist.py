@@ -0,0 +1,215 @@
+"""
+build_dist.py — Crea l'artefatto di distribuzione del dataset (JSON minificato + manifest).
+
+Uso:
+    python scripts/build_dist.py [--out dist] [--compress none|gzip|zstd] [--no-dict]
+
+Per ogni file in `quizzes/` e `open-questions/` scrive la versione minificata
+(opzionalmente compressa) in `<out>/` mantenendo la stessa struttura di cartelle.
+La build viene scritta in una cartella temporanea e poi sostituisce solo i propri
+artefatti (`quizzes/`, `open-questions/`, dizionario e manifest): gli altri contenuti
+di `<out>/`, come le viste di `course_taxonomy.py`, non vengono toccati.
+Con `--compress zstd` viene addestrato un dizionario condiviso su tutte le domande,
+così anche i file piccoli si comprimono bene. Il manifest riporta dimensioni,
+hash SHA-256 e numero di domande per file. Per leggere l'output usa `quiz_dist.py`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from quiz_corpus import OPEN_QUESTIONS_DIR, QUIZZES_DIR, ROOT, iter_json_files, load_json_list, path_parts, rel_path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_OUT = "dist"
+DEFAULT_DICT_SIZE = 64 * 1024
+DEFAULT_LEVEL = 19
+MANIFEST_NAME = "manifest.json"
+DICT_NAME = "quiz.dict"
+MANIFEST_VERSION = 1
+
+EXTENSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+SOURCES = (("quiz", QUIZZES_DIR), ("open", OPEN_QUESTIONS_DIR))
+# Unici elementi di `<out>/` gestiti da questo script: il resto (es. `courses/`) resta intatto.
+ARTIFACTS = ("quizzes", "open-questions", DICT_NAME, MANIFEST_NAME)
+
+
+def minify(data: list) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def collect_sources() -> list[dict]:
+    items = []
+    for kind, base in SOURCES:
+        for path in iter_json_files(base):
+            data = load_json_list(path)
+            if data is None:
+                print(f"⚠️  Salto file non valido: {path.relative_to(ROOT)}")
+                continue
+            items.append(
+                {
+                    "kind": kind,
+                    "source": path.relative_to(ROOT).as_posix(),
+                    "rel": rel_path(path, base),
+                    "raw_bytes": path.stat().st_size,
+                    "data": data,
+                }
+            )
+    return items
+
+
+def train_dictionary(items: list[dict], dict_size: int) -> bytes | None:
+    """Addestra un dizionario zstd usando ogni domanda minificata come campione."""
+    samples = [minify([q]) for item in items for q in item["data"]]
+    if len(samples) < 10:
+        return None
+    try:
+        return zstandard.train_dictionary(dict_size, samples).as_bytes()
+    except zstandard.ZstdError as exc:
+        print(f"⚠️  Addestramento dizionario fallito ({exc}), procedo senza.")
+        return None
+
+
+def build(out_dir: Path, compress: str, use_dict: bool, dict_size: int, level: int) -> dict:
+    items = collect_sources()
+    if not items:
+        print("❌ Nessun file trovato in quizzes/ o open-questions/")
+        sys.exit(1)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    final_dir, out_dir = out_dir, Path(tempfile.mkdtemp(prefix=".build-", dir=out_dir))
+    try:
+        manifest = write_build(out_dir, items, compress, use_dict, dict_size, level)
+        replace_artifacts(out_dir, final_dir)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return manifest
+
+
+def replace_artifacts(build_dir: Path, out_dir: Path) -> None:
+    """Sostituisce in `out_dir` solo gli artefatti di questa build (manifest per ultimo)."""
+    for name in ARTIFACTS:
+        old, new = out_dir / name, build_dir / name
+        if old.is_dir():
+            shutil.rmtree(old)
+        elif old.exists():
+            old.unlink()
+        if new.exists():
+            new.replace(old)
+
+
+def write_build(out_dir: Path, items: list[dict], compress: str, use_dict: bool, dict_size: int, level: int) -> dict:
+    dict_bytes = None
+    compressor = None
+    if compress == "zstd":
+        if use_dict:
+            dict_bytes = train_dictionary(items, dict_size)
+        if dict_bytes is not None:
+            (out_dir / DICT_NAME).write_bytes(dict_bytes)
+            compressor = zstandard.ZstdCompressor(level=level, dict_data=zstandard.ZstdCompressionDict(dict_bytes))
+        else:
+            compressor = zstandard.ZstdCompressor(level=level)
+
+    files = []
+    totals = {"files": 0, "questions": 0, "raw_bytes": 0, "minified_bytes": 0, "bytes": 0}
+    for item in items:
+        payload = minify(item["data"])
+        if compress == "gzip":
+            blob = gzip.compress(payload, compresslevel=9, mtime=0)
+        elif compress == "zstd":
+            blob = compressor.compress(payload)
+        else:
+            blob = payload
+
+        top = "quizzes" if item["kind"] == "quiz" else "open-questions"
+        dest_rel = f"{top}/{item['rel']}{EXTENSIONS[compress]}"
+        dest = out_dir / dest_rel
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(blob)
+
+        entry = {
+            "path": dest_rel,
+            "source": item["source"],
+            "kind": item["kind"],
+            **path_parts(item["rel"]),
+            "questions": len(item["data"]),
+            "raw_bytes": item["raw_bytes"],
+            "minified_bytes": len(payload),
+            "bytes": len(blob),
+            "sha256": sha256(payload),
+        }
+        files.append(entry)
+        totals["files"] += 1
+        for key in ("questions", "raw_bytes", "minified_bytes", "bytes"):
+            totals[key] += entry[key]
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "compression": compress,
+        "dictionary": {"path": DICT_NAME, "sha256": sha256(dict_bytes), "bytes": len(dict_bytes)} if dict_bytes else None,
+        "totals": totals,
+        "files": files,
+    }
+    with open(out_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def human_size(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024 or unit == "MB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n} B"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Crea la build di distribuzione minificata/compressa del dataset.")
+    parser.add_argument("--out", default=DEFAULT_OUT, help=f"Cartella di output (default: {DEFAULT_OUT})")
+    parser.add_argument("--compress", choices=sorted(EXTENSIONS), default="zstd" if zstandard else "gzip",
+                        help="Compressione dei file (default: zstd se installato, altrimenti gzip)")
+    parser.add_argument("--no-dict", action="store_true",
+                        help="Con zstd, non addestrare il dizionario condiviso")
+    parser.add_argument("--dict-size", type=int, default=DEFAULT_DICT_SIZE,
+                        help=f"Dimensione massima del dizionario zstd in byte (default: {DEFAULT_DICT_SIZE})")
+    parser.add_argument("--level", type=int, default=DEFAULT_LEVEL,
+                        help=f"Livello di compressione zstd (default: {DEFAULT_LEVEL})")
+    args = parser.parse_args(argv)
+
+    if args.compress == "zstd" and zstandard is None:
+        print("❌ Libreria 'zstandard' mancante! Installa con: pip install zstandard (oppure usa --compress gzip)")
+        return 1
+
+    out_dir = Path(args.out)
+    if not out_dir.is_absolute():
+        out_dir = ROOT / out_dir
+
+    manifest = build(out_dir, args.compress, not args.no_dict, args.dict_size, args.level)
+    totals = manifest["totals"]
+    print(f"📦 Build completata in: {out_dir}")
+    print(f"📚 File: {totals['files']} | Domande: {totals['questions']}")
+    print(f"📄 Sorgenti: {human_size(totals['raw_bytes'])}")
+    print(f"🗜️  Minificati: {human_size(totals['minified_bytes'])}")
+    print(f"💾 Output ({args.compress}): {human_size(totals['bytes'])}")
+    if manifest["dictionary"]:
+        print(f"📖 Dizionario condiviso: {human_size(manifest['dictionary']['bytes'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
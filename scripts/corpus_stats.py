@@ -0,0 +1,332 @@
+"""
+corpus_stats.py — Statistiche e report di qualità del corpus di quiz.
+
+Uso:
+    python scripts/corpus_stats.py [--json stats.json] [--markdown stats.md] [--jobs 4]
+    python scripts/corpus_stats.py --synthetic 1000000     # prova di carico su un corpus sintetico
+
+I metadati di ogni domanda (numero di opzioni, correctIndex, lunghezze, presenza di
+immagini/codice/explanation/hint) vengono estratti in array colonnari NumPy, uno per campo;
+tutte le distribuzioni sono poi calcolate con operazioni vettoriali in un solo passaggio:
+- opzioni per domanda;
+- posizione di `correctIndex` per sorgente (`sounbot`, `uniquizzes`, `community`, ...),
+  confrontata con la distribuzione attesa se la risposta fosse uniforme (chi quadro);
+- lunghezza di domande, explanation e hint (percentili);
+- diffusione di immagini e codice;
+- copertura dell'enrich (explanation/hint) per università/facoltà.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from quiz_corpus import QUIZZES_DIR, iter_json_files, load_json_list, path_parts, rel_path
+
+MAX_OPTIONS = 8
+PERCENTILES = (50, 90, 99)
+COLUMNS = ("n_options", "correct", "q_len", "expl_len", "hint_len", "has_image", "has_code")
+
+np = None
+
+
+def require_numpy() -> None:
+    global np
+    try:
+        import numpy
+    except ImportError:
+        print("❌ Libreria 'numpy' mancante! Installa con: pip install numpy")
+        sys.exit(1)
+    np = numpy
+
+
+def extract_file(path: Path) -> dict | None:
+    """Legge un file e restituisce le sue colonne (liste Python, convertite dal chiamante)."""
+    data = load_json_list(path)
+    if data is None:
+        return None
+    cols = {name: [] for name in COLUMNS}
+    for q in data:
+        if not isinstance(q, dict):
+            continue
+        options = q.get("options") if isinstance(q.get("options"), list) else []
+        correct = q.get("correctIndex")
+        cols["n_options"].append(len(options))
+        cols["correct"].append(correct if isinstance(correct, int) and 0 <= correct < len(options) else -1)
+        cols["q_len"].append(len(str(q.get("question", ""))))
+        cols["expl_len"].append(len(str(q.get("explanation", "")).strip()))
+        cols["hint_len"].append(len(str(q.get("hint", "")).strip()))
+        cols["has_image"].append(bool(q.get("image")) or any(isinstance(o, dict) and o.get("image") for o in options))
+        cols["has_code"].append(bool(str(q.get("code", "")).strip()))
+    return cols
+
+
+class Columns:
+    """Array colonnari per domanda + tabella dei file (una riga per file, con i gruppi)."""
+
+    def __init__(self, files: list[dict], per_file: list[dict]):
+        self.files = files
+        counts = np.array([len(c["n_options"]) for c in per_file], dtype=np.int64)
+        self.file_idx = np.repeat(np.arange(len(files), dtype=np.int32), counts)
+        self.n_options = np.concatenate([np.asarray(c["n_options"], dtype=np.int16) for c in per_file])
+        self.correct = np.concatenate([np.asarray(c["correct"], dtype=np.int16) for c in per_file])
+        self.q_len = np.concatenate([np.asarray(c["q_len"], dtype=np.int32) for c in per_file])
+        self.expl_len = np.concatenate([np.asarray(c["expl_len"], dtype=np.int32) for c in per_file])
+        self.hint_len = np.concatenate([np.asarray(c["hint_len"], dtype=np.int32) for c in per_file])
+        self.has_image = np.concatenate([np.asarray(c["has_image"], dtype=bool) for c in per_file])
+        self.has_code = np.concatenate([np.asarray(c["has_code"], dtype=bool) for c in per_file])
+
+    def __len__(self) -> int:
+        return int(self.file_idx.shape[0])
+
+    def group_codes(self, key) -> tuple[np.ndarray, list[str]]:
+        """Codici di gruppo per domanda (via tabella file) e relative etichette."""
+        labels = sorted({key(f) for f in self.files})
+        code_of = {label: i for i, label in enumerate(labels)}
+        file_codes = np.array([code_of[key(f)] for f in self.files], dtype=np.int32)
+        return file_codes[self.file_idx], labels
+
+
+def load_columns(quizzes_root: Path, jobs: int) -> Columns | None:
+    """Colonne del corpus in `quizzes_root`; None se non c'è nessun file quiz valido."""
+    paths = list(iter_json_files(quizzes_root))
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            extracted = list(pool.map(extract_file, paths, chunksize=8))
+    else:
+        extracted = [extract_file(p) for p in paths]
+    files, per_file = [], []
+    for path, cols in zip(paths, extracted):
+        if cols is None:
+            continue
+        rel = rel_path(path, quizzes_root)
+        files.append({"rel": rel, **path_parts(rel)})
+        per_file.append(cols)
+    if not per_file:
+        return None
+    return Columns(files, per_file)
+
+
+def percentiles(values: np.ndarray) -> dict:
+    if values.size == 0:
+        return {f"p{p}": 0 for p in PERCENTILES} | {"mean": 0}
+    pct = np.percentile(values, PERCENTILES)
+    return {f"p{p}": float(v) for p, v in zip(PERCENTILES, pct)} | {"mean": float(values.mean())}
+
+
+def answer_bias(cols: Columns, codes: np.ndarray, labels: list[str]) -> list[dict]:
+    """
+    Distribuzione di correctIndex per gruppo contro l'atteso con risposte uniformi.
+
+    L'atteso tiene conto del numero di opzioni di ogni domanda: una domanda con 3 opzioni
+    contribuisce 1/3 alle posizioni 0-2 e nulla alla 3.
+    """
+    valid = cols.correct >= 0
+    n_groups = len(labels)
+    observed = np.zeros((n_groups, MAX_OPTIONS))
+    np.add.at(observed, (codes[valid], np.minimum(cols.correct[valid], MAX_OPTIONS - 1)), 1)
+
+    # Atteso: per ogni gruppo, somma su n_options di count(n) * [pos < n] / n.
+    n_opt = np.clip(cols.n_options[valid], 1, MAX_OPTIONS)
+    by_n = np.zeros((n_groups, MAX_OPTIONS + 1))
+    np.add.at(by_n, (codes[valid], n_opt), 1)
+    positions = np.arange(MAX_OPTIONS)
+    ns = np.arange(MAX_OPTIONS + 1)
+    weights = np.where(positions[None, :] < ns[:, None], 1 / np.maximum(ns, 1)[:, None], 0)
+    expected = by_n @ weights
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chi2 = np.where(expected > 0, (observed - expected) ** 2 / expected, 0).sum(axis=1)
+    used = int(max(1, np.max(np.flatnonzero(observed.sum(axis=0) + expected.sum(axis=0)) + 1, initial=1)))
+    result = []
+    for g, label in enumerate(labels):
+        total = observed[g].sum()
+        if total == 0:
+            continue
+        dof = int(max(1, (expected[g] > 0).sum() - 1))
+        result.append({
+            "group": label,
+            "questions": int(total),
+            "observed_share": [round(float(x), 4) for x in observed[g, :used] / total],
+            "expected_share": [round(float(x), 4) for x in expected[g, :used] / total],
+            "chi2": round(float(chi2[g]), 2),
+            "dof": dof,
+            # Statistica normalizzata: ≈1 se uniforme, molto sopra 1 se la chiave è sbilanciata.
+            "chi2_per_dof": round(float(chi2[g]) / dof, 2),
+        })
+    return sorted(result, key=lambda r: -r["chi2_per_dof"])
+
+
+def coverage(cols: Columns, codes: np.ndarray, labels: list[str]) -> list[dict]:
+    has_expl = cols.expl_len > 0
+    has_hint = cols.hint_len > 0
+    n = np.bincount(codes, minlength=len(labels))
+    complete = np.bincount(codes, weights=has_expl & has_hint, minlength=len(labels))
+    missing_both = np.bincount(codes, weights=~has_expl & ~has_hint, minlength=len(labels))
+    images = np.bincount(codes, weights=cols.has_image, minlength=len(labels))
+    code = np.bincount(codes, weights=cols.has_code, minlength=len(labels))
+    return [
+        {
+            "group": label,
+            "questions": int(n[g]),
+            "complete": int(complete[g]),
+            "missing_both": int(missing_both[g]),
+            "partial": int(n[g] - complete[g] - missing_both[g]),
+            "coverage": round(float(complete[g] / n[g]), 4) if n[g] else 0.0,
+            "image_share": round(float(images[g] / n[g]), 4) if n[g] else 0.0,
+            "code_share": round(float(code[g] / n[g]), 4) if n[g] else 0.0,
+        }
+        for g, label in enumerate(labels)
+    ]
+
+
+def compute_stats(cols: Columns) -> dict:
+    source_codes, source_labels = cols.group_codes(lambda f: f["source_dir"] or "(nessuna)")
+    fac_codes, fac_labels = cols.group_codes(lambda f: f"{f['university']}/{f['faculty']}")
+    options_hist = np.bincount(np.minimum(cols.n_options, MAX_OPTIONS), minlength=MAX_OPTIONS + 1)
+    return {
+        "files": len(cols.files),
+        "questions": len(cols),
+        "invalid_correct_index": int((cols.correct < 0).sum()),
+        "options_per_question": {str(n): int(c) for n, c in enumerate(options_hist) if c},
+        "lengths": {
+            "question": percentiles(cols.q_len),
+            "explanation": percentiles(cols.expl_len[cols.expl_len > 0]),
+            "hint": percentiles(cols.hint_len[cols.hint_len > 0]),
+        },
+        "image_share": round(float(cols.has_image.mean()), 4) if len(cols) else 0.0,
+        "code_share": round(float(cols.has_code.mean()), 4) if len(cols) else 0.0,
+        "answer_bias_by_source": answer_bias(cols, source_codes, source_labels),
+        "coverage_by_faculty": coverage(cols, fac_codes, fac_labels),
+    }
+
+
+def to_markdown(stats: dict) -> str:
+    lines = [
+        "# Statistiche del corpus",
+        "",
+        f"- File: {stats['files']}",
+        f"- Domande: {stats['questions']}",
+        f"- correctIndex non validi: {stats['invalid_correct_index']}",
+        f"- Domande con immagini: {stats['image_share']:.1%}",
+        f"- Domande con codice: {stats['code_share']:.1%}",
+        "",
+        "## Opzioni per domanda",
+        "",
+        "| Opzioni | Domande |",
+        "|---|---|",
+    ]
+    lines += [f"| {n} | {c} |" for n, c in stats["options_per_question"].items()]
+    lines += ["", "## Lunghezze (caratteri)", "", "| Campo | p50 | p90 | p99 | media |", "|---|---|---|---|---|"]
+    for name, p in stats["lengths"].items():
+        lines.append(f"| {name} | {p['p50']:.0f} | {p['p90']:.0f} | {p['p99']:.0f} | {p['mean']:.0f} |")
+    lines += ["", "## Posizione di correctIndex per sorgente", "",
+              "Quote osservate (atteso con risposte uniformi tra parentesi). χ²/gdl ≫ 1 indica una chiave sbilanciata.", "",
+              "| Sorgente | Domande | A | B | C | D | χ²/gdl |", "|---|---|---|---|---|---|---|"]
+    for r in stats["answer_bias_by_source"]:
+        cells = [
+            f"{o:.0%} ({e:.0%})" if i < len(r["observed_share"]) else "-"
+            for i, (o, e) in enumerate(zip(r["observed_share"] + [0] * 4, r["expected_share"] + [0] * 4))
+        ][:4]
+        lines.append(f"| {r['group']} | {r['questions']} | {' | '.join(cells)} | {r['chi2_per_dof']} |")
+    lines += ["", "## Copertura enrich per università/facoltà", "",
+              "| Gruppo | Domande | Complete | Parziali | Mancano entrambi | Copertura | Immagini | Codice |",
+              "|---|---|---|---|---|---|---|---|"]
+    for r in stats["coverage_by_faculty"]:
+        lines.append(f"| {r['group']} | {r['questions']} | {r['complete']} | {r['partial']} | {r['missing_both']} | "
+                     f"{r['coverage']:.1%} | {r['image_share']:.1%} | {r['code_share']:.1%} |")
+    return "\n".join(lines) + "\n"
+
+
+def write_synthetic_corpus(root: Path, questions: int, per_file: int = 500, seed: int = 0) -> None:
+    """Corpus sintetico con la stessa struttura di `quizzes/` (chiave volutamente sbilanciata in una sorgente)."""
+    rng = random.Random(seed)
+    sources = ["community", "sounbot", "uniquizzes"]
+    written = 0
+    file_no = 0
+    while written < questions:
+        n = min(per_file, questions - written)
+        source = sources[file_no % len(sources)]
+        items = []
+        for _ in range(n):
+            n_opt = rng.choice((2, 3, 4, 4, 4, 5))
+            correct = 0 if source == "community" and rng.random() < 0.4 else rng.randrange(n_opt)
+            enriched = rng.random() < 0.6
+            items.append({
+                "question": "q" * rng.randint(20, 200),
+                "options": [{"text": "o" * rng.randint(1, 60), "image": ""} for _ in range(n_opt)],
+                "correctIndex": correct,
+                "image": "img.png" if rng.random() < 0.05 else "",
+                "code": "x = 1" if rng.random() < 0.1 else "",
+                "explanation": "e" * rng.randint(50, 300) if enriched else "",
+                "hint": "h" * rng.randint(20, 100) if enriched or rng.random() < 0.1 else "",
+            })
+        dest = root / f"uni{file_no % 7}" / f"fac{file_no % 3}" / source / f"quiz{file_no}.json"
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with open(dest, "w", encoding="utf-8") as f:
+            json.dump(items, f, separators=(",", ":"))
+        written += n
+        file_no += 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Statistiche e report di qualità del corpus (NumPy).")
+    parser.add_argument("--json", default=None, help="Salva le statistiche in JSON")
+    parser.add_argument("--markdown", default=None, help="Salva il report in Markdown")
+    parser.add_argument("--jobs", type=int, default=1, help="Processi per la lettura dei file (default: 1)")
+    parser.add_argument("--synthetic", type=int, default=None,
+                        help="Genera un corpus sintetico di N domande in una cartella temporanea e lo analizza")
+    args = parser.parse_args(argv)
+    require_numpy()
+
+    tmp_dir = None
+    quizzes_root = QUIZZES_DIR
+    if args.synthetic:
+        tmp_dir = Path(tempfile.mkdtemp(prefix="quiz-synth-"))
+        start = time.perf_counter()
+        write_synthetic_corpus(tmp_dir, args.synthetic)
+        print(f"🧪 Corpus sintetico di {args.synthetic} domande generato in {time.perf_counter() - start:.1f}s")
+        quizzes_root = tmp_dir
+
+    try:
+        start = time.perf_counter()
+        cols = load_columns(quizzes_root, args.jobs)
+        load_time = time.perf_counter() - start
+        if cols is None:
+            print(f"❌ Nessun file trovato in {quizzes_root}")
+            return 1
+        start = time.perf_counter()
+        stats = compute_stats(cols)
+        stats_time = time.perf_counter() - start
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"📚 {stats['files']} file, {stats['questions']} domande")
+    print(f"⏱️  Lettura + estrazione colonne: {load_time:.2f}s | aggregazione: {stats_time * 1000:.1f} ms")
+    print("\n⚖️  Sbilanciamento di correctIndex (χ²/gdl, ≈1 = uniforme):")
+    for r in stats["answer_bias_by_source"]:
+        print(f"  - {r['group']}: {r['chi2_per_dof']} — osservato {r['observed_share']}")
+    print("\n🧩 Copertura enrich:")
+    for r in stats["coverage_by_faculty"]:
+        print(f"  - {r['group']}: {r['coverage']:.1%} complete ({r['complete']}/{r['questions']})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 JSON salvato in: {args.json}")
+    if args.markdown:
+        Path(args.markdown).write_text(to_markdown(stats), encoding="utf-8")
+        print(f"💾 Markdown salvato in: {args.markdown}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,391 @@
+"""
+course_taxonomy.py — Corsi canonici e viste unificate senza duplicati.
+
+Uso:
+    python scripts/course_taxonomy.py check                 # file non mappati, sorgenti mancanti
+    python scripts/course_taxonomy.py build [--out dist/courses]
+    python scripts/course_taxonomy.py show sistemi-operativi-1
+
+Lo stesso corso compare sotto cartelle e nomi diversi (`sounbot/so1.json`, `uniquizzes/so1.json`,
+`so12024.json`, `OLD_so1.json`, ...). `taxonomy.json` nella root del repository associa ogni
+corso canonico ai suoi file sorgente, elencati in ordine di priorità (path relativi alla root
+del repository, sono ammessi pattern glob).
+
+La vista unificata di un corso non copia le domande: è la lista degli ID stabili
+(`quiz_corpus.question_ids`) delle domande distinte, ciascuna con il file da cui leggerla e gli
+ID delle copie scartate. Due domande sono la stessa se coincidono testo (senza numerazione
+iniziale tipo "12) "), codice, immagine e insieme delle opzioni; vince la copia del file con
+priorità più alta che ha già explanation e hint. Se le copie indicano risposte diverse la voce
+è segnalata come conflitto (le copie con `correctIndex` non valido non contano).
+
+La costruzione è incrementale: per ogni file si conservano in `.cache/course_views.json` le
+chiavi di deduplicazione, indicizzate per mtime e dimensione. Quando cambia un file viene
+riletto solo quello e vengono riscritte solo le viste dei corsi che lo includono.
+`serve_quizzes.py` usa lo stesso `ViewBuilder` sui file già in memoria.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Callable
+
+from quiz_corpus import (
+    CACHE_DIR, OPEN_QUESTIONS_DIR, QUIZZES_DIR, ROOT, iter_json_files, load_json_list, normalize_text,
+    question_ids, rel_path,
+)
+
+TAXONOMY_PATH = ROOT / "taxonomy.json"
+STATE_PATH = CACHE_DIR / "course_views.json"
+DEFAULT_OUT = ROOT / "dist" / "courses"
+STATE_VERSION = 2
+
+# Cartella di primo livello -> (radice, campo con il testo della domanda)
+SOURCE_DIRS = {"quizzes": (QUIZZES_DIR, "question"), "open-questions": (OPEN_QUESTIONS_DIR, "text")}
+
+_SLUG_RE = re.compile(r"^[a-z0-9]+(?:-[a-z0-9]+)*$")
+_NUMBERING_RE = re.compile(r"^\s*\d+\s*[).:]\s+")
+
+
+class TaxonomyError(Exception):
+    pass
+
+
+class Course:
+    __slots__ = ("id", "title", "sources")
+
+    def __init__(self, course_id: str, title: str, sources: list[str]):
+        self.id = course_id
+        self.title = title
+        self.sources = sources
+
+    def resolve(self, available: list[str]) -> list[str]:
+        """File del corso presenti nel corpus, in ordine di priorità (i pattern si espandono in ordine alfabetico)."""
+        resolved: list[str] = []
+        for pattern in self.sources:
+            for path in available:
+                if path not in resolved and fnmatch(path, pattern):
+                    resolved.append(path)
+        return resolved
+
+
+def load_taxonomy(path: Path = TAXONOMY_PATH) -> list[Course]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as exc:
+        raise TaxonomyError(f"{path}: {exc}") from None
+    courses = []
+    seen = set()
+    for i, entry in enumerate(data.get("courses", []) if isinstance(data, dict) else []):
+        course_id = entry.get("id") if isinstance(entry, dict) else None
+        if not isinstance(course_id, str) or not _SLUG_RE.match(course_id):
+            raise TaxonomyError(f"{path}: corso #{i}: 'id' deve essere uno slug minuscolo (es. sistemi-operativi-1)")
+        if course_id in seen:
+            raise TaxonomyError(f"{path}: corso duplicato '{course_id}'")
+        sources = entry.get("sources")
+        if not isinstance(sources, list) or not sources or not all(isinstance(s, str) for s in sources):
+            raise TaxonomyError(f"{path}: corso '{course_id}': 'sources' deve essere una lista non vuota di path")
+        seen.add(course_id)
+        courses.append(Course(course_id, str(entry.get("title") or course_id), sources))
+    if not courses:
+        raise TaxonomyError(f"{path}: nessun corso definito")
+    return courses
+
+
+def corpus_files() -> dict[str, Path]:
+    """Tutti i file del corpus, per path relativo alla root del repository (es. `quizzes/...`)."""
+    return {
+        f"{top}/{rel_path(path, base)}": path
+        for top, (base, _) in SOURCE_DIRS.items()
+        for path in iter_json_files(base)
+    }
+
+
+def load_source(source: str) -> tuple[list, list[str]]:
+    top, rel = source.split("/", 1)
+    base, text_field = SOURCE_DIRS[top]
+    data = load_json_list(base / rel) or []
+    return data, question_ids(rel, data, text_field=text_field)
+
+
+def _digest(value) -> str:
+    raw = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _option_text(o) -> str:
+    return normalize_text(o.get("text", "") if isinstance(o, dict) else o)
+
+
+def file_keys(source: str, questions: list, ids: list[str]) -> list[list]:
+    """Per ogni domanda: [id, chiave di deduplicazione, hash della risposta, ha explanation e hint]."""
+    text_field = SOURCE_DIRS[source.split("/", 1)[0]][1]
+    keys = []
+    for qid, q in zip(ids, questions):
+        if not isinstance(q, dict):
+            continue
+        options = q.get("options") if isinstance(q.get("options"), list) else []
+        key = _digest([
+            normalize_text(_NUMBERING_RE.sub("", str(q.get(text_field, "")))),
+            normalize_text(q.get("code", "")),
+            str(q.get("image", "")).strip(),
+            sorted(_option_text(o) for o in options),
+        ])
+        correct = q.get("correctIndex")
+        answer = _digest(_option_text(options[correct])) if isinstance(correct, int) and 0 <= correct < len(options) else ""
+        complete = bool(str(q.get("explanation", "")).strip() and str(q.get("hint", "")).strip())
+        keys.append([qid, key, answer, complete])
+    return keys
+
+
+class MergedCourse:
+    """Vista di un corso canonico: voci (id, file, id delle copie scartate, conflitto) senza le domande."""
+
+    __slots__ = ("id", "title", "sources", "entries")
+
+    def __init__(self, course: Course, sources: list[tuple[str, int]], entries: list[tuple[str, str, tuple, bool]]):
+        self.id = course.id
+        self.title = course.title
+        self.sources = sources
+        self.entries = entries
+
+    def summary(self) -> dict:
+        total = sum(n for _, n in self.sources)
+        return {
+            "course": self.id,
+            "title": self.title,
+            "sources": [s for s, _ in self.sources],
+            "questions": len(self.entries),
+            "duplicates": total - len(self.entries),
+            "conflicts": sum(1 for e in self.entries if e[3]),
+        }
+
+    def to_dict(self) -> dict:
+        items = []
+        for qid, source, duplicates, conflict in self.entries:
+            item = {"id": qid, "source": source}
+            if duplicates:
+                item["duplicates"] = list(duplicates)
+            if conflict:
+                item["conflict"] = True
+            items.append(item)
+        return {
+            **self.summary(),
+            "sources": [{"path": s, "questions": n} for s, n in self.sources],
+            "items": items,
+        }
+
+
+def merge(course: Course, per_source: list[tuple[str, list[list]]]) -> MergedCourse:
+    groups: dict[str, list[tuple[str, list]]] = {}
+    for source, keys in per_source:
+        for entry in keys:
+            groups.setdefault(entry[1], []).append((source, entry))
+    entries = []
+    for members in groups.values():
+        chosen = next((m for m in members if m[1][3]), members[0])
+        duplicates = tuple(entry[0] for source, entry in members if entry is not chosen[1])
+        # Le copie senza una risposta valida (hash "") non contano: non indicano una risposta diversa.
+        conflict = len({entry[2] for _, entry in members if entry[2]}) > 1
+        entries.append((chosen[1][0], chosen[0], duplicates, conflict))
+    return MergedCourse(course, [(source, len(keys)) for source, keys in per_source], entries)
+
+
+class ViewBuilder:
+    """
+    Costruisce e mantiene le viste unificate.
+
+    `update()` riceve una "stamp" per ogni file del corpus (qualsiasi valore che cambia quando il
+    file cambia) e una funzione che lo carica: ricalcola le chiavi solo dei file con stamp
+    diversa e riunisce solo i corsi che li includono.
+    """
+
+    def __init__(self, courses: list[Course], keys: dict[str, tuple] | None = None,
+                 signatures: dict[str, list] | None = None):
+        self.courses = courses
+        self.keys: dict[str, tuple] = keys or {}
+        self.signatures: dict[str, list] = signatures or {}
+        self.views: dict[str, MergedCourse] = {}
+
+    def update(self, stamps: dict, load: Callable[[str], tuple[list, list[str]]]) -> list[str]:
+        available = sorted(stamps)
+        changed = []
+        used = set()
+        for course in self.courses:
+            sources = course.resolve(available)
+            used.update(sources)
+            # Il titolo finisce nella vista: cambiarlo nella tassonomia deve riscriverla.
+            signature = [course.title, [[source, stamps[source]] for source in sources]]
+            if self.signatures.get(course.id) == signature:
+                continue
+            per_source = []
+            for source in sources:
+                cached = self.keys.get(source)
+                if cached is None or cached[0] != stamps[source]:
+                    cached = (stamps[source], file_keys(source, *load(source)))
+                    self.keys[source] = cached
+                per_source.append((source, cached[1]))
+            self.views[course.id] = merge(course, per_source)
+            self.signatures[course.id] = signature
+            changed.append(course.id)
+        for source in set(self.keys) - used:
+            del self.keys[source]
+        for course_id in set(self.signatures) - {c.id for c in self.courses}:
+            del self.signatures[course_id]
+        return changed
+
+
+def file_stamp(path: Path) -> list[int]:
+    st = path.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def load_state(path: Path = STATE_PATH) -> tuple[dict, dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}, {}
+    if state.get("version") != STATE_VERSION:
+        return {}, {}
+    keys = {source: (entry["stamp"], entry["keys"]) for source, entry in state.get("files", {}).items()}
+    return keys, state.get("views", {})
+
+
+def save_state(builder: ViewBuilder, path: Path = STATE_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    state = {
+        "version": STATE_VERSION,
+        "files": {source: {"stamp": stamp, "keys": keys} for source, (stamp, keys) in sorted(builder.keys.items())},
+        "views": builder.signatures,
+    }
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    tmp.replace(path)
+
+
+def read_index(out_dir: Path) -> list[dict]:
+    try:
+        with open(out_dir / "index.json", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return []
+    return [entry for entry in index if isinstance(entry, dict)] if isinstance(index, list) else []
+
+
+def build(out_dir: Path = DEFAULT_OUT, taxonomy: Path = TAXONOMY_PATH, full: bool = False) -> dict:
+    """Aggiorna `out_dir/<corso>.json` e `out_dir/index.json`; riscrive solo le viste cambiate."""
+    courses = load_taxonomy(taxonomy)
+    keys, signatures = ({}, {}) if full else load_state()
+    # Viste scritte in precedenza (stato e indice): le uniche che è lecito cancellare da `out_dir`.
+    previous = set(signatures) | {entry.get("course") for entry in read_index(out_dir)}
+    builder = ViewBuilder(courses, keys, signatures)
+    # Una vista già scritta ma cancellata a mano va ricostruita.
+    for course in courses:
+        if not (out_dir / f"{course.id}.json").exists():
+            builder.signatures.pop(course.id, None)
+    read = []
+
+    def load(source: str) -> tuple[list, list[str]]:
+        read.append(source)
+        return load_source(source)
+
+    files = corpus_files()
+    changed = builder.update({source: file_stamp(path) for source, path in files.items()}, load)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for course_id in changed:
+        view = builder.views[course_id]
+        (out_dir / f"{course_id}.json").write_text(
+            json.dumps(view.to_dict(), ensure_ascii=False, indent=1), encoding="utf-8"
+        )
+    removed = previous - {c.id for c in courses}
+    for course_id in removed:
+        if isinstance(course_id, str) and _SLUG_RE.match(course_id):
+            (out_dir / f"{course_id}.json").unlink(missing_ok=True)
+    if changed or removed or not (out_dir / "index.json").exists():
+        index = []
+        for course in courses:
+            view = builder.views.get(course.id)
+            if view is None:  # vista invariata: il riepilogo si rilegge dal file già scritto
+                with open(out_dir / f"{course.id}.json", encoding="utf-8") as f:
+                    data = json.load(f)
+                summary = {k: v for k, v in data.items() if k != "items"}
+                index.append({**summary, "sources": [s["path"] for s in data["sources"]]})
+            else:
+                index.append(view.summary())
+        (out_dir / "index.json").write_text(json.dumps(index, ensure_ascii=False, indent=2), encoding="utf-8")
+    save_state(builder)
+    return {"courses": len(courses), "rebuilt": changed, "files_read": len(read), "files_cached": len(builder.keys) - len(read)}
+
+
+def check(taxonomy: Path = TAXONOMY_PATH) -> int:
+    courses = load_taxonomy(taxonomy)
+    available = sorted(corpus_files())
+    owners: dict[str, list[str]] = {}
+    problems = 0
+    for course in courses:
+        for pattern in course.sources:
+            if not any(fnmatch(path, pattern) for path in available):
+                print(f"❌ {course.id}: nessun file corrisponde a '{pattern}'")
+                problems += 1
+        for source in course.resolve(available):
+            owners.setdefault(source, []).append(course.id)
+    for source, ids in sorted(owners.items()):
+        if len(ids) > 1:
+            print(f"⚠️  {source} è in più corsi: {', '.join(ids)}")
+    unmapped = [p for p in available if p not in owners]
+    for source in unmapped:
+        print(f"ℹ️  Non mappato: {source}")
+    print(f"\n📚 Corsi: {len(courses)} | file mappati: {len(owners)}/{len(available)} | problemi: {problems}")
+    return 1 if problems else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Corsi canonici e viste unificate senza duplicati.")
+    parser.add_argument("--taxonomy", default=str(TAXONOMY_PATH), help=f"Manifest dei corsi (default: {TAXONOMY_PATH.name})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("check", help="Verifica il manifest: sorgenti mancanti, file in più corsi o non mappati")
+    p_build = sub.add_parser("build", help="Costruisce (in modo incrementale) le viste unificate")
+    p_build.add_argument("--out", default=str(DEFAULT_OUT), help="Cartella di output (default: dist/courses)")
+    p_build.add_argument("--full", action="store_true", help="Ignora lo stato e ricostruisce tutto")
+    p_show = sub.add_parser("show", help="Riepilogo di un corso canonico")
+    p_show.add_argument("course", help="ID del corso (es. sistemi-operativi-1)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "check":
+            return check(Path(args.taxonomy))
+        if args.command == "build":
+            stats = build(Path(args.out), Path(args.taxonomy), full=args.full)
+            print(f"✅ Corsi: {stats['courses']} | viste riscritte: {len(stats['rebuilt'])} | "
+                  f"file letti: {stats['files_read']} | dalla cache: {stats['files_cached']}")
+            for course_id in stats["rebuilt"]:
+                print(f"  - {course_id}")
+            return 0
+        courses = {c.id: c for c in load_taxonomy(Path(args.taxonomy))}
+        if args.course not in courses:
+            print(f"❌ Corso non trovato: {args.course} (disponibili: {', '.join(courses)})")
+            return 1
+        builder = ViewBuilder([courses[args.course]])
+        builder.update({source: 0 for source in corpus_files()}, load_source)
+        view = builder.views[args.course]
+        s = view.summary()
+        print(f"📘 {s['title']} ({s['course']}): {s['questions']} domande distinte, "
+              f"{s['duplicates']} duplicati scartati, {s['conflicts']} in conflitto")
+        for source, n in view.sources:
+            kept = sum(1 for e in view.entries if e[1] == source)
+            print(f"  - {source}: {n} domande, {kept} nella vista")
+        return 0
+    except TaxonomyError as exc:
+        print(f"❌ {exc}")
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,501 @@
+"""
+embed_index.py — Indice di embedding delle domande: ricerca di domande simili e clustering per argomento.
+
+Uso:
+    python scripts/embed_index.py build --model nomic-embed-text
+    python scripts/embed_index.py search --model nomic-embed-text "scheduling round robin" [-k 10]
+    python scripts/embed_index.py similar --model nomic-embed-text <id-domanda> [-k 10]
+    python scripts/embed_index.py cluster --model nomic-embed-text --clusters 40
+    python scripts/embed_index.py bench [--rows 100000] [--dim 768]
+
+Gli embedding sono calcolati con un modello Ollama locale, a batch, e salvati in
+`.cache/embeddings/<modello>/` come matrice float32 normalizzata (memory-mapped con NumPy)
+più un file di metadati. Ogni riga è associata all'hash del testo embeddato: alla build
+successiva vengono ricalcolate solo le domande nuove o modificate, e i testi identici
+(es. la stessa domanda in `so1` e `so12024`) vengono calcolati una volta sola.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from ollama_enrich_quiz import DEFAULT_BASE_URL, embed, verify_connection
+from quiz_corpus import CACHE_DIR, iter_quiz_questions
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_TOP_K = 10
+DEFAULT_CLUSTERS = 40
+DEFAULT_ITERATIONS = 25
+DEFAULT_SEARCH_DIM = 128
+COARSE_MIN_ROWS = 20_000
+RERANK_FACTOR = 20
+MIN_CANDIDATES = 200
+FLUSH_EVERY = 20  # batch di embedding tra un salvataggio parziale e l'altro
+PCA_SAMPLE = 20_000
+INDEX_ROOT = CACHE_DIR / "embeddings"
+VECTORS_NAME = "vectors.f32"
+REDUCED_NAME = "reduced.f32"
+PROJECTION_NAME = "proj.f32"
+META_NAME = "meta.json"
+
+np = None
+
+
+def require_numpy() -> None:
+    global np
+    try:
+        import numpy
+    except ImportError:
+        print("❌ Libreria 'numpy' mancante! Installa con: pip install numpy")
+        sys.exit(1)
+    np = numpy
+
+
+def index_dir(model: str) -> Path:
+    return INDEX_ROOT / re.sub(r"[^A-Za-z0-9._-]+", "_", model)
+
+
+def embedding_text(q: dict) -> str:
+    options = "\n".join(f"- {o.get('text', '')}" for o in q.get("options", []) if isinstance(o, dict))
+    code = f"\n{q['code']}" if q.get("code") else ""
+    return f"{q.get('question', '')}{code}\n{options}".strip()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingIndex:
+    """
+    Matrice (righe × dim) memory-mapped + metadati paralleli per riga.
+
+    Sopra COARSE_MIN_ROWS righe la build salva anche una copia proiettata con PCA a
+    `search_dim` dimensioni: la ricerca scorre quella (molti meno byte da leggere) e
+    ricalcola il coseno esatto solo sui migliori candidati.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        meta_path = directory / META_NAME
+        if not meta_path.exists():
+            raise FileNotFoundError(f"Indice non trovato in {directory} (esegui prima 'build')")
+        with open(meta_path, encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.ids: list[str] = self.meta["ids"]
+        self.rows = len(self.ids)
+        if self.rows:
+            self.vectors = np.memmap(directory / VECTORS_NAME, dtype=np.float32, mode="r",
+                                     shape=(self.rows, self.meta["dim"]))
+        else:
+            # Un file vuoto non si può mappare.
+            self.vectors = np.zeros((0, self.meta["dim"]), dtype=np.float32)
+        self.row_of = {qid: i for i, qid in enumerate(self.ids)}
+        self.reduced = self.proj = None
+        search_dim = self.meta.get("search_dim")
+        if search_dim:
+            self.reduced = np.memmap(directory / REDUCED_NAME, dtype=np.float32, mode="r",
+                                     shape=(self.rows, search_dim))
+            self.proj = np.fromfile(directory / PROJECTION_NAME, dtype=np.float32).reshape(self.meta["dim"], search_dim)
+
+    def top_k(self, query: "np.ndarray", k: int, exclude: int | None = None) -> list[tuple[int, float]]:
+        if self.reduced is not None:
+            return two_stage_top_k(self.vectors, self.reduced, self.proj, query, k, exclude)
+        return top_k(self.vectors, query, k, exclude)
+
+
+def top_k(vectors: "np.ndarray", query: "np.ndarray", k: int, exclude: int | None = None) -> list[tuple[int, float]]:
+    """Coseno su vettori già normalizzati = prodotto scalare; argpartition evita l'ordinamento completo."""
+    k = min(k, vectors.shape[0])
+    if k <= 0:
+        return []
+    scores = vectors @ query
+    if exclude is not None:
+        scores[exclude] = -np.inf
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [(int(i), float(scores[i])) for i in top]
+
+
+def two_stage_top_k(
+    vectors: "np.ndarray",
+    reduced: "np.ndarray",
+    proj: "np.ndarray",
+    query: "np.ndarray",
+    k: int,
+    exclude: int | None = None,
+) -> list[tuple[int, float]]:
+    """Ricerca approssimata sui vettori ridotti, poi coseno esatto sui candidati."""
+    coarse = reduced @ (query @ proj)
+    if exclude is not None:
+        coarse[exclude] = -np.inf
+    n_candidates = min(max(k * RERANK_FACTOR, MIN_CANDIDATES), coarse.shape[0])
+    candidates = np.argpartition(-coarse, n_candidates - 1)[:n_candidates]
+    candidates.sort()  # accesso sequenziale al memmap
+    exact = vectors[candidates] @ query
+    order = np.argsort(-exact)[:k]
+    return [(int(candidates[i]), float(exact[i])) for i in order]
+
+
+def pca_projection(vectors: "np.ndarray", dim: int, seed: int = 0) -> "np.ndarray":
+    """
+    Base (D × dim) dei primi autovettori di XᵀX su un campione di righe.
+
+    Senza centratura: conserva i prodotti scalari, cioè proprio il coseno tra vettori normalizzati.
+    """
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    sample = np.asarray(vectors[np.sort(rng.choice(n, size=min(n, PCA_SAMPLE), replace=False))], dtype=np.float64)
+    _, eigvecs = np.linalg.eigh(sample.T @ sample)
+    return np.ascontiguousarray(eigvecs[:, ::-1][:, :dim], dtype=np.float32)
+
+
+def write_reduced(directory: Path, vectors: "np.ndarray", search_dim: int) -> None:
+    proj = pca_projection(vectors, search_dim)
+    proj.tofile(directory / PROJECTION_NAME)
+    reduced = np.memmap(directory / REDUCED_NAME, dtype=np.float32, mode="w+", shape=(vectors.shape[0], search_dim))
+    for start in range(0, vectors.shape[0], 10000):
+        reduced[start:start + 10000] = vectors[start:start + 10000] @ proj
+    reduced.flush()
+
+
+def normalize_rows(matrix: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (matrix / norms).astype(np.float32)
+
+
+def write_index(directory: Path, model: str, rows: list[dict], known: dict[str, "np.ndarray"], dim: int,
+                search_dim: int = 0) -> int:
+    """Scrive matrice e metadati delle righe che hanno già un vettore; restituisce quante sono."""
+    rows = [r for r in rows if r["hash"] in known]
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / (VECTORS_NAME + ".tmp")
+    if rows:
+        matrix = np.memmap(tmp, dtype=np.float32, mode="w+", shape=(len(rows), dim))
+        for i, r in enumerate(rows):
+            matrix[i] = known[r["hash"]]
+        matrix.flush()
+        del matrix
+    else:
+        tmp.write_bytes(b"")
+    # Nessun file dell'indice deve essere mappato qui: su Windows replace fallirebbe.
+    tmp.replace(directory / VECTORS_NAME)
+
+    if search_dim and len(rows) >= COARSE_MIN_ROWS and dim > search_dim:
+        vectors = np.memmap(directory / VECTORS_NAME, dtype=np.float32, mode="r", shape=(len(rows), dim))
+        write_reduced(directory, vectors, search_dim)
+    else:
+        search_dim = None
+
+    meta = {
+        "model": model,
+        "dim": dim,
+        "search_dim": search_dim,
+        "ids": [r["id"] for r in rows],
+        "hashes": [r["hash"] for r in rows],
+        "rels": [r["rel"] for r in rows],
+        "indices": [r["idx"] for r in rows],
+        "questions": [r["text"].split("\n", 1)[0][:200] for r in rows],
+    }
+    tmp = directory / (META_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    tmp.replace(directory / META_NAME)
+    return len(rows)
+
+
+def build(args: argparse.Namespace) -> int:
+    directory = index_dir(args.model)
+    rows = []
+    for rel, qid, idx, q in iter_quiz_questions():
+        text = embedding_text(q)
+        rows.append({"id": qid, "rel": rel, "idx": idx, "hash": text_hash(text), "text": text})
+    if not rows:
+        print("❌ Nessuna domanda trovata in quizzes/")
+        return 1
+
+    # Vettori già noti, indicizzati per hash del testo.
+    known: dict[str, "np.ndarray"] = {}
+    dim = None
+    if not args.rebuild:
+        try:
+            old = EmbeddingIndex(directory)
+            dim = old.meta["dim"]
+            # Copia in memoria e chiude i memmap: write_index sostituisce proprio quei file.
+            old_vectors = np.array(old.vectors)
+            hashes = old.meta["hashes"]
+            del old
+            for i, h in enumerate(hashes):
+                known[h] = old_vectors[i]
+        except FileNotFoundError:
+            pass
+
+    missing = sorted({r["hash"]: r["text"] for r in rows if r["hash"] not in known}.items())
+    print(f"🔎 Domande: {len(rows)} | vettori riutilizzati: {len(rows) - sum(1 for r in rows if r['hash'] not in known)} "
+          f"| testi da calcolare: {len(missing)}")
+
+    failure = None
+    if missing:
+        verify_connection(args.base_url)
+        start = time.perf_counter()
+        total = (len(missing) + args.batch_size - 1) // args.batch_size
+        done = 0
+        for n, b in enumerate(range(0, len(missing), args.batch_size), start=1):
+            chunk = missing[b:b + args.batch_size]
+            try:
+                vectors = np.asarray(embed(args.base_url, args.api_key, args.model, [t for _, t in chunk]), dtype=np.float32)
+            except (Exception, KeyboardInterrupt) as exc:
+                failure = f"Batch {n}/{total} non riuscito: {exc or type(exc).__name__}"
+                break
+            if dim is None:
+                dim = vectors.shape[1]
+            elif vectors.shape[1] != dim:
+                failure = f"Dimensione degli embedding cambiata ({dim} → {vectors.shape[1]}): usa un modello diverso o --rebuild"
+                break
+            for (h, _), vec in zip(chunk, normalize_rows(vectors)):
+                known[h] = vec
+            done += len(chunk)
+            print(f"✅ Batch {n}/{total}")
+            if n % FLUSH_EVERY == 0 and n < total:
+                # Salvataggio parziale: un errore più avanti non fa perdere i vettori già calcolati.
+                write_index(directory, args.model, rows, known, dim)
+        if done:
+            elapsed = time.perf_counter() - start
+            print(f"⏱️  {done} embedding in {elapsed:.1f}s ({done / elapsed:.1f}/s)")
+
+    if dim is None:
+        print(f"❌ {failure}")
+        return 1
+    saved = write_index(directory, args.model, rows, known, dim, args.search_dim)
+    if failure:
+        print(f"❌ {failure}")
+        print(f"💾 Indice parziale salvato in: {directory} ({saved}/{len(rows)} domande): rilancia 'build' per completarlo")
+        return 1
+    print(f"💾 Indice salvato in: {directory} ({saved} × {dim})")
+    return 0
+
+
+def print_hits(index: EmbeddingIndex, hits: list[tuple[int, float]]) -> None:
+    meta = index.meta
+    for row, score in hits:
+        print(f"  {score:.3f}  {meta['ids'][row]}  {meta['rels'][row]} #{meta['indices'][row]}  {meta['questions'][row][:90]}")
+
+
+def search(args: argparse.Namespace) -> int:
+    index = EmbeddingIndex(index_dir(args.model))
+    if index.rows == 0:
+        print("❌ Indice vuoto: nessuna domanda ha ancora un embedding (esegui 'build')")
+        return 1
+    verify_connection(args.base_url)
+    query = normalize_rows(np.asarray(embed(args.base_url, args.api_key, args.model, [args.query]), dtype=np.float32))[0]
+    start = time.perf_counter()
+    hits = index.top_k(query, args.k)
+    print(f"\n🔎 Top {len(hits)} in {(time.perf_counter() - start) * 1000:.2f} ms su {index.rows} domande:")
+    print_hits(index, hits)
+    return 0
+
+
+def similar(args: argparse.Namespace) -> int:
+    index = EmbeddingIndex(index_dir(args.model))
+    if index.rows == 0:
+        print("❌ Indice vuoto: nessuna domanda ha ancora un embedding (esegui 'build')")
+        return 1
+    row = index.row_of.get(args.id)
+    if row is None:
+        print(f"❌ ID non presente nell'indice: {args.id}")
+        return 1
+    print(f"\n📌 {index.meta['rels'][row]} #{index.meta['indices'][row]}: {index.meta['questions'][row][:90]}")
+    print_hits(index, index.top_k(np.array(index.vectors[row]), args.k, exclude=row))
+    return 0
+
+
+def kmeans(vectors: "np.ndarray", k: int, iterations: int, seed: int = 0) -> tuple["np.ndarray", "np.ndarray"]:
+    """K-means sferico (coseno) con inizializzazione k-means++; restituisce (centroidi, assegnazioni)."""
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    k = min(k, n)
+    centroids = np.empty((k, vectors.shape[1]), dtype=np.float32)
+    centroids[0] = vectors[rng.integers(n)]
+    closest = 1 - vectors @ centroids[0]
+    for c in range(1, k):
+        probs = np.clip(closest, 0, None) ** 2
+        total = probs.sum()
+        pick = rng.choice(n, p=probs / total) if total > 0 else rng.integers(n)
+        centroids[c] = vectors[pick]
+        closest = np.minimum(closest, 1 - vectors @ centroids[c])
+
+    assign = None
+    for _ in range(iterations):
+        new_assign = np.argmax(vectors @ centroids.T, axis=1)
+        if assign is not None and np.array_equal(new_assign, assign):
+            break
+        assign = new_assign
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        empty = np.bincount(assign, minlength=k) == 0
+        sums[empty] = vectors[rng.integers(n, size=int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids, assign
+
+
+def cluster(args: argparse.Namespace) -> int:
+    directory = index_dir(args.model)
+    index = EmbeddingIndex(directory)
+    if index.rows == 0:
+        print("❌ Indice vuoto: nessuna domanda ha ancora un embedding (esegui 'build')")
+        return 1
+    vectors = np.asarray(index.vectors)
+    start = time.perf_counter()
+    centroids, assign = kmeans(vectors, args.clusters, args.iterations)
+    elapsed = time.perf_counter() - start
+
+    clusters = []
+    for c in range(centroids.shape[0]):
+        members = np.flatnonzero(assign == c)
+        if members.size == 0:
+            continue
+        order = members[np.argsort(-(vectors[members] @ centroids[c]))]
+        clusters.append({
+            "cluster": c,
+            "size": int(members.size),
+            "representatives": [index.meta["questions"][i] for i in order[:3]],
+            "ids": [index.ids[i] for i in order],
+        })
+    clusters.sort(key=lambda x: -x["size"])
+    out = directory / "clusters.json"
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"model": args.model, "k": args.clusters, "clusters": clusters}, f, indent=2, ensure_ascii=False)
+
+    print(f"\n🧩 {len(clusters)} cluster su {index.rows} domande in {elapsed:.2f}s")
+    for c in clusters[: args.show]:
+        print(f"  [{c['cluster']}] {c['size']} domande — {c['representatives'][0][:90]}")
+    print(f"💾 Assegnazioni salvate in: {out}")
+    return 0
+
+
+def bench(args: argparse.Namespace) -> int:
+    """
+    Ricerca top-k su una matrice sintetica memory-mapped: esatta e a due stadi (PCA + rerank).
+
+    I vettori sintetici hanno struttura a bassa dimensionalità (fattori latenti + rumore),
+    come gli embedding reali; le query sono varianti rumorose di righe del corpus.
+    """
+    rng = np.random.default_rng(0)
+    directory = INDEX_ROOT / "_bench"
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / VECTORS_NAME
+    mixing = rng.standard_normal((args.latent, args.dim)).astype(np.float32)
+    matrix = np.memmap(path, dtype=np.float32, mode="w+", shape=(args.rows, args.dim))
+    for start in range(0, args.rows, 10000):
+        n = min(10000, args.rows - start)
+        block = rng.standard_normal((n, args.latent)).astype(np.float32) @ mixing
+        block += 0.5 * np.sqrt(args.latent) * rng.standard_normal((n, args.dim)).astype(np.float32)
+        matrix[start:start + n] = normalize_rows(block)
+    matrix.flush()
+    del matrix
+
+    vectors = np.memmap(path, dtype=np.float32, mode="r", shape=(args.rows, args.dim))
+    np.asarray(vectors).sum()  # porta la matrice in page cache
+    start = time.perf_counter()
+    write_reduced(directory, vectors, args.search_dim)
+    reduce_time = time.perf_counter() - start
+    reduced = np.memmap(directory / REDUCED_NAME, dtype=np.float32, mode="r", shape=(args.rows, args.search_dim))
+    proj = np.fromfile(directory / PROJECTION_NAME, dtype=np.float32).reshape(args.dim, args.search_dim)
+
+    seeds = rng.choice(args.rows, size=args.queries, replace=False)
+    queries = normalize_rows(np.asarray(vectors[np.sort(seeds)]) + 0.05 * rng.standard_normal((args.queries, args.dim)))
+
+    def timed(fn) -> tuple[list[float], list[list[tuple[int, float]]]]:
+        timings, results = [], []
+        for q in queries:
+            t0 = time.perf_counter()
+            results.append(fn(q))
+            timings.append((time.perf_counter() - t0) * 1000)
+        return sorted(timings), results
+
+    exact_t, exact_r = timed(lambda q: top_k(vectors, q, args.k))
+    fast_t, fast_r = timed(lambda q: two_stage_top_k(vectors, reduced, proj, q, args.k))
+    recall = np.mean([len({i for i, _ in a} & {i for i, _ in b}) / args.k for a, b in zip(exact_r, fast_r)])
+
+    def pct(t: list[float], p: float) -> float:
+        return t[min(len(t) - 1, int(len(t) * p))]
+
+    print(f"\n📊 Ricerca top-{args.k} su {args.rows} × {args.dim} float32 ({args.rows * args.dim * 4 / 2**20:.0f} MB), "
+          f"{args.queries} query")
+    print(f"  esatta:            p50 {pct(exact_t, 0.5):6.2f} ms | p99 {pct(exact_t, 0.99):6.2f} ms")
+    print(f"  PCA {args.search_dim:>3} + rerank:  p50 {pct(fast_t, 0.5):6.2f} ms | p99 {pct(fast_t, 0.99):6.2f} ms "
+          f"| recall@{args.k}: {recall:.3f}")
+    print(f"  costruzione proiezione: {reduce_time:.1f}s")
+    del vectors, reduced
+    for name in (VECTORS_NAME, REDUCED_NAME, PROJECTION_NAME):
+        (directory / name).unlink()
+    directory.rmdir()
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Indice di embedding delle domande (Ollama + NumPy).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_model_args(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--model", required=True, help="Modello di embedding Ollama (es. nomic-embed-text)")
+        p.add_argument("--base-url", default=DEFAULT_BASE_URL, help=f"URL base di Ollama (default: {DEFAULT_BASE_URL})")
+        p.add_argument("--api-key", default=None, help="API key opzionale (per istanze Ollama con autenticazione)")
+
+    p = sub.add_parser("build", help="Calcola/aggiorna gli embedding di tutte le domande")
+    add_model_args(p)
+    p.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                   help=f"Testi per chiamata a /api/embed (default: {DEFAULT_BATCH_SIZE})")
+    p.add_argument("--rebuild", action="store_true", help="Ignora i vettori già calcolati e ricalcola tutto")
+    p.add_argument("--search-dim", type=int, default=DEFAULT_SEARCH_DIM,
+                   help=f"Dimensioni della copia PCA per la ricerca veloce, 0 = disattivata "
+                        f"(usata sopra {COARSE_MIN_ROWS} domande, default: {DEFAULT_SEARCH_DIM})")
+    p.set_defaults(func=build)
+
+    p = sub.add_parser("search", help="Cerca le domande più simili a un testo")
+    add_model_args(p)
+    p.add_argument("query", help="Testo da cercare")
+    p.add_argument("-k", type=int, default=DEFAULT_TOP_K, help=f"Risultati (default: {DEFAULT_TOP_K})")
+    p.set_defaults(func=search)
+
+    p = sub.add_parser("similar", help="Domande simili a una domanda del corpus (per ID)")
+    add_model_args(p)
+    p.add_argument("id", help="ID della domanda")
+    p.add_argument("-k", type=int, default=DEFAULT_TOP_K, help=f"Risultati (default: {DEFAULT_TOP_K})")
+    p.set_defaults(func=similar)
+
+    p = sub.add_parser("cluster", help="Raggruppa le domande per argomento con k-means")
+    add_model_args(p)
+    p.add_argument("--clusters", type=int, default=DEFAULT_CLUSTERS, help=f"Numero di cluster (default: {DEFAULT_CLUSTERS})")
+    p.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS,
+                   help=f"Iterazioni massime (default: {DEFAULT_ITERATIONS})")
+    p.add_argument("--show", type=int, default=15, help="Cluster da mostrare (default: 15)")
+    p.set_defaults(func=cluster)
+
+    p = sub.add_parser("bench", help="Benchmark della ricerca su una matrice sintetica")
+    p.add_argument("--rows", type=int, default=100_000, help="Righe della matrice (default: 100000)")
+    p.add_argument("--dim", type=int, default=768, help="Dimensione dei vettori (default: 768)")
+    p.add_argument("--queries", type=int, default=200, help="Query da eseguire (default: 200)")
+    p.add_argument("--latent", type=int, default=64, help="Fattori latenti dei dati sintetici (default: 64)")
+    p.add_argument("--search-dim", type=int, default=DEFAULT_SEARCH_DIM,
+                   help=f"Dimensioni della copia PCA (default: {DEFAULT_SEARCH_DIM})")
+    p.add_argument("-k", type=int, default=DEFAULT_TOP_K, help=f"Risultati per query (default: {DEFAULT_TOP_K})")
+    p.set_defaults(func=bench)
+
+    args = parser.parse_args(argv)
+    require_numpy()
+    try:
+        return args.func(args)
+    except FileNotFoundError as exc:
+        print(f"❌ {exc}")
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,268 @@
+"""
+enrich_queue.py — Coda di priorità persistente per `ollama_enrich_quiz.py --queue`.
+
+Ogni domanda da (ri)arricchire diventa un elemento della coda con un punteggio che stima
+la copertura utile ottenuta per unità di lavoro del modello:
+
+    valore = peso corso × urgenza esame × (1 + log(1 + visualizzazioni)) × peso motivo
+    costo  = 1 + lunghezza del prompt della domanda / length_scale
+    score  = valore / costo × retry_decay ^ tentativi falliti
+
+I pesi si configurano con un file JSON (`--priority-config`), le visualizzazioni si importano
+da un CSV di utilizzo con colonne `question_id,views` (`--usage-csv`, gli ID sono quelli stabili
+di `quiz_corpus.question_ids`, gli stessi esposti da `serve_quizzes.py`).
+
+La coda vive in `.cache/enrich_queue.sqlite` (punteggi e tentativi sopravvivono tra le
+esecuzioni) e in memoria in uno heap: estrarre il batch successivo costa O(log n) per
+domanda, e un file aggiunto o modificato durante l'esecuzione entra subito nello heap,
+quindi se ha priorità più alta scavalca il lavoro già in coda al batch seguente.
+"""
+
+from __future__ import annotations
+
+import csv
+import heapq
+import json
+import math
+import sqlite3
+import time
+from datetime import date
+from fnmatch import fnmatch
+from pathlib import Path
+
+from enrich_schedule import REASON_CHANGED, REASON_FORCED, REASON_MISSING, REASON_MODEL, REASON_PROMPT, REASON_QUALITY
+from quiz_corpus import CACHE_DIR
+
+QUEUE_PATH = CACHE_DIR / "enrich_queue.sqlite"
+
+DEFAULT_CONFIG = {
+    # Pattern glob sul path relativo a quizzes/ -> peso; vale il primo pattern che corrisponde.
+    "course_weights": {},
+    # Pattern -> data d'esame (YYYY-MM-DD): il peso cresce fino a `exam_boost` all'avvicinarsi.
+    "exams": {},
+    "exam_horizon_days": 30,
+    "exam_boost": 3.0,
+    "reason_weights": {
+        "missing_both": 4.0,
+        "missing_one": 2.0,
+        "changed": 1.5,
+        "quality": 2.0,
+        "outdated_prompt": 0.5,
+        "upgrade_model": 0.5,
+        "forced": 0.5,
+    },
+    "length_scale": 400,
+    "retry_decay": 0.5,
+    "max_attempts": 3,
+}
+
+_REASON_KEYS = {
+    REASON_CHANGED: "changed",
+    REASON_QUALITY: "quality",
+    REASON_PROMPT: "outdated_prompt",
+    REASON_MODEL: "upgrade_model",
+    REASON_FORCED: "forced",
+}
+
+
+class PriorityConfig:
+    def __init__(self, data: dict | None = None, today: date | None = None):
+        merged = {**DEFAULT_CONFIG, **(data or {})}
+        merged["reason_weights"] = {**DEFAULT_CONFIG["reason_weights"], **(data or {}).get("reason_weights", {})}
+        self.data = merged
+        self.today = today or date.today()
+
+    @classmethod
+    def load(cls, path: str | None) -> "PriorityConfig":
+        if not path:
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        exams = data.get("exams", {}) if isinstance(data, dict) else None
+        if not isinstance(exams, dict):
+            raise ValueError(f"{path}: 'exams' deve essere un oggetto pattern -> data")
+        for pattern, day in exams.items():
+            try:
+                date.fromisoformat(day)
+            except (TypeError, ValueError):
+                raise ValueError(f"{path}: data d'esame non valida per '{pattern}': {day!r} (atteso YYYY-MM-DD)") from None
+        return cls(data)
+
+    def course_weight(self, rel: str) -> float:
+        for pattern, weight in self.data["course_weights"].items():
+            if fnmatch(rel, pattern):
+                return float(weight)
+        return 1.0
+
+    def exam_factor(self, rel: str) -> float:
+        horizon = self.data["exam_horizon_days"]
+        for pattern, day in self.data["exams"].items():
+            if fnmatch(rel, pattern):
+                days_left = (date.fromisoformat(day) - self.today).days
+                if 0 <= days_left <= horizon:
+                    return 1 + (self.data["exam_boost"] - 1) * (1 - days_left / horizon)
+                return 1.0
+        return 1.0
+
+    def reason_weight(self, reason: str, q: dict) -> float:
+        if reason == REASON_MISSING:
+            has_explanation = bool(str(q.get("explanation", "")).strip())
+            has_hint = bool(str(q.get("hint", "")).strip())
+            key = "missing_one" if has_explanation or has_hint else "missing_both"
+        else:
+            key = _REASON_KEYS.get(reason, "forced")
+        return float(self.data["reason_weights"][key])
+
+    def base_score(self, rel: str, q: dict, reason: str, views: int) -> float:
+        prompt_chars = (
+            len(str(q.get("question", ""))) + len(str(q.get("code", "")))
+            + sum(len(str(o.get("text", ""))) for o in q.get("options", []) if isinstance(o, dict))
+        )
+        value = (
+            self.course_weight(rel) * self.exam_factor(rel)
+            * (1 + math.log1p(max(views, 0))) * self.reason_weight(reason, q)
+        )
+        return value / (1 + prompt_chars / self.data["length_scale"])
+
+
+def load_usage_csv(path: str | None) -> dict[str, int]:
+    """Visualizzazioni per ID domanda; le righe ripetute vengono sommate."""
+    if not path:
+        return {}
+    views: dict[str, int] = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = {"question_id", "views"} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"{path}: colonne mancanti {', '.join(sorted(missing))}")
+        for row in reader:
+            try:
+                views[row["question_id"]] = views.get(row["question_id"], 0) + int(row["views"] or 0)
+            except ValueError:
+                continue
+    return views
+
+
+class WorkQueue:
+    """Coda persistente (SQLite) con heap in memoria e cancellazione pigra degli elementi superati."""
+
+    def __init__(self, config: PriorityConfig, path: Path = QUEUE_PATH, read_only: bool = False):
+        self.config = config
+        if read_only:
+            # Per --plan-only: si lavora su una copia in memoria, il file non viene creato né modificato.
+            self.conn = sqlite3.connect(":memory:")
+            if path.exists():
+                source = sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True)
+                source.backup(self.conn)
+                source.close()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " question_id TEXT PRIMARY KEY, rel TEXT NOT NULL, fingerprint TEXT NOT NULL,"
+            " reason TEXT NOT NULL, base_score REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+            " updated_at REAL NOT NULL)"
+        )
+        self.items: dict[str, dict] = {}
+        self.heap: list[tuple[float, str, int]] = []
+        self._version = 0
+        for qid, rel, fp, reason, base, attempts in self.conn.execute(
+            "SELECT question_id, rel, fingerprint, reason, base_score, attempts FROM items"
+        ):
+            self._push({"question_id": qid, "rel": rel, "fingerprint": fp, "reason": reason,
+                        "base_score": base, "attempts": attempts})
+
+    def __len__(self) -> int:
+        return sum(1 for item in self.items.values() if self.live(item))
+
+    def live(self, item: dict) -> bool:
+        """Falso per le domande oltre `max_attempts`: restano in `items` per conservarne i tentativi."""
+        return item["attempts"] < self.config.data["max_attempts"]
+
+    def score(self, item: dict) -> float:
+        return item["base_score"] * self.config.data["retry_decay"] ** item["attempts"]
+
+    def _push(self, item: dict) -> None:
+        self._version += 1
+        item["version"] = self._version
+        self.items[item["question_id"]] = item
+        heapq.heappush(self.heap, (-self.score(item), item["question_id"], self._version))
+
+    def sync_file(self, rel: str, entries: list[dict]) -> int:
+        """
+        Allinea la coda al piano attuale di un file: entries = [{question_id, fingerprint, reason, base_score}].
+
+        I tentativi falliti si conservano solo se il contenuto della domanda non è cambiato.
+        Restituisce quante domande del file sono in coda (escluse quelle oltre `max_attempts`).
+        """
+        current = {e["question_id"] for e in entries}
+        stale = [qid for qid, item in self.items.items() if item["rel"] == rel and qid not in current]
+        for qid in stale:
+            del self.items[qid]
+        now = time.time()
+        for e in entries:
+            old = self.items.get(e["question_id"])
+            attempts = old["attempts"] if old and old["fingerprint"] == e["fingerprint"] else 0
+            self._push({**e, "rel": rel, "attempts": attempts})
+        self.conn.execute("DELETE FROM items WHERE rel = ?", (rel,))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(qid, rel, self.items[qid]["fingerprint"], self.items[qid]["reason"],
+              self.items[qid]["base_score"], self.items[qid]["attempts"], now) for qid in current],
+        )
+        self.conn.commit()
+        return sum(1 for qid in current if self.live(self.items[qid]))
+
+    def drop_missing_files(self, rels: set[str]) -> None:
+        gone = {item["rel"] for item in self.items.values()} - rels
+        for rel in gone:
+            self.sync_file(rel, [])
+
+    def pop_batch(self, n: int) -> list[dict]:
+        """Le `n` domande con score più alto (esclusi gli elementi oltre `max_attempts`)."""
+        batch = []
+        while self.heap and len(batch) < n:
+            _, qid, version = heapq.heappop(self.heap)
+            item = self.items.get(qid)
+            if item is None or item["version"] != version:
+                continue
+            if not self.live(item):
+                continue
+            batch.append(item)
+        return batch
+
+    def done(self, qids: list[str]) -> None:
+        for qid in qids:
+            self.items.pop(qid, None)
+        self.conn.executemany("DELETE FROM items WHERE question_id = ?", [(q,) for q in qids])
+        self.conn.commit()
+
+    def failed(self, items: list[dict]) -> None:
+        """
+        Conta un tentativo fallito e rimette in coda le domande estratte.
+
+        Si aggiorna l'elemento attuale della coda, non quello estratto: durante il batch il file
+        può essere stato ripianificato. Se nel frattempo il contenuto è cambiato (o la domanda
+        non è più in coda) il tentativo non conta.
+        """
+        updated = []
+        for item in items:
+            current = self.items.get(item["question_id"])
+            if current is None or current["fingerprint"] != item["fingerprint"]:
+                continue
+            current["attempts"] += 1
+            self._push(current)
+            updated.append(current)
+        self.conn.executemany(
+            "UPDATE items SET attempts = ?, updated_at = ? WHERE question_id = ?",
+            [(item["attempts"], time.time(), item["question_id"]) for item in updated],
+        )
+        self.conn.commit()
+
+    def top(self, n: int) -> list[dict]:
+        ranked = sorted((item for item in self.items.values() if self.live(item)), key=lambda item: -self.score(item))
+        return [{**item, "score": self.score(item)} for item in ranked[:n]]
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,211 @@
+"""
+enrich_schedule.py — Decide quali domande vanno (ri)arricchite da `ollama_enrich_quiz.py`.
+
+Per ogni domanda arricchita viene registrato in `.cache/enrich_state.sqlite` il fingerprint
+del contenuto (testo, codice, immagine, opzioni, risposta) su cui è stata generata la coppia
+explanation/hint, insieme a modello e versione del prompt. I record sono indicizzati per
+file e per hash della coppia explanation/hint: così si ritrovano anche se la domanda è stata
+spostata o il suo testo è cambiato (e con esso l'ID stabile).
+
+Una domanda viene messa in coda se:
+- explanation o hint mancano;
+- la coppia explanation/hint è quella generata da noi ma il contenuto è cambiato da allora;
+- è stata generata con una versione del prompt più vecchia o con un modello da aggiornare;
+- la coppia explanation/hint è quella generata da noi ed è stata bocciata da `quality_gate.py`.
+
+Se la coppia explanation/hint è stata modificata a mano dopo l'enrich non corrisponde più a
+nessun record e la domanda non viene toccata, neanche se bocciata dal controllo di qualità.
+
+Con `--since <ref>` il lavoro si limita ai file cambiati in git (`<ref>` contro l'albero di
+lavoro, oppure un intervallo `A..B`/`A...B`); per questi file la versione al commit base vale
+come riferimento aggiuntivo, quindi si rilevano spiegazioni obsolete anche su domande
+arricchite prima che esistesse lo stato.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import subprocess
+import time
+from pathlib import Path
+
+from quality_gate import quality_key
+from quiz_corpus import CACHE_DIR, ROOT, content_fingerprint, question_ids
+
+STATE_PATH = CACHE_DIR / "enrich_state.sqlite"
+
+REASON_MISSING = "mancante"
+REASON_FORCED = "forzato"
+REASON_CHANGED = "contenuto modificato"
+REASON_PROMPT = "prompt obsoleto"
+REASON_MODEL = "modello da aggiornare"
+REASON_QUALITY = "qualità insufficiente"
+
+
+class GitError(RuntimeError):
+    pass
+
+
+def output_hash(q: dict) -> str | None:
+    """Hash della coppia explanation/hint; None se una delle due manca."""
+    explanation = str(q.get("explanation", "")).strip()
+    hint = str(q.get("hint", "")).strip()
+    if not (explanation and hint):
+        return None
+    return hashlib.sha256(f"{explanation}\0{hint}".encode("utf-8")).hexdigest()[:32]
+
+
+class EnrichState:
+    """
+    Stato SQLite degli enrich: una riga per (file, coppia explanation/hint, contenuto).
+
+    Il fingerprint fa parte della chiave perché domande diverse dello stesso file possono
+    ricevere la stessa coppia explanation/hint.
+    """
+
+    def __init__(self, path: Path = STATE_PATH, read_only: bool = False):
+        if read_only:
+            # Per --plan-only: si lavora su una copia in memoria, il file non viene creato né modificato.
+            # La tabella si crea sulla copia, quindi un file senza tabella vale come stato vuoto.
+            self.conn = sqlite3.connect(":memory:")
+            if path.exists():
+                source = sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True)
+                source.backup(self.conn)
+                source.close()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS enrichments ("
+            " rel TEXT NOT NULL, output_hash TEXT NOT NULL, question_id TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL, model TEXT NOT NULL, prompt_version INTEGER NOT NULL,"
+            " enriched_at REAL NOT NULL, PRIMARY KEY (rel, output_hash, fingerprint))"
+        )
+
+    def records(self, rel: str) -> dict[str, dict[str, dict]]:
+        """Record del file: hash explanation/hint -> fingerprint -> dettagli."""
+        cur = self.conn.execute(
+            "SELECT output_hash, fingerprint, question_id, model, prompt_version FROM enrichments WHERE rel = ?",
+            (rel,),
+        )
+        records: dict[str, dict[str, dict]] = {}
+        for h, fp, qid, model, pv in cur.fetchall():
+            records.setdefault(h, {})[fp] = {"question_id": qid, "model": model, "prompt_version": pv}
+        return records
+
+    def record(self, rel: str, questions: list[tuple[str, dict]], model: str, prompt_version: int) -> None:
+        """Registra le domande appena arricchite: lista di (ID, domanda già aggiornata)."""
+        now = time.time()
+        rows = []
+        for qid, q in questions:
+            h = output_hash(q)
+            if h is not None:
+                rows.append((rel, h, qid, content_fingerprint(q), model, prompt_version, now))
+        self.conn.executemany("INSERT OR REPLACE INTO enrichments VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def _git(*args: str) -> str:
+    try:
+        out = subprocess.run(["git", *args], cwd=str(ROOT), capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError) as exc:
+        stderr = getattr(exc, "stderr", "") or str(exc)
+        raise GitError(f"git {' '.join(args)}: {stderr.strip()}") from exc
+    return out.stdout
+
+
+def git_changed_files(since: str, quizzes_dir: str = "quizzes") -> tuple[list[str], str]:
+    """
+    File JSON sotto `quizzes_dir` cambiati da `since`; restituisce (rel, commit base).
+
+    `since` può essere un ref (confronto con l'albero di lavoro, inclusi i file non tracciati)
+    oppure un intervallo `A..B` / `A...B`.
+    """
+    if "..." in since:
+        left, right = since.split("...", 1)
+        base = _git("merge-base", left or "HEAD", right or "HEAD").strip()
+        names = _git("diff", "--name-only", "--diff-filter=d", since, "--", quizzes_dir).splitlines()
+    elif ".." in since:
+        left, _ = since.split("..", 1)
+        base = left or "HEAD"
+        names = _git("diff", "--name-only", "--diff-filter=d", since, "--", quizzes_dir).splitlines()
+    else:
+        base = since
+        names = _git("diff", "--name-only", "--diff-filter=d", since, "--", quizzes_dir).splitlines()
+        names += _git("ls-files", "--others", "--exclude-standard", "--", quizzes_dir).splitlines()
+
+    prefix = quizzes_dir.rstrip("/") + "/"
+    rels = sorted({n[len(prefix):] for n in names if n.startswith(prefix) and n.endswith(".json")})
+    return [r for r in rels if not any(part.startswith("_") for part in r.split("/"))], base
+
+
+def git_file_at(base: str, rel: str, quizzes_dir: str = "quizzes") -> list[dict] | None:
+    """Contenuto del file al commit base; None se non esisteva o non era un array JSON."""
+    try:
+        raw = _git("show", f"{base}:{quizzes_dir}/{rel}")
+        data = json.loads(raw)
+    except (GitError, json.JSONDecodeError):
+        return None
+    return data if isinstance(data, list) else None
+
+
+def plan_file(
+    rel: str,
+    quiz_data: list[dict],
+    state: EnrichState | None,
+    prompt_version: int,
+    force: bool = False,
+    base_data: list[dict] | None = None,
+    upgrade_models: set[str] | None = None,
+    quality_failed: set[str] | None = None,
+) -> list[tuple[int, str]]:
+    """
+    Domande da arricchire nel file, come lista di (indice, motivo).
+
+    `quality_failed` sono le chiavi bocciate da `quality_gate.py` (vedi `QualityCache.failing`):
+    contano solo per le coppie explanation/hint registrate nello stato, mai per quelle scritte a mano.
+    """
+    records = state.records(rel) if state is not None else {}
+    # Dalla versione base: coppia explanation/hint -> fingerprint dei contenuti di allora.
+    base_fingerprints: dict[str, set[str]] = {}
+    for q in base_data or []:
+        h = output_hash(q) if isinstance(q, dict) else None
+        if h is not None:
+            base_fingerprints.setdefault(h, set()).add(content_fingerprint(q))
+
+    plan = []
+    for idx, q in enumerate(quiz_data):
+        h = output_hash(q)
+        if force:
+            plan.append((idx, REASON_FORCED))
+            continue
+        if h is None:
+            plan.append((idx, REASON_MISSING))
+            continue
+        fingerprint = content_fingerprint(q)
+        by_fingerprint = records.get(h)
+        if by_fingerprint:
+            rec = by_fingerprint.get(fingerprint)
+            if rec is None:
+                plan.append((idx, REASON_CHANGED))
+            elif quality_failed and quality_key(q) in quality_failed:
+                plan.append((idx, REASON_QUALITY))
+            elif rec["prompt_version"] < prompt_version:
+                plan.append((idx, REASON_PROMPT))
+            elif upgrade_models and rec["model"] in upgrade_models:
+                plan.append((idx, REASON_MODEL))
+        elif h in base_fingerprints and fingerprint not in base_fingerprints[h]:
+            plan.append((idx, REASON_CHANGED))
+    return plan
+
+
+def record_enriched(
+    state: EnrichState, rel: str, quiz_data: list[dict], indices: list[int], model: str, prompt_version: int
+) -> None:
+    ids = question_ids(rel, quiz_data)
+    state.record(rel, [(ids[i], quiz_data[i]) for i in indices], model, prompt_version)
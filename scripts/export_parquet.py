@@ -0,0 +1,300 @@
+"""
+export_parquet.py — Esporta il corpus in tabelle Parquet per analisi con pandas, DuckDB o Arrow.
+
+Uso:
+    python scripts/export_parquet.py [--out exports/parquet] [--images hash|table|none] [--full]
+
+Tabelle:
+- `questions.parquet`: una riga per domanda a risposta multipla (testo, codice, explanation,
+  hint, numero di opzioni, correctIndex, hash dell'immagine, fingerprint del contenuto);
+- `options.parquet`: una riga per opzione, in forma lunga, con `is_correct`;
+- `open_questions.parquet`: una riga per domanda aperta;
+- `images.parquet`: solo con `--images table`, hash → byte dell'immagine (distinte per file);
+- `files.parquet`: metadati dei file sorgente (università, facoltà, sorgente, corso, hash).
+
+Le immagini base64 non finiscono nelle tabelle delle domande: con `hash` (default) resta solo
+lo SHA-256 dei byte decodificati, con `none` neanche quello. Le colonne a bassa cardinalità
+(università, facoltà, sorgente, corso, file) sono di tipo dictionary: pandas le legge come
+`category`.
+
+Ogni file sorgente viene convertito in una parte in `_parts/<tabella>/` e le parti vengono poi
+concatenate in un unico file per tabella (leggere centinaia di file piccoli è molto più lento
+che leggerne uno). Le esecuzioni successive riconvertono solo i file sorgente cambiati (stato
+in `_state.json`) e riconcatenano le tabelle interessate, senza rileggere i JSON invariati.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import binascii
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from quiz_corpus import (
+    OPEN_QUESTIONS_DIR,
+    QUIZZES_DIR,
+    ROOT,
+    content_fingerprint,
+    iter_json_files,
+    path_parts,
+    question_ids,
+    rel_path,
+)
+
+DEFAULT_OUT = "exports/parquet"
+STATE_NAME = "_state.json"
+PARTS_DIR = "_parts"
+STATE_VERSION = 1
+SOURCES = (("quiz", QUIZZES_DIR), ("open", OPEN_QUESTIONS_DIR))
+PART_TABLES = ("questions", "options", "open_questions", "images")
+GROUP_COLUMNS = ("source", "university", "faculty", "source_dir", "course")
+
+pa = None
+pq = None
+
+
+def require_pyarrow() -> None:
+    global pa, pq
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        print("❌ Libreria 'pyarrow' mancante! Installa con: pip install pyarrow")
+        sys.exit(1)
+    pa = pyarrow
+    pq = pyarrow.parquet
+
+
+def schemas(dictionary: bool) -> dict:
+    group = pa.dictionary(pa.int32(), pa.string()) if dictionary else pa.string()
+    groups = [pa.field(name, group) for name in GROUP_COLUMNS]
+    return {
+        "questions": pa.schema([
+            pa.field("question_id", pa.string()), *groups, pa.field("idx", pa.int32()),
+            pa.field("question", pa.string()), pa.field("code", pa.string()),
+            pa.field("explanation", pa.string()), pa.field("hint", pa.string()),
+            pa.field("n_options", pa.int16()), pa.field("correct_index", pa.int16()),
+            pa.field("has_image", pa.bool_()), pa.field("image_sha256", pa.string()),
+            pa.field("fingerprint", pa.string()),
+        ]),
+        "options": pa.schema([
+            pa.field("question_id", pa.string()), pa.field("source", group), pa.field("idx", pa.int32()),
+            pa.field("option_index", pa.int16()), pa.field("text", pa.string()),
+            pa.field("is_correct", pa.bool_()), pa.field("image_sha256", pa.string()),
+        ]),
+        "open_questions": pa.schema([
+            pa.field("question_id", pa.string()), *groups, pa.field("idx", pa.int32()),
+            pa.field("text", pa.string()), pa.field("reference_answer", pa.string()), pa.field("hint", pa.string()),
+        ]),
+        "images": pa.schema([pa.field("image_sha256", pa.string()), pa.field("data", pa.binary())]),
+        "files": pa.schema([
+            pa.field("source", pa.string()), pa.field("kind", pa.string()),
+            *[pa.field(name, group) for name in GROUP_COLUMNS[1:]],
+            pa.field("questions", pa.int32()), pa.field("bytes", pa.int64()), pa.field("sha256", pa.string()),
+        ]),
+    }
+
+
+def image_ref(value, images: str, blobs: dict[str, bytes]) -> str | None:
+    """Hash SHA-256 dei byte dell'immagine base64 (None se assente o con `--images none`)."""
+    if not value or images == "none":
+        return None
+    raw = str(value).encode("utf-8")
+    try:
+        data = base64.b64decode(raw, validate=True)
+    except (binascii.Error, ValueError):
+        data = raw
+    digest = hashlib.sha256(data).hexdigest()
+    if images == "table":
+        blobs.setdefault(digest, data)
+    return digest
+
+
+def rows_for_file(kind: str, source: str, rel: str, data: list, images: str) -> dict[str, list[dict]]:
+    parts = path_parts(rel)
+    group = {"source": source, **{k: parts[k] for k in GROUP_COLUMNS[1:]}}
+    rows: dict[str, list[dict]] = {name: [] for name in PART_TABLES}
+    blobs: dict[str, bytes] = {}
+    if kind == "open":
+        for idx, (qid, q) in enumerate(zip(question_ids(rel, data, text_field="text"), data)):
+            if not isinstance(q, dict):
+                continue
+            rows["open_questions"].append({
+                "question_id": qid, **group, "idx": idx, "text": str(q.get("text", "")),
+                "reference_answer": str(q.get("referenceAnswer", "")), "hint": str(q.get("hint", "")),
+            })
+        return rows
+
+    for idx, (qid, q) in enumerate(zip(question_ids(rel, data), data)):
+        if not isinstance(q, dict):
+            continue
+        options = q.get("options") if isinstance(q.get("options"), list) else []
+        correct = q.get("correctIndex")
+        correct = correct if isinstance(correct, int) and 0 <= correct < len(options) else None
+        rows["questions"].append({
+            "question_id": qid, **group, "idx": idx,
+            "question": str(q.get("question", "")), "code": str(q.get("code", "")),
+            "explanation": str(q.get("explanation", "")), "hint": str(q.get("hint", "")),
+            "n_options": len(options), "correct_index": correct,
+            "has_image": bool(q.get("image")), "image_sha256": image_ref(q.get("image"), images, blobs),
+            "fingerprint": content_fingerprint(q),
+        })
+        for j, o in enumerate(options):
+            o = o if isinstance(o, dict) else {"text": str(o)}
+            rows["options"].append({
+                "question_id": qid, "source": source, "idx": idx, "option_index": j,
+                "text": str(o.get("text", "")), "is_correct": j == correct,
+                "image_sha256": image_ref(o.get("image"), images, blobs),
+            })
+    rows["images"] = [{"image_sha256": h, "data": b} for h, b in blobs.items()]
+    return rows
+
+
+def part_name(source: str) -> str:
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16] + ".parquet"
+
+
+def write_table(path: Path, rows: list[dict], schema, compression: str, dictionary: bool) -> None:
+    table = pa.Table.from_pylist(rows, schema=schema)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(table, tmp, compression=compression, use_dictionary=dictionary)
+    os.replace(tmp, path)
+
+
+def consolidate(path: Path, parts: list[Path], schema, compression: str, dictionary: bool) -> None:
+    """Concatena le parti in un'unica tabella (dizionari unificati, un solo chunk per colonna)."""
+    tables = [pq.read_table(p, schema=schema) for p in parts]
+    table = pa.concat_tables(tables) if tables else schema.empty_table()
+    table = table.unify_dictionaries().combine_chunks()
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(table, tmp, compression=compression, use_dictionary=dictionary)
+    os.replace(tmp, path)
+
+
+def load_state(out_dir: Path) -> dict:
+    try:
+        with open(out_dir / STATE_NAME, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def export(
+    out_dir: Path,
+    sources=SOURCES,
+    images: str = "hash",
+    compression: str = "zstd",
+    dictionary: bool = True,
+    full: bool = False,
+    base_dir: Path = ROOT,
+) -> dict:
+    """
+    Esporta (o aggiorna) le tabelle in `out_dir`; restituisce statistiche dell'esecuzione.
+
+    Lo stato salvato ricorda hash e parte di ogni file sorgente: se le opzioni di export
+    cambiano, o con `full=True`, tutte le parti vengono riscritte.
+    """
+    options = {"version": STATE_VERSION, "images": images, "compression": compression, "dictionary": dictionary}
+    state = load_state(out_dir)
+    if full or state.get("options") != options:
+        state = {"options": options, "files": {}}
+        for name in PART_TABLES:
+            for old in (out_dir / PARTS_DIR / name).glob("*.parquet"):
+                old.unlink()
+    table_schemas = schemas(dictionary)
+    parts_dir = out_dir / PARTS_DIR
+
+    seen = set()
+    written = 0
+    changed_tables: set[str] = set()
+    for kind, base in sources:
+        for path in iter_json_files(base):
+            raw = path.read_bytes()
+            try:
+                data = json.loads(raw)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(data, list):
+                continue
+            source = path.relative_to(base_dir).as_posix()
+            seen.add(source)
+            digest = hashlib.sha256(raw).hexdigest()
+            if state["files"].get(source, {}).get("sha256") == digest:
+                continue
+            rows = rows_for_file(kind, source, rel_path(path, base), data, images)
+            part = part_name(source)
+            for name, table_rows in rows.items():
+                target = parts_dir / name / part
+                if table_rows:
+                    write_table(target, table_rows, table_schemas[name], compression, dictionary)
+                    changed_tables.add(name)
+                elif target.exists():
+                    target.unlink()
+                    changed_tables.add(name)
+            state["files"][source] = {
+                "kind": kind, "rel": rel_path(path, base), "sha256": digest, "bytes": len(raw),
+                "questions": len(rows["questions"]) + len(rows["open_questions"]),
+            }
+            written += 1
+
+    removed = sorted(set(state["files"]) - seen)
+    for source in removed:
+        for name in PART_TABLES:
+            target = parts_dir / name / part_name(source)
+            if target.exists():
+                target.unlink()
+                changed_tables.add(name)
+        del state["files"][source]
+
+    for name in PART_TABLES:
+        if name in changed_tables or not (out_dir / f"{name}.parquet").exists():
+            parts = [parts_dir / name / part_name(source) for source in sorted(state["files"])]
+            consolidate(out_dir / f"{name}.parquet", [p for p in parts if p.exists()],
+                        table_schemas[name], compression, dictionary)
+
+    files_rows = [
+        {"source": source, "kind": info["kind"], **{k: path_parts(info["rel"])[k] for k in GROUP_COLUMNS[1:]},
+         "questions": info["questions"], "bytes": info["bytes"], "sha256": info["sha256"]}
+        for source, info in sorted(state["files"].items())
+    ]
+    write_table(out_dir / "files.parquet", files_rows, table_schemas["files"], compression, dictionary)
+    with open(out_dir / STATE_NAME, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    return {"files": len(state["files"]), "written": written, "removed": len(removed),
+            "questions": sum(info["questions"] for info in state["files"].values())}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Esporta il corpus in tabelle Parquet (incrementale).")
+    parser.add_argument("--out", default=DEFAULT_OUT, help=f"Cartella di output (default: {DEFAULT_OUT})")
+    parser.add_argument("--images", choices=["hash", "table", "none"], default="hash",
+                        help="Immagini: solo hash (default), hash + tabella images, oppure escluse")
+    parser.add_argument("--compression", choices=["zstd", "snappy", "gzip", "none"], default="zstd",
+                        help="Compressione Parquet (default: zstd)")
+    parser.add_argument("--no-dictionary", action="store_true",
+                        help="Disattiva il dictionary encoding (colonne stringa semplici)")
+    parser.add_argument("--full", action="store_true", help="Riesporta tutti i file, non solo quelli cambiati")
+    args = parser.parse_args(argv)
+    require_pyarrow()
+
+    out_dir = Path(args.out)
+    if not out_dir.is_absolute():
+        out_dir = ROOT / out_dir
+    start = time.perf_counter()
+    stats = export(out_dir, images=args.images, compression=args.compression,
+                   dictionary=not args.no_dictionary, full=args.full)
+    elapsed = time.perf_counter() - start
+    print(f"📦 Export in: {out_dir}")
+    print(f"📚 File: {stats['files']} | Domande: {stats['questions']}")
+    print(f"✏️  File riscritti: {stats['written']} | rimossi: {stats['removed']} | tempo: {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,26 +1,39 @@
+import argparse
 import os
 import json
 import sys
 from pathlib import Path
 
-try:
-    from google import genai
-    import fitz  # PyMuPDF
-    from dotenv import load_dotenv
-except ImportError:
-    print("❌ Librerie mancanti! Installa con: pip install google-genai pymupdf python-dotenv")
-    sys.exit(1)
+# Le librerie pesanti (google-genai, PyMuPDF) e il client Gemini vengono caricati solo
+# quando servono, così `--help` e l'import da quiz_cli.py restano immediati.
+_client = None
 
-load_dotenv()
-API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY or API_KEY == "tua_chiave_qui":
-    print("⚠️  API Key non configurata nel file .env.")
+def missing_libraries():
+    print("❌ Librerie mancanti! Installa con: pip install google-genai pymupdf python-dotenv")
     sys.exit(1)
 
-client = genai.Client(api_key=API_KEY)
+def get_client():
+    """Crea (una sola volta) il client Gemini leggendo la API key da .env."""
+    global _client
+    if _client is not None:
+        return _client
+    try:
+        from google import genai
+        from dotenv import load_dotenv
+    except ImportError:
+        missing_libraries()
+
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key or api_key == "tua_chiave_qui":
+        print("⚠️  API Key non configurata nel file .env.")
+        sys.exit(1)
+    _client = genai.Client(api_key=api_key)
+    return _client
 
 def get_available_models():
     """Recupera la lista dei modelli disponibili."""
+    client = get_client()
     try:
         models = []
         for m in client.models.list():
@@ -37,10 +50,15 @@ def int_to_hex(color_int):
     b = color_int & 0xFF
     return f"#{r:02x}{g:02x}{b:02x}"
 
-def extract_text_with_colors(pdf_path):
+def extract_text_with_colors(pdf_path, verbose=True):
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        missing_libraries()
     doc = fitz.open(pdf_path)
     annotated_text = ""
-    print(f"📖 Estrazione testo e colori da '{pdf_path.name}'...")
+    if verbose:
+        print(f"📖 Estrazione testo e colori da '{pdf_path.name}'...")
     
     for page_num, page in enumerate(doc):
         blocks = page.get_text("dict")["blocks"]
@@ -59,10 +77,12 @@ def extract_text_with_colors(pdf_path):
         annotated_text += f"\n--- FINE PAGINA {page_num + 1} ---\n"
     return annotated_text
 
-def generate_quiz(text_content, model_name):
-    print(f"🤖 Generazione quiz con {model_name}...")
+def community_path(pdf_path):
+    """Destinazione del quiz generato: `<facoltà>/community/<nome_pdf>.json` (spazi sostituiti da _)."""
+    return pdf_path.parent.parent / "community" / (pdf_path.stem.replace(" ", "_") + ".json")
 
-    prompt = f"""Sei un assistente specializzato nella conversione di quiz universitari da PDF a formato JSON strutturato.
+def build_generation_prompt(text_content):
+    return f"""Sei un assistente specializzato nella conversione di quiz universitari da PDF a formato JSON strutturato.
 
 COMPITO:
 Analizza il testo estratto da un PDF e converti OGNI domanda trovata in un oggetto JSON.
@@ -111,26 +131,85 @@ TESTO ESTRATTO DAL PDF:
 {text_content[:60000]}
 
 Restituisci ESCLUSIVAMENTE un array JSON valido, senza testo aggiuntivo, commenti o blocchi markdown:"""
-    
+
+def record_usage(usage, response):
+    """Somma in `usage` i token di una risposta Gemini (stesse chiavi di `ollama_enrich_quiz.chat`)."""
+    meta = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(meta, "prompt_token_count", None) or 0
+    completion_tokens = getattr(meta, "candidates_token_count", None) or 0
+    usage["calls"] = usage.get("calls", 0) + 1
+    usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + prompt_tokens
+    usage["completion_tokens"] = usage.get("completion_tokens", 0) + completion_tokens
+    return prompt_tokens + completion_tokens
+
+
+def generate_quiz(text_content, model_name, structured=False, usage=None):
+    """
+    Genera il quiz con Gemini. Con `structured=True` lo schema di `schema/schema.json` viene
+    passato come `response_schema` e l'output validato prima di essere restituito.
+
+    Se `usage` è un dict, vi vengono sommati chiamate e token; una risposta scartata conta
+    come `parse_failures` e i suoi token come `wasted_tokens`.
+    """
+    print(f"🤖 Generazione quiz con {model_name}{' (output strutturato)' if structured else ''}...")
+    prompt = build_generation_prompt(text_content)
+
+    config = None
+    schema = None
+    if structured:
+        from structured_output import decode, generation_schema, to_gemini_schema
+        schema = generation_schema()
+        config = {"response_mime_type": "application/json", "response_schema": to_gemini_schema(schema)}
     try:
-        response = client.models.generate_content(model=model_name, contents=prompt)
-        text = response.text.strip()
+        response = get_client().models.generate_content(model=model_name, contents=prompt, config=config)
+    except Exception as e:
+        print(f"❌ Errore AI: {e}")
+        return None
+    spent = record_usage(usage, response) if usage is not None else 0
+
+    def discard(message):
+        print(message)
+        if usage is not None:
+            usage["parse_failures"] = usage.get("parse_failures", 0) + 1
+            usage["wasted_tokens"] = usage.get("wasted_tokens", 0) + spent
+        return None
+
+    # Senza testo (blocco di sicurezza o nessun candidato) `response.text` è None.
+    text = response.text
+    if not text:
+        return discard("❌ Errore AI: risposta vuota (contenuto bloccato o nessun candidato)")
+
+    if structured:
+        quiz_data, errors = decode(text, schema)
+        if errors:
+            return discard(f"❌ Output non conforme allo schema ({len(errors)} errori), es.: {errors[0]}")
+        return quiz_data
+
+    try:
+        text = text.strip()
         if "```json" in text:
             text = text.split("```json")[1].split("```")[0].strip()
         elif "```" in text:
             text = text.split("```")[1].strip()
         return json.loads(text)
     except Exception as e:
-        print(f"❌ Errore AI: {e}")
-        return None
+        return discard(f"❌ Errore AI: {e}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Converte un PDF di quiz in JSON strutturato con Gemini (selezione interattiva di PDF e modello)."
+    )
+    parser.add_argument("--structured", action="store_true",
+                        help="Vincola l'output di Gemini allo schema di schema/schema.json (response_schema)")
+    args = parser.parse_args(argv)
+    get_client()
 
-def main():
     quizzes_root = Path("quizzes")
     pdf_files = list(quizzes_root.glob("**/_docs/*.pdf"))
     
     if not pdf_files:
         print("❌ Nessun PDF trovato.")
-        return
+        return 1
 
     print("\n--- SELEZIONE DOCUMENTO ---")
     for i, f in enumerate(pdf_files):
@@ -138,7 +217,7 @@ def main():
     try:
         sel_f = int(input("\nScegli il file: ")) - 1
         selected_file = pdf_files[sel_f]
-    except: return
+    except: return 1
 
     models = get_available_models()
     print("\n--- SELEZIONE MODELLO ---")
@@ -150,17 +229,16 @@ def main():
     except: model_name = "gemini-2.0-flash"
 
     text_content = extract_text_with_colors(selected_file)
-    quiz_data = generate_quiz(text_content, model_name)
+    quiz_data = generate_quiz(text_content, model_name, structured=args.structured)
     
     if quiz_data:
-        dest_dir = selected_file.parent.parent / "community"
-        dest_dir.mkdir(exist_ok=True)
-        # Normalizziamo il nome del file sostituendo gli spazi con _
-        file_name = selected_file.stem.replace(" ", "_") + ".json"
-        out_path = dest_dir / file_name
+        out_path = community_path(selected_file)
+        out_path.parent.mkdir(exist_ok=True)
         with open(out_path, "w", encoding="utf-8") as f:
             json.dump(quiz_data, f, indent=2, ensure_ascii=False)
         print(f"\n✅ Salvato in: {out_path}")
+        return 0
+    return 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""
+grade_open_answers.py — Valuta le risposte degli studenti alle domande aperte tramite Ollama.
+
+Uso:
+    python scripts/grade_open_answers.py --answers risposte.jsonl --out voti.jsonl --model llama3.2
+    python scripts/grade_open_answers.py --list-questions
+
+Il file `--answers` è JSONL (o un array JSON) con un oggetto per risposta:
+    {"id": "s123-q1", "questionId": "<id da --list-questions>", "answer": "..."}
+
+Ogni risposta viene confrontata con il `referenceAnswer` della domanda in `open-questions/`:
+- le risposte senza alcuna parola significativa valgono 0 senza chiamare il modello;
+- tutte le altre vengono raggruppate per domanda e inviate al modello a batch (la somiglianza
+  lessicale col riferimento non basta a dare il voto: "non è X" e "è X" hanno quasi le stesse parole);
+- i voti sono salvati in cache SQLite per (ID domanda, hash di riferimento + prompt, hash risposta
+  normalizzata, modello): le risposte ripetute non costano nuove chiamate e modificare il
+  `referenceAnswer` o il prompt invalida i voti già dati.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from ollama_enrich_quiz import DEFAULT_BASE_URL, chat, parse_response, verify_connection
+from quiz_corpus import CACHE_DIR, OPEN_QUESTIONS_DIR, iter_json_files, load_json_list, normalize_text, question_ids, rel_path
+
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 1
+DEFAULT_CACHE = CACHE_DIR / "grading.sqlite"
+MAX_SCORE = 10
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = {
+    "il", "lo", "la", "i", "gli", "le", "un", "uno", "una", "di", "da", "in", "con", "su", "per", "tra", "fra",
+    "del", "dello", "della", "dei", "degli", "delle", "al", "allo", "alla", "ai", "agli", "alle", "dal", "dalla",
+    "nel", "nella", "nei", "sul", "sulla", "e", "ed", "o", "che", "si", "sono", "come", "anche",
+    "ma", "se", "più", "quando", "questo", "questa", "cui", "ha", "hanno", "viene", "essere",
+}
+
+
+def load_open_questions(base_dir: Path = OPEN_QUESTIONS_DIR) -> dict[str, dict]:
+    """Indice ID → domanda aperta (con file di origine e categoria)."""
+    index = {}
+    for path in iter_json_files(base_dir):
+        data = load_json_list(path)
+        if data is None:
+            continue
+        rel = rel_path(path, base_dir)
+        for qid, q in zip(question_ids(rel, data, text_field="text"), data):
+            index[qid] = {
+                "id": qid,
+                "rel": rel,
+                "text": q.get("text", ""),
+                "referenceAnswer": q.get("referenceAnswer", ""),
+                "hint": q.get("hint", ""),
+            }
+    return index
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(normalize_text(text)) if len(t) > 1 and t not in STOPWORDS]
+
+
+def answer_hash(answer: str) -> str:
+    return hashlib.sha256(normalize_text(answer).encode("utf-8")).hexdigest()
+
+
+def context_hash(question: dict) -> str:
+    """Hash di domanda, riferimento e prompt: cambia se cambia ciò su cui il modello ha dato il voto."""
+    return hashlib.sha256(build_grading_prompt(question, []).encode("utf-8")).hexdigest()[:16]
+
+
+def prescreen(answer: str) -> dict | None:
+    """Voto locale solo per le risposte senza parole significative; None se serve il modello."""
+    if not tokenize(answer):
+        return {"score": 0, "feedback": "Risposta vuota.", "method": "blank"}
+    return None
+
+
+class GradeCache:
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(grades)")}
+        if columns and "context" not in columns:
+            # Cache di una versione precedente, senza hash di riferimento/prompt: non riutilizzabile.
+            self.conn.execute("DROP TABLE grades")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS grades ("
+            " question_id TEXT NOT NULL, context TEXT NOT NULL, answer_hash TEXT NOT NULL, model TEXT NOT NULL,"
+            " score REAL NOT NULL, feedback TEXT NOT NULL, created REAL NOT NULL,"
+            " PRIMARY KEY (question_id, context, answer_hash, model))"
+        )
+
+    def get_many(self, keys: list[tuple[str, str]], contexts: dict[str, str], model: str) -> dict[tuple[str, str], dict]:
+        found = {}
+        for qid, ahash in keys:
+            row = self.conn.execute(
+                "SELECT score, feedback FROM grades"
+                " WHERE question_id = ? AND context = ? AND answer_hash = ? AND model = ?",
+                (qid, contexts[qid], ahash, model),
+            ).fetchone()
+            if row:
+                found[(qid, ahash)] = {"score": row[0], "feedback": row[1], "method": "cache"}
+        return found
+
+    def put_many(self, rows: list[tuple[str, str, float, str]], contexts: dict[str, str], model: str) -> None:
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO grades VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(qid, contexts[qid], ahash, model, score, feedback, now) for qid, ahash, score, feedback in rows],
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def build_grading_prompt(question: dict, answers: list[str]) -> str:
+    reference = question["referenceAnswer"] or "(non disponibile: valuta con la tua conoscenza della materia)"
+    items = "\n\n".join(f"[{i}]\n{a.strip()}" for i, a in enumerate(answers))
+    return f"""Sei un docente universitario che corregge domande a risposta aperta.
+
+DOMANDA:
+{question['text']}
+
+RISPOSTA DI RIFERIMENTO:
+{reference}
+
+Valuta ciascuna risposta dello studente da 0 a {MAX_SCORE} confrontandola con la risposta di riferimento:
+- premia la correttezza e la completezza dei concetti, non la forma o la lunghezza;
+- una risposta che contraddice il riferimento vale 0;
+- "feedback": una frase che indichi cosa manca o cosa è sbagliato.
+
+Rispondi SOLO con un array JSON valido, senza markdown, con un oggetto per risposta nell'ordine ricevuto:
+[
+  {{"index": 0, "score": 7, "feedback": "..."}}
+]
+
+RISPOSTE DEGLI STUDENTI:
+
+{items}
+
+Rispondi SOLO con l'array JSON:"""
+
+
+def grade_batch(args: argparse.Namespace, model: str, question: dict, answers: list[str]) -> list[dict] | None:
+    prompt = build_grading_prompt(question, answers)
+    for attempt in range(args.retries + 1):
+        try:
+            results = parse_response(chat(args.base_url, args.api_key, model, prompt))
+        except Exception:
+            results = None
+        if results is not None:
+            graded: list[dict | None] = [None] * len(answers)
+            for item in results:
+                idx = item.get("index") if isinstance(item, dict) else None
+                if not isinstance(idx, int) or not (0 <= idx < len(answers)):
+                    continue
+                try:
+                    score = min(max(float(item.get("score", 0)), 0), MAX_SCORE)
+                except (TypeError, ValueError):
+                    continue
+                graded[idx] = {"score": score, "feedback": str(item.get("feedback", "")).strip(), "method": "llm"}
+            if all(g is not None for g in graded):
+                return graded
+        if attempt < args.retries:
+            time.sleep(1)
+    return None
+
+
+def read_answers(path: Path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        raw = f.read()
+    if raw.lstrip().startswith("["):
+        return json.loads(raw)
+    submissions = []
+    for n, line in enumerate(raw.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            submissions.append(json.loads(line))
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"riga {n}: {exc.msg}") from exc
+    return submissions
+
+
+def grade_submissions(args: argparse.Namespace, model: str, questions: dict[str, dict], submissions: list[dict]) -> list[dict]:
+    results: list[dict | None] = [None] * len(submissions)
+
+    # Risposte uniche (per domanda + testo normalizzato) ancora da valutare con il modello.
+    pending: dict[tuple[str, str], list[int]] = {}
+    pending_text: dict[tuple[str, str], str] = {}
+    for i, sub in enumerate(submissions):
+        qid = sub.get("questionId")
+        answer = sub.get("answer")
+        answer = "" if answer is None else str(answer)
+        if qid not in questions:
+            results[i] = {"score": None, "feedback": "ID domanda sconosciuto.", "method": "error"}
+            continue
+        screened = prescreen(answer)
+        if screened is not None:
+            results[i] = screened
+            continue
+        key = (qid, answer_hash(answer))
+        pending.setdefault(key, []).append(i)
+        pending_text.setdefault(key, answer)
+
+    contexts = {qid: context_hash(questions[qid]) for qid, _ in pending}
+    cache = GradeCache(Path(args.cache))
+    cached = cache.get_many(list(pending), contexts, model)
+    for key, grade in cached.items():
+        for i in pending.pop(key):
+            results[i] = grade
+
+    methods = Counter(r["method"] for r in results if r)
+    print(f"📥 Risposte: {len(submissions)} | vuote: {methods['blank']} "
+          f"| cache: {methods['cache']} | ID sconosciuti: {methods['error']} | uniche al modello: {len(pending)}")
+
+    by_question: dict[str, list[tuple[str, str]]] = {}
+    for key in pending:
+        by_question.setdefault(key[0], []).append(key)
+    jobs = [
+        (qid, keys[start:start + args.batch_size])
+        for qid, keys in by_question.items()
+        for start in range(0, len(keys), args.batch_size)
+    ]
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(grade_batch, args, model, questions[qid], [pending_text[k] for k in keys]): keys
+            for qid, keys in jobs
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            keys = futures[future]
+            graded = future.result()
+            if graded is None:
+                failed += 1
+                for key in keys:
+                    for i in pending[key]:
+                        results[i] = {"score": None, "feedback": "Valutazione non riuscita.", "method": "error"}
+                print(f"⚠️  Batch {done}/{len(jobs)}: risposta non parsabile dopo {args.retries + 1} tentativi")
+                continue
+            cache.put_many([(k[0], k[1], g["score"], g["feedback"]) for k, g in zip(keys, graded)], contexts, model)
+            for key, grade in zip(keys, graded):
+                for i in pending[key]:
+                    results[i] = grade
+            print(f"✅ Batch {done}/{len(jobs)}: {len(keys)} risposte valutate")
+    cache.close()
+
+    if failed:
+        print(f"⚠️  Batch falliti: {failed} (rilancia lo stesso comando: le risposte già valutate sono in cache)")
+    return [
+        {"id": sub.get("id", i), "questionId": sub.get("questionId"), **res}
+        for i, (sub, res) in enumerate(zip(submissions, results))
+    ]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Valuta risposte a domande aperte con Ollama (batch + cache).")
+    parser.add_argument("--answers", default=None, help="File JSONL/JSON con le risposte da valutare")
+    parser.add_argument("--out", default=None, help="File JSONL di output con i voti")
+    parser.add_argument("--model", default=None, help="Modello Ollama da usare")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help=f"URL base di Ollama (default: {DEFAULT_BASE_URL})")
+    parser.add_argument("--api-key", default=None, help="API key opzionale (per istanze Ollama con autenticazione)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Risposte per chiamata al modello (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Chiamate concorrenti al modello (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help=f"Tentativi extra per batch su errore/parse fail (default: {DEFAULT_RETRIES})")
+    parser.add_argument("--cache", default=str(DEFAULT_CACHE), help=f"Database SQLite della cache (default: {DEFAULT_CACHE})")
+    parser.add_argument("--list-questions", action="store_true", help="Mostra gli ID delle domande aperte e termina")
+    args = parser.parse_args(argv)
+
+    questions = load_open_questions()
+    if args.list_questions:
+        for q in questions.values():
+            print(f"{q['id']}  {q['rel']}  {q['text'][:80]}")
+        return 0
+
+    if not args.answers or not args.out or not args.model:
+        print("❌ Servono --answers, --out e --model (usa --list-questions per vedere gli ID delle domande)")
+        return 1
+    if args.batch_size <= 0 or args.workers <= 0 or args.retries < 0:
+        print("❌ --batch-size e --workers devono essere > 0, --retries >= 0")
+        return 1
+
+    try:
+        submissions = read_answers(Path(args.answers))
+    except OSError as exc:
+        print(f"❌ Impossibile leggere {args.answers}: {exc.strerror or exc}")
+        return 1
+    except ValueError as exc:
+        print(f"❌ JSON non valido in {args.answers}: {exc}")
+        return 1
+    if any(not isinstance(s, dict) for s in submissions):
+        print("❌ Ogni risposta deve essere un oggetto JSON con 'questionId' e 'answer'")
+        return 1
+    verify_connection(args.base_url)
+
+    start = time.perf_counter()
+    graded = grade_submissions(args, args.model, questions, submissions)
+    elapsed = time.perf_counter() - start
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        for g in graded:
+            f.write(json.dumps(g, ensure_ascii=False) + "\n")
+    print(f"💾 Voti salvati in: {args.out} ({len(graded)} risposte in {elapsed:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
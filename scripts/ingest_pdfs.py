@@ -0,0 +1,340 @@
+"""
+ingest_pdfs.py — Conversione in blocco dei PDF in `quizzes/**/_docs/` nei quiz `community/*.json`.
+
+Uso:
+    python scripts/ingest_pdfs.py --plan-only
+    python scripts/ingest_pdfs.py --backend gemini --model gemini-2.0-flash
+    python scripts/ingest_pdfs.py --backend ollama --model qwen2.5:14b --base-url http://gpu1:11434 --base-url http://gpu2:11434
+
+Vengono elaborati i PDF senza il corrispondente `community/<nome>.json` e quelli il cui hash
+è cambiato rispetto al manifest (`.cache/ingest_manifest.json`). Il lavoro è diviso in stadi
+collegati da code limitate, ognuno con la propria concorrenza:
+
+    estrazione (processi) → generazione (thread per endpoint) → validazione → scrittura
+
+L'estrazione del testo scala con i core (`--extract-workers`), la generazione con il numero
+di endpoint e di richieste parallele per endpoint (`--generate-workers`). Le code limitate
+(`--queue-size`) evitano di accumulare in memoria testi estratti in attesa del modello.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable
+
+from ollama_enrich_quiz import DEFAULT_BASE_URL
+from quiz_corpus import CACHE_DIR, QUIZZES_DIR
+
+MANIFEST_PATH = CACHE_DIR / "ingest_manifest.json"
+DEFAULT_QUEUE_SIZE = 4
+DEFAULT_GENERATE_TIMEOUT = 900  # secondi: un PDF intero in un solo prompt richiede ben più di una chiamata di enrich
+QUESTION_DEFAULTS = {"image": "", "code": "", "explanation": "", "hint": ""}
+
+_STOP = object()
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest() -> dict:
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"files": {}}
+
+
+def save_manifest(manifest: dict) -> None:
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)
+
+
+def discover(quizzes_root: Path, manifest: dict, force: bool = False) -> tuple[list[dict], list[dict]]:
+    """
+    Restituisce (da elaborare, già aggiornati).
+
+    Un PDF con il JSON di destinazione già presente ma assente dal manifest viene considerato
+    elaborato (convertito prima che esistesse il manifest) e il suo hash registrato.
+    """
+    from generate_quiz import community_path
+
+    pending, up_to_date = [], []
+    for pdf in sorted(quizzes_root.glob("**/_docs/*.pdf")):
+        rel = pdf.relative_to(quizzes_root).as_posix()
+        dest = community_path(pdf)
+        digest = file_sha256(pdf)
+        entry = manifest["files"].get(rel)
+        job = {"pdf": pdf, "rel": rel, "dest": dest, "sha256": digest}
+        if force or not dest.exists():
+            job["reason"] = "forzato" if force and dest.exists() else "nuovo"
+        elif entry is not None and entry.get("sha256") != digest:
+            job["reason"] = "PDF modificato"
+        else:
+            if entry is None:
+                manifest["files"][rel] = {"sha256": digest, "output": dest.relative_to(quizzes_root).as_posix(),
+                                          "output_sha256": file_sha256(dest), "adopted": True}
+            up_to_date.append(job)
+            continue
+        pending.append(job)
+    return pending, up_to_date
+
+
+class Pipeline:
+    """
+    Stadi di worker collegati da code limitate.
+
+    Ogni stadio è (nome, funzione, concorrenza): la funzione riceve il job e restituisce il job
+    aggiornato, oppure solleva un'eccezione per scartarlo (l'errore finisce in `errors`).
+    Quando tutti i worker di uno stadio terminano, lo stadio successivo riceve i segnali di stop.
+    Un'eccezione non ordinaria (SystemExit, KeyboardInterrupt) ferma la pipeline: i worker
+    svuotano le code senza elaborare, così nessun `put` resta bloccato, e `run` la rilancia.
+    """
+
+    def __init__(self, stages: list[tuple[str, Callable[[dict], dict], int]], queue_size: int):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.results: list[dict] = []
+        self.errors: list[tuple[str, str, str]] = []
+        self.busy = {name: 0.0 for name, _, _ in stages}
+        self.abort: BaseException | None = None
+        self._lock = threading.Lock()
+
+    def _worker(self, i: int) -> None:
+        name, fn, _ = self.stages[i]
+        while True:
+            job = self.queues[i].get()
+            if job is _STOP:
+                return
+            if self.abort is not None:
+                continue
+            start = time.perf_counter()
+            try:
+                job = fn(job)
+            except Exception as exc:
+                with self._lock:
+                    self.errors.append((job["rel"], name, str(exc)))
+                print(f"❌ {job['rel']} [{name}]: {exc}")
+                continue
+            except BaseException as exc:
+                with self._lock:
+                    if self.abort is None:
+                        self.abort = exc
+                continue
+            finally:
+                with self._lock:
+                    self.busy[name] += time.perf_counter() - start
+            if i + 1 < len(self.stages):
+                self.queues[i + 1].put(job)
+            else:
+                with self._lock:
+                    self.results.append(job)
+
+    def run(self, jobs: Iterable[dict]) -> None:
+        groups = []
+        for i, (_, _, concurrency) in enumerate(self.stages):
+            threads = [threading.Thread(target=self._worker, args=(i,), daemon=True) for _ in range(concurrency)]
+            for t in threads:
+                t.start()
+            groups.append(threads)
+
+        for job in jobs:
+            if self.abort is not None:
+                break
+            self.queues[0].put(job)
+        for i, threads in enumerate(groups):
+            for _ in threads:
+                self.queues[i].put(_STOP)
+            for t in threads:
+                t.join()
+        if self.abort is not None:
+            raise self.abort
+
+
+def generate_with_ollama(base_url: str, args: argparse.Namespace, text: str) -> list:
+    from generate_quiz import build_generation_prompt
+    from ollama_enrich_quiz import chat
+    from structured_output import decode, extract_json, generation_schema
+
+    schema = generation_schema() if args.structured else None
+    raw = chat(base_url, args.api_key, args.model, build_generation_prompt(text), format=schema, timeout=args.timeout)
+    if schema is not None:
+        data, errors = decode(raw, schema)
+        if errors:
+            raise ValueError(f"output non conforme allo schema: {errors[0]}")
+        return data
+    return extract_json(raw)
+
+
+def build_stages(args: argparse.Namespace, pool: ProcessPoolExecutor, manifest: dict,
+                 manifest_lock: threading.Lock) -> list[tuple[str, Callable[[dict], dict], int]]:
+    from generate_quiz import extract_text_with_colors, generate_quiz
+    from validate import validate_quiz_data
+
+    endpoints = queue.Queue()
+    if args.backend == "ollama":
+        for url in args.base_url:
+            for _ in range(args.generate_workers):
+                endpoints.put(url)
+    generate_concurrency = endpoints.qsize() if args.backend == "ollama" else args.generate_workers
+
+    def extract(job: dict) -> dict:
+        job["text"] = pool.submit(extract_text_with_colors, job["pdf"], False).result()
+        if not job["text"].strip():
+            raise ValueError("nessun testo estratto (PDF scansionato?)")
+        return job
+
+    def generate(job: dict) -> dict:
+        if args.backend == "ollama":
+            # Ogni worker prende in prestito uno slot di un endpoint: le richieste si
+            # distribuiscono sulle istanze rispettando `--generate-workers` per istanza.
+            url = endpoints.get()
+            try:
+                data = generate_with_ollama(url, args, job["text"])
+            finally:
+                endpoints.put(url)
+        else:
+            data = generate_quiz(job["text"], args.model, structured=args.structured)
+        if data is None:
+            raise ValueError("generazione fallita")
+        job["data"] = data
+        del job["text"]
+        return job
+
+    def validate(job: dict) -> dict:
+        data = job["data"]
+        if isinstance(data, list):
+            data = [{**QUESTION_DEFAULTS, **q} if isinstance(q, dict) else q for q in data]
+        ok, error = validate_quiz_data(data)
+        if not ok:
+            raise ValueError(error)
+        if not data:
+            raise ValueError("nessuna domanda generata")
+        job["data"] = data
+        return job
+
+    def write(job: dict) -> dict:
+        dest: Path = job["dest"]
+        entry = manifest["files"].get(job["rel"], {})
+        if dest.exists() and not args.overwrite and entry.get("output_sha256") not in (None, file_sha256(dest)):
+            raise ValueError(f"{dest.name} è stato modificato dopo la generazione (usa --overwrite)")
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with open(dest, "w", encoding="utf-8") as f:
+            json.dump(job["data"], f, indent=2, ensure_ascii=False)
+        with manifest_lock:
+            manifest["files"][job["rel"]] = {
+                "sha256": job["sha256"],
+                "output": dest.relative_to(QUIZZES_DIR).as_posix(),
+                "output_sha256": file_sha256(dest),
+                "questions": len(job["data"]),
+                "backend": args.backend,
+                "model": args.model,
+                "ingested_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            save_manifest(manifest)
+        print(f"✅ {job['rel']} → {dest.name} ({len(job['data'])} domande)")
+        job["questions"] = len(job.pop("data"))
+        return job
+
+    return [
+        ("estrazione", extract, args.extract_workers),
+        ("generazione", generate, generate_concurrency),
+        ("validazione", validate, 1),
+        ("scrittura", write, 1),
+    ]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Converte in blocco i PDF di quizzes/**/_docs in quiz JSON.")
+    parser.add_argument("--backend", choices=["gemini", "ollama"], default="gemini",
+                        help="Backend di generazione (default: gemini)")
+    parser.add_argument("--model", default=None, help="Modello da usare (obbligatorio tranne con --plan-only)")
+    parser.add_argument("--base-url", action="append", default=None,
+                        help=f"Istanza Ollama (ripetibile, default: {DEFAULT_BASE_URL})")
+    parser.add_argument("--api-key", default=None, help="API key opzionale per istanze Ollama con autenticazione")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_GENERATE_TIMEOUT,
+                        help=f"Timeout in secondi di ogni generazione con Ollama (default: {DEFAULT_GENERATE_TIMEOUT})")
+    parser.add_argument("--extract-workers", type=int, default=os.cpu_count() or 1,
+                        help="Processi di estrazione del testo (default: numero di core)")
+    parser.add_argument("--generate-workers", type=int, default=2,
+                        help="Richieste di generazione parallele (per endpoint con Ollama, default: 2)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"Capienza delle code tra gli stadi (default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument("--structured", action="store_true",
+                        help="Vincola l'output allo schema di schema/schema.json")
+    parser.add_argument("--force", action="store_true", help="Rielabora anche i PDF già convertiti")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Sovrascrive anche i JSON modificati a mano dopo la generazione")
+    parser.add_argument("--plan-only", action="store_true",
+                        help="Mostra i PDF da elaborare e termina (senza modificare il manifest)")
+    args = parser.parse_args(argv)
+    args.base_url = args.base_url or [DEFAULT_BASE_URL]
+
+    if min(args.extract_workers, args.generate_workers, args.queue_size, args.timeout) <= 0:
+        print("❌ --extract-workers, --generate-workers, --queue-size e --timeout devono essere > 0")
+        return 1
+
+    manifest = load_manifest()
+    pending, up_to_date = discover(QUIZZES_DIR, manifest, force=args.force)
+    if not args.plan_only:
+        save_manifest(manifest)
+
+    print(f"\n📄 PDF trovati: {len(pending) + len(up_to_date)} | già convertiti: {len(up_to_date)} | da elaborare: {len(pending)}")
+    for job in pending:
+        print(f"  - {job['rel']} → {job['dest'].name} ({job['reason']})")
+    if not pending or args.plan_only:
+        return 0
+    if not args.model:
+        print("❌ Specifica il modello con --model")
+        return 1
+
+    try:
+        import fitz  # noqa: F401  (PyMuPDF, usato dai processi di estrazione)
+    except ImportError:
+        from generate_quiz import missing_libraries
+        missing_libraries()
+    if args.backend == "ollama":
+        from ollama_enrich_quiz import verify_connection
+        for url in args.base_url:
+            verify_connection(url)
+    else:
+        from generate_quiz import get_client
+        get_client()
+
+    start = time.perf_counter()
+    manifest_lock = threading.Lock()
+    with ProcessPoolExecutor(max_workers=args.extract_workers) as pool:
+        pipeline = Pipeline(build_stages(args, pool, manifest, manifest_lock), args.queue_size)
+        pipeline.run(pending)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{'=' * 50}")
+    print(f"✅ Convertiti: {len(pipeline.results)}/{len(pending)} PDF "
+          f"({sum(j['questions'] for j in pipeline.results)} domande) in {elapsed:.1f}s")
+    print("⏱️  Tempo di lavoro per stadio: " + " | ".join(
+        f"{name} {busy:.1f}s" for name, busy in pipeline.busy.items()))
+    if pipeline.errors:
+        print(f"⚠️  Errori: {len(pipeline.errors)}")
+        for rel, stage, error in pipeline.errors:
+            print(f"  - {rel} [{stage}]: {error}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,6 +3,12 @@ ollama_enrich_quiz.py — Arricchisce i campi 'explanation' e 'hint' di un quiz
 
 Uso:
     python scripts/ollama_enrich_quiz.py [--batch-size N] [--base-url URL] [--model MODEL]
+    python scripts/ollama_enrich_quiz.py --since origin/main --model MODEL   # solo file cambiati in git
+    python scripts/ollama_enrich_quiz.py --queue --model MODEL --usage-csv views.csv  # coda di priorità
+
+Le domande da arricchire sono scelte da `enrich_schedule`: explanation/hint mancanti oppure
+generate su un contenuto poi modificato o con un prompt più vecchio di `PROMPT_VERSION`, oppure
+bocciate da `quality_gate.py`.
 
 Richiede Ollama in esecuzione (default: http://localhost:11434).
 """
@@ -12,24 +18,34 @@ import json
 import sys
 import threading
 import time
+from collections import Counter
 from pathlib import Path
 
-try:
-    import requests
-except ImportError:
-    print("❌ Libreria 'requests' mancante! Installa con: pip install requests")
-    sys.exit(1)
+from quiz_corpus import content_fingerprint, iter_json_files, load_json_list, question_ids, rel_path
 
 DEFAULT_BASE_URL = "http://localhost:11434"
 DEFAULT_BATCH_SIZE = 5
 DEFAULT_RETRIES = 1
+DEFAULT_TIMEOUT = 120  # secondi per chiamata a /api/chat
 DEFAULT_PLAN_LIMIT = 20
+# Incrementare quando cambia `build_prompt`: le domande arricchite con versioni precedenti tornano in coda.
+PROMPT_VERSION = 1
 
 DIM = "\033[2;37m"  # grigio chiaro/dim
 RESET = "\033[0m"
 CLEAR_LINE = "\r\033[2K"
 
 
+def http():
+    """Importa `requests` solo al primo uso (le operazioni offline come --help/--plan-only non lo caricano)."""
+    try:
+        import requests
+    except ImportError:
+        print("❌ Libreria 'requests' mancante! Installa con: pip install requests")
+        sys.exit(1)
+    return requests
+
+
 class Spinner:
     _FRAMES = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
 
@@ -73,7 +89,7 @@ class Spinner:
 def get_ollama_models(base_url: str, api_key: str | None) -> list[str]:
     headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
     try:
-        r = requests.get(f"{base_url}/api/tags", headers=headers, timeout=8)
+        r = http().get(f"{base_url}/api/tags", headers=headers, timeout=8)
         r.raise_for_status()
         names = [m.get("name", "") for m in r.json().get("models", [])]
         return sorted([n for n in names if n])
@@ -82,7 +98,22 @@ def get_ollama_models(base_url: str, api_key: str | None) -> list[str]:
         return []
 
 
-def chat(base_url: str, api_key: str | None, model: str, prompt: str) -> str:
+def chat(
+    base_url: str,
+    api_key: str | None,
+    model: str,
+    prompt: str,
+    format: dict | None = None,
+    usage: dict | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> str:
+    """
+    Invia un prompt a /api/chat e restituisce il testo della risposta.
+
+    `format` è uno schema JSON passato a Ollama per vincolare l'output (structured outputs).
+    Se `usage` è un dict, vi vengono sommati i token del prompt e della risposta.
+    `timeout` (secondi) va alzato per prompt lunghi, es. un intero PDF da convertire.
+    """
     headers = {"Content-Type": "application/json"}
     if api_key:
         headers["Authorization"] = f"Bearer {api_key}"
@@ -92,14 +123,36 @@ def chat(base_url: str, api_key: str | None, model: str, prompt: str) -> str:
         "stream": False,
         "options": {"temperature": 0.2},
     }
-    r = requests.post(
+    if format is not None:
+        payload["format"] = format
+    r = http().post(
         f"{base_url}/api/chat",
         headers=headers,
         json=payload,
+        timeout=timeout,
+    )
+    r.raise_for_status()
+    data = r.json()
+    if usage is not None:
+        usage["calls"] = usage.get("calls", 0) + 1
+        usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + data.get("prompt_eval_count", 0)
+        usage["completion_tokens"] = usage.get("completion_tokens", 0) + data.get("eval_count", 0)
+    return data["message"]["content"].strip()
+
+
+def embed(base_url: str, api_key: str | None, model: str, texts: list[str]) -> list[list[float]]:
+    """Calcola gli embedding di più testi con una sola chiamata a /api/embed."""
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    r = http().post(
+        f"{base_url}/api/embed",
+        headers=headers,
+        json={"model": model, "input": texts},
         timeout=120,
     )
     r.raise_for_status()
-    return r.json()["message"]["content"].strip()
+    return r.json()["embeddings"]
 
 
 def build_prompt(batch: list[dict]) -> str:
@@ -161,6 +214,46 @@ def parse_response(text: str) -> list[dict] | None:
     return parsed
 
 
+def request_enrichment(
+    args: argparse.Namespace, model: str, prompt: str, usage: dict | None = None
+) -> tuple[list[dict] | None, Exception | None, int]:
+    """
+    Chiama il modello con i retry configurati; restituisce (risultati, ultimo errore, tentativi).
+
+    Con `args.structured` lo schema di risposta viene passato a Ollama e la risposta validata
+    con `structured_output`; altrimenti si estrae l'array JSON dal testo libero.
+    """
+    schema = None
+    if getattr(args, "structured", False):
+        from structured_output import ENRICH_SCHEMA, decode
+        schema = ENRICH_SCHEMA
+
+    def spent() -> int:
+        return usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0) if usage is not None else 0
+
+    error: Exception | None = None
+    for attempt in range(args.retries + 1):
+        before = spent()
+        try:
+            raw = chat(args.base_url, args.api_key, model, prompt, format=schema, usage=usage)
+            if schema is not None:
+                results, _ = decode(raw, schema)
+            else:
+                results = parse_response(raw)
+            if results is not None:
+                return results, None, attempt + 1
+            if usage is not None:
+                usage["parse_failures"] = usage.get("parse_failures", 0) + 1
+        except Exception as exc:
+            error = exc
+        if usage is not None:
+            # Token di un tentativo da buttare: la risposta non è utilizzabile.
+            usage["wasted_tokens"] = usage.get("wasted_tokens", 0) + spent() - before
+        if attempt < args.retries:
+            time.sleep(1)
+    return None, error, args.retries + 1
+
+
 def select_from_list(items: list[str], label: str) -> int:
     print(f"\n--- {label} ---")
     for i, item in enumerate(items):
@@ -251,14 +344,6 @@ def resolve_quiz_path(quizzes_root: Path, quiz_arg: str | None, scan: dict | Non
     return stats[idx]["path"]
 
 
-def question_needs_enrich(q: dict, force: bool) -> bool:
-    if force:
-        return True
-    has_explanation = bool(str(q.get("explanation", "")).strip())
-    has_hint = bool(str(q.get("hint", "")).strip())
-    return not (has_explanation and has_hint)
-
-
 def summarize_questions(quiz_data: list[dict]) -> tuple[int, int, int, int]:
     complete = 0
     missing_explanation = 0
@@ -422,31 +507,51 @@ def pick_model(args: argparse.Namespace) -> str:
 
 def verify_connection(base_url: str) -> None:
     try:
-        requests.get(f"{base_url}/api/tags", timeout=5).raise_for_status()
+        http().get(f"{base_url}/api/tags", timeout=5).raise_for_status()
     except Exception:
         print(f"❌ Impossibile connettersi a {base_url}. Ollama è in esecuzione?")
         sys.exit(1)
 
 
-def enrich_single_quiz(args: argparse.Namespace, quiz_path: Path, model: str) -> tuple[int, int, int]:
+def plan_quiz(args: argparse.Namespace, quiz_path: Path, quizzes_root: Path, state, base_data=None) -> list[tuple[int, str]]:
+    from enrich_schedule import plan_file
+
+    quiz_data = load_json_list(quiz_path) or []
+    return plan_file(
+        rel_path(quiz_path, quizzes_root), quiz_data, state, PROMPT_VERSION,
+        force=args.force, base_data=base_data, upgrade_models=set(args.upgrade_model),
+        quality_failed=args.quality_failed,
+    )
+
+
+def enrich_single_quiz(
+    args: argparse.Namespace, quiz_path: Path, model: str, quizzes_root: Path, state, base_data=None
+) -> tuple[int, int, int]:
+    from enrich_schedule import record_enriched
+
     with open(quiz_path, encoding="utf-8") as f:
         quiz_data: list[dict] = json.load(f)
 
     total = len(quiz_data)
+    rel = rel_path(quiz_path, quizzes_root)
     print(f"\n📋 Quiz caricato: {quiz_path.name} ({total} domande)")
 
     complete, missing_explanation, missing_hint, missing_both = summarize_questions(quiz_data)
-    to_enrich = [i for i, q in enumerate(quiz_data) if question_needs_enrich(q, args.force)]
+    plan = plan_quiz(args, quiz_path, quizzes_root, state, base_data)
+    to_enrich = [i for i, _ in plan]
+    reasons = Counter(reason for _, reason in plan)
 
     print(f"✅ Domande complete: {complete}/{total}")
     print(f"🧩 Mancano entrambi: {missing_both} | solo explanation: {missing_explanation} | solo hint: {missing_hint}")
+    if reasons:
+        print("🗂️  Motivi: " + " | ".join(f"{reason}: {n}" for reason, n in reasons.most_common()))
     if args.force:
         print("⚠️  --force attivo: verranno riprocessate tutte le domande.")
 
     print_batch_plan(total, args.batch_size, to_enrich, args.plan_limit)
 
     if not to_enrich:
-        print("✅ Tutte le domande hanno già explanation e hint.")
+        print("✅ Tutte le domande hanno già explanation e hint aggiornati.")
         return 0, 0, 0
 
     if args.plan_only:
@@ -457,10 +562,12 @@ def enrich_single_quiz(args: argparse.Namespace, quiz_path: Path, model: str) ->
     print(f"\n🤖 Modello: {model}")
     print(f"📦 Batch size: {args.batch_size}")
     print(f"🔁 Retries extra: {args.retries}")
+    print(f"🧱 Output strutturato: {'sì' if args.structured else 'no'}")
     print(f"🌐 URL: {args.base_url}\n")
 
     enriched = 0
     failed_batches = 0
+    usage: dict = {}
     spinner = Spinner()
 
     for batch_start in range(0, len(to_enrich), args.batch_size):
@@ -476,19 +583,7 @@ def enrich_single_quiz(args: argparse.Namespace, quiz_path: Path, model: str) ->
         )
 
         prompt = build_prompt(batch_questions)
-        results: list[dict] | None = None
-        error: Exception | None = None
-
-        for attempt in range(args.retries + 1):
-            try:
-                raw = chat(args.base_url, args.api_key, model, prompt)
-                results = parse_response(raw)
-                if results is not None:
-                    break
-            except Exception as exc:
-                error = exc
-            if attempt < args.retries:
-                time.sleep(1)
+        results, error, _ = request_enrichment(args, model, prompt, usage)
 
         spinner.stop()
 
@@ -502,6 +597,7 @@ def enrich_single_quiz(args: argparse.Namespace, quiz_path: Path, model: str) ->
             continue
 
         applied = 0
+        updated = []
         for item in results:
             local_idx = item.get("index")
             if local_idx is None or not (0 <= local_idx < len(batch_indices)):
@@ -509,6 +605,7 @@ def enrich_single_quiz(args: argparse.Namespace, quiz_path: Path, model: str) ->
             global_idx = batch_indices[local_idx]
             quiz_data[global_idx]["explanation"] = str(item.get("explanation", "")).strip()
             quiz_data[global_idx]["hint"] = str(item.get("hint", "")).strip()
+            updated.append(global_idx)
             applied += 1
 
         enriched += applied
@@ -516,6 +613,7 @@ def enrich_single_quiz(args: argparse.Namespace, quiz_path: Path, model: str) ->
 
         with open(quiz_path, "w", encoding="utf-8") as f:
             json.dump(quiz_data, f, indent=2, ensure_ascii=False)
+        record_enriched(state, rel, quiz_data, updated, model, PROMPT_VERSION)
 
         if batch_start + args.batch_size < len(to_enrich):
             time.sleep(1)
@@ -524,11 +622,202 @@ def enrich_single_quiz(args: argparse.Namespace, quiz_path: Path, model: str) ->
     print(f"✅ Completato: {enriched}/{len(to_enrich)} domande arricchite")
     if failed_batches:
         print(f"⚠️  Batch falliti: {failed_batches}")
+    print(
+        f"📈 Chiamate: {usage.get('calls', 0)} | risposte non valide: {usage.get('parse_failures', 0)} | "
+        f"token: {usage.get('prompt_tokens', 0)} prompt + {usage.get('completion_tokens', 0)} output "
+        f"(sprecati: {usage.get('wasted_tokens', 0)})"
+    )
     print(f"💾 File salvato: {quiz_path}")
     return enriched, len(to_enrich), failed_batches
 
 
-def main() -> None:
+def queue_entries(args: argparse.Namespace, path: Path, quizzes_root: Path, state, config, usage: dict,
+                  base_data=None) -> tuple[str, list[dict]]:
+    from enrich_schedule import plan_file
+
+    rel = rel_path(path, quizzes_root)
+    quiz_data = load_json_list(path) or []
+    ids = question_ids(rel, quiz_data)
+    plan = plan_file(rel, quiz_data, state, PROMPT_VERSION, force=args.force, base_data=base_data,
+                     upgrade_models=set(args.upgrade_model), quality_failed=args.quality_failed)
+    return rel, [
+        {
+            "question_id": ids[i],
+            "fingerprint": content_fingerprint(quiz_data[i]),
+            "reason": reason,
+            "base_score": config.base_score(rel, quiz_data[i], reason, usage.get(ids[i], 0)),
+        }
+        for i, reason in plan
+    ]
+
+
+def apply_queue_results(
+    rel: str, path: Path, items: list[dict], results: dict[str, dict], model: str, state
+) -> list[str]:
+    """
+    Scrive i risultati di un batch della coda nel file `rel`, rileggendolo dal disco.
+
+    Una domanda viene aggiornata solo se il suo contenuto è ancora quello in coda
+    (il file potrebbe essere stato modificato durante la chiamata al modello).
+    """
+    from enrich_schedule import record_enriched
+
+    quiz_data = load_json_list(path) or []
+    index_of = {qid: i for i, qid in enumerate(question_ids(rel, quiz_data))}
+    updated, applied = [], []
+    for item in items:
+        result = results.get(item["question_id"])
+        idx = index_of.get(item["question_id"])
+        if result is None or idx is None or content_fingerprint(quiz_data[idx]) != item["fingerprint"]:
+            continue
+        quiz_data[idx]["explanation"] = str(result.get("explanation", "")).strip()
+        quiz_data[idx]["hint"] = str(result.get("hint", "")).strip()
+        updated.append(idx)
+        applied.append(item["question_id"])
+    if updated:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(quiz_data, f, indent=2, ensure_ascii=False)
+        record_enriched(state, rel, quiz_data, updated, model, PROMPT_VERSION)
+    return applied
+
+
+def run_queue(
+    args: argparse.Namespace, model: str, quizzes_root: Path, state, only: set[str] | None, base_data: dict
+) -> None:
+    """
+    Elabora la coda di priorità a batch finché non è vuota o finisce il budget.
+
+    Prima di ogni batch i file nuovi o modificati (mtime) vengono ripianificati: le loro
+    domande entrano nello heap e, se hanno score più alto, passano davanti al resto.
+    """
+    from enrich_queue import PriorityConfig, WorkQueue, load_usage_csv
+
+    try:
+        config = PriorityConfig.load(args.priority_config)
+        usage = load_usage_csv(args.usage_csv)
+    except (OSError, ValueError) as exc:
+        print(f"❌ {exc}")
+        sys.exit(1)
+    queue = WorkQueue(config, read_only=args.plan_only)
+
+    def watched() -> dict[Path, int]:
+        paths = {}
+        for path in iter_json_files(quizzes_root):
+            if only is None or rel_path(path, quizzes_root) in only:
+                paths[path] = path.stat().st_mtime_ns
+        return paths
+
+    def refresh(paths) -> int:
+        queued = 0
+        for path in paths:
+            rel, entries = queue_entries(args, path, quizzes_root, state, config, usage, base_data.get(rel_path(path, quizzes_root)))
+            queued += queue.sync_file(rel, entries)
+        return queued
+
+    mtimes = watched()
+    refresh(mtimes)
+    if only is None:
+        queue.drop_missing_files({rel_path(p, quizzes_root) for p in mtimes})
+    print(f"\n🗃️  Coda di priorità: {len(queue)} domande"
+          + (f" | visualizzazioni importate: {len(usage)}" if usage else ""))
+
+    if args.plan_only:
+        limit = len(queue) if args.plan_limit < 0 else args.plan_limit
+        for item in queue.top(limit):
+            print(f"  - {item['score']:8.3f}  {item['rel']}  {item['question_id']}  "
+                  f"({item['reason']}, tentativi: {item['attempts']})")
+        print("ℹ️  Modalità --plan-only: nessuna chiamata al modello eseguita.")
+        queue.close()
+        return
+
+    deadline = time.time() + args.budget_minutes * 60 if args.budget_minutes else None
+    enriched = 0
+    batches = 0
+    failed_batches = 0
+    usage_stats: dict = {}
+    spinner = Spinner()
+    cache: dict[Path, tuple[int, list[dict], dict[str, int]]] = {}
+
+    while True:
+        current = watched()
+        changed = [p for p, m in current.items() if mtimes.get(p) != m]
+        mtimes = current
+        if changed:
+            queued = refresh(changed)
+            names = ", ".join(rel_path(p, quizzes_root) for p in changed[:3])
+            print(f"⏫ File nuovi o modificati: {names}{' …' if len(changed) > 3 else ''} — {queued} domande in coda")
+        if deadline is not None and time.time() >= deadline:
+            print("⏱️  Budget di tempo esaurito.")
+            break
+        if args.max_batches and batches >= args.max_batches:
+            break
+
+        picked = queue.pop_batch(args.batch_size)
+        if not picked:
+            break
+
+        batch_items, batch_questions = [], []
+        for item in picked:
+            path = quizzes_root / item["rel"]
+            mtime = mtimes.get(path)
+            if path not in cache or cache[path][0] != mtime:
+                data = load_json_list(path) or []
+                cache[path] = (mtime, data, {qid: i for i, qid in enumerate(question_ids(item["rel"], data))})
+            _, data, index_of = cache[path]
+            idx = index_of.get(item["question_id"])
+            if idx is None or content_fingerprint(data[idx]) != item["fingerprint"]:
+                continue
+            batch_items.append(item)
+            batch_questions.append(data[idx])
+        if not batch_items:
+            continue
+
+        batches += 1
+        preview = [f"[{queue.score(i):.2f}] {q['question'][:60]}"
+                   for i, q in zip(batch_items, batch_questions)]
+        spinner.start(f"Batch {batches} — {len(batch_items)} domande, {len(queue)} in coda…", preview)
+        results, error, _ = request_enrichment(args, model, build_prompt(batch_questions), usage_stats)
+        spinner.stop()
+
+        if results is None:
+            reason = f"errore — {error}" if error is not None else "risposta non parsabile"
+            print(f"❌ Batch {batches}: {reason}")
+            queue.failed(batch_items)
+            failed_batches += 1
+            continue
+
+        by_qid = {}
+        for r in results:
+            if not isinstance(r, dict):
+                continue
+            local_idx = r.get("index")
+            if isinstance(local_idx, int) and 0 <= local_idx < len(batch_items):
+                by_qid[batch_items[local_idx]["question_id"]] = r
+        applied: list[str] = []
+        for rel in sorted({item["rel"] for item in batch_items}):
+            path = quizzes_root / rel
+            applied += apply_queue_results(rel, path, [i for i in batch_items if i["rel"] == rel], by_qid, model, state)
+            mtimes[path] = path.stat().st_mtime_ns
+        queue.done(applied)
+        applied_set = set(applied)
+        queue.failed([i for i in batch_items if i["question_id"] not in applied_set])
+        enriched += len(applied)
+        files = ", ".join(sorted({Path(i["rel"]).name for i in batch_items}))
+        print(f"✅ Batch {batches}: {len(applied)}/{len(batch_items)} aggiornate — {files}")
+
+    print(f"\n{'=' * 50}")
+    print(f"✅ Coda: {enriched} domande arricchite in {batches} batch, {len(queue)} ancora in coda")
+    if failed_batches:
+        print(f"⚠️  Batch falliti: {failed_batches}")
+    print(
+        f"📈 Chiamate: {usage_stats.get('calls', 0)} | risposte non valide: {usage_stats.get('parse_failures', 0)} | "
+        f"token: {usage_stats.get('prompt_tokens', 0)} prompt + {usage_stats.get('completion_tokens', 0)} output "
+        f"(sprecati: {usage_stats.get('wasted_tokens', 0)})"
+    )
+    queue.close()
+
+
+def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description="Arricchisce explanation/hint di un quiz con Ollama.")
     parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
                         help=f"Domande per batch (default: {DEFAULT_BATCH_SIZE})")
@@ -550,9 +839,28 @@ def main() -> None:
                         help="Mostra piano batch e termina (senza chiamare Ollama)")
     parser.add_argument("--plan-limit", type=int, default=DEFAULT_PLAN_LIMIT,
                         help=f"Numero massimo di batch da mostrare nel piano (default: {DEFAULT_PLAN_LIMIT}, -1 = tutti)")
+    parser.add_argument("--structured", action="store_true",
+                        help="Vincola la risposta allo schema JSON {index, explanation, hint} (parametro 'format' di Ollama)")
     parser.add_argument("--walk-incomplete", action="store_true",
                         help="Processa un quiz incompleto/da fare alla volta, chiedendo se passare al successivo")
-    args = parser.parse_args()
+    parser.add_argument("--since", default=None,
+                        help="Limita il lavoro ai quiz cambiati in git da questo ref (o intervallo A..B)")
+    parser.add_argument("--quality-db", default=None,
+                        help="Cache degli esiti di quality_gate.py da cui leggere le coppie bocciate "
+                             "(stesso valore di quality_gate.py --db; default: la sua cache predefinita)")
+    parser.add_argument("--upgrade-model", action="append", default=[],
+                        help="Rigenera le domande arricchite con questo modello (ripetibile)")
+    parser.add_argument("--queue", action="store_true",
+                        help="Elabora tutte le domande in ordine di priorità (coda persistente, riprendibile)")
+    parser.add_argument("--priority-config", default=None,
+                        help="JSON con pesi per corso, date d'esame e pesi dei motivi (con --queue)")
+    parser.add_argument("--usage-csv", default=None,
+                        help="CSV question_id,views con le visualizzazioni delle domande (con --queue)")
+    parser.add_argument("--budget-minutes", type=float, default=None,
+                        help="Ferma la coda dopo questi minuti (con --queue)")
+    parser.add_argument("--max-batches", type=int, default=None,
+                        help="Ferma la coda dopo questo numero di batch (con --queue)")
+    args = parser.parse_args(argv)
 
     if args.batch_size <= 0:
         print("❌ --batch-size deve essere > 0")
@@ -569,7 +877,7 @@ def main() -> None:
         print("\nModelli disponibili:")
         for m in models:
             print(f"- {m}")
-        return
+        return 0
 
     quizzes_root = Path("quizzes")
     scan = scan_all_quizzes(quizzes_root)
@@ -578,39 +886,80 @@ def main() -> None:
         sys.exit(1)
     print_scan_report(scan)
 
-    if args.walk_incomplete:
-        model = pick_model(args)
+    from enrich_schedule import EnrichState, GitError, git_changed_files, git_file_at
+    from quality_gate import DEFAULT_DB, QualityCache
+
+    state = EnrichState(read_only=args.plan_only)
+    # Coppie explanation/hint bocciate da quality_gate.py: tornano in coda con motivo dedicato.
+    args.quality_failed = set()
+    quality_db = Path(args.quality_db) if args.quality_db else DEFAULT_DB
+    if quality_db.exists():
+        quality = QualityCache(quality_db)
+        args.quality_failed = quality.failing()
+        quality.close()
+    elif args.quality_db:
+        print(f"⚠️  Cache di quality_gate non trovata: {quality_db} (nessuna coppia bocciata da riaccodare)")
+    base_data: dict[str, list[dict] | None] = {}
+    candidates = scan["stats"]
+    if args.since:
+        try:
+            changed, base = git_changed_files(args.since)
+        except GitError as exc:
+            print(f"❌ {exc}")
+            sys.exit(1)
+        changed_set = set(changed)
+        candidates = [s for s in candidates if s["rel"] in changed_set]
+        base_data = {s["rel"]: git_file_at(base, s["rel"]) for s in candidates}
+        print(f"\n🔀 File cambiati da {args.since}: {len(candidates)}")
+
+    if args.queue:
+        model = pick_model(args) if not args.plan_only else (args.model or "<plan-only>")
         if not args.plan_only:
             verify_connection(args.base_url)
-        queue = sorted(
-            [s for s in scan["stats"] if s["status"] in {"incompleto", "da fare"}],
-            key=lambda x: (0 if x["status"] == "incompleto" else 1, x["rel"]),
-        )
+        only = {s["rel"] for s in candidates} if args.since else None
+        run_queue(args, model, quizzes_root, state, only, base_data)
+        return 0
+
+    if args.walk_incomplete or (args.since and not args.quiz):
+        model = pick_model(args) if not args.plan_only else (args.model or "<plan-only>")
+        if not args.plan_only:
+            verify_connection(args.base_url)
+        queue = []
+        for item in candidates:
+            plan = plan_quiz(args, item["path"], quizzes_root, state, base_data.get(item["rel"]))
+            if plan:
+                queue.append((item, len(plan)))
+        queue.sort(key=lambda x: (0 if x[0]["status"] == "incompleto" else 1, x[0]["rel"]))
         if not queue:
-            print("✅ Nessun quiz incompleto/da fare trovato.")
-            return
+            print("✅ Nessun quiz da arricchire o aggiornare.")
+            return 0
 
         total_fixed = 0
         total_pending = 0
         processed = 0
-        for i, item in enumerate(queue):
-            print(f"\n➡️  Quiz {i + 1}/{len(queue)}: {item['rel']} ({item['status']})")
-            enriched, pending, _ = enrich_single_quiz(args, item["path"], model)
+        for i, (item, pending) in enumerate(queue):
+            print(f"\n➡️  Quiz {i + 1}/{len(queue)}: {item['rel']} ({item['status']}, {pending} in coda)")
+            enriched, pending, _ = enrich_single_quiz(
+                args, item["path"], model, quizzes_root, state, base_data.get(item["rel"])
+            )
             total_fixed += enriched
             total_pending += pending
             processed += 1
-            if i < len(queue) - 1 and not ask_yes_no("Vuoi passare al prossimo quiz?", default_yes=True):
+            if (args.walk_incomplete and i < len(queue) - 1
+                    and not ask_yes_no("Vuoi passare al prossimo quiz?", default_yes=True)):
                 break
 
         print(f"\n🏁 Sessione completata: quiz processati {processed}, arricchite {total_fixed}/{total_pending} domande.")
-        return
+        return 0
 
     quiz_path = resolve_quiz_path(quizzes_root, args.quiz, scan)
     model = pick_model(args) if not args.plan_only else (args.model or "<plan-only>")
     if not args.plan_only:
         verify_connection(args.base_url)
-    enrich_single_quiz(args, quiz_path, model)
+    rel = rel_path(quiz_path, quizzes_root)
+    enrich_single_quiz(args, quiz_path, model, quizzes_root, state, base_data.get(rel))
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
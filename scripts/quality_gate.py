@@ -0,0 +1,373 @@
+"""
+quality_gate.py — Controllo di qualità di explanation e hint del corpus.
+
+Uso:
+    python scripts/quality_gate.py [--quiz sapienza/informatica] [--report qualita.md]
+    python scripts/quality_gate.py --model llama3.2          # i casi dubbi vanno a un giudice LLM
+
+Prima passano euristiche economiche calcolate su tutto il corpus in forma vettoriale (NumPy):
+- hint che ripete il testo dell'opzione corretta (e non quello delle altre) o ne cita la lettera;
+- explanation generiche ("La risposta B è corretta.") senza un vero ragionamento;
+- lunghezze fuori dai limiti e testo troncato (senza punteggiatura finale);
+- explanation/hint in inglese per una domanda in italiano (le domande in inglese accettano entrambe le lingue).
+
+Le penalità si sommano: sotto `BORDERLINE` la domanda passa, altrimenti è dubbia. Le euristiche
+da sole non bocciano mai: le dubbie vengono mandate, a batch, a un modello Ollama che fa da
+giudice, e solo il suo verdetto può bocciarle. Gli esiti sono salvati in `.cache/quality.sqlite`
+per hash di contenuto + explanation + hint, quindi ogni combinazione viene valutata una volta
+sola. Le domande bocciate tornano in coda per l'enrich: `ollama_enrich_quiz.py` le rigenera con
+motivo "qualità insufficiente", purché la coppia explanation/hint non sia stata scritta a mano.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from ollama_enrich_quiz import DEFAULT_BASE_URL
+from quiz_corpus import CACHE_DIR, content_fingerprint, iter_quiz_questions
+
+# Incrementare quando cambiano le euristiche: gli esiti in cache non valgono più.
+HEURISTICS_VERSION = 2
+DEFAULT_DB = CACHE_DIR / "quality.sqlite"
+DEFAULT_BATCH_SIZE = 8
+
+BORDERLINE = 0.4
+SEVERE = 1.0  # peso delle regole che indicano un problema quasi certo
+
+EXPLANATION_MIN, EXPLANATION_SHORT, EXPLANATION_MAX = 40, 80, 1500
+HINT_MIN, HINT_MAX = 10, 300
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_LETTER_REF_RE = re.compile(r"\b(?:risposta|opzione|alternativa|answer|option)\s*\(?[A-Ea-e]\)?(?![\w'])", re.IGNORECASE)
+_GENERIC_RE = re.compile(
+    r"^\s*(?:la\s+)?(?:risposta|opzione|alternativa)\s*\(?[A-E]\)?\s*(?:è|e'|risulta)\s+(?:quella\s+)?corrett[ao]\b"
+    r"[\s,.:;!]*(?:perch[ée]\s*)?",
+    re.IGNORECASE,
+)
+_TERMINAL = tuple(".!?)\"'»:;…`")
+_STOP_IT = frozenset("il lo la di che è e per un una non del della sono con si nel alla gli le da dei delle quando come".split())
+_STOP_EN = frozenset("the of and is to in that a for it are with not be this by which when as an or from".split())
+_SHORT_WORDS = _STOP_IT | _STOP_EN
+
+# (nome, peso): una domanda somma i pesi delle regole che la colpiscono.
+RULES = (
+    ("explanation troppo corta", SEVERE),
+    ("explanation breve", 0.3),
+    ("explanation troppo lunga", 0.5),
+    ("explanation generica", SEVERE),
+    ("explanation cita la lettera", 0.2),
+    ("explanation troncata", 0.5),
+    ("hint troppo corto", SEVERE),
+    ("hint troppo lungo", 0.4),
+    ("hint rivela la risposta", SEVERE),
+    ("hint simile alla risposta", 0.5),
+    ("hint cita la lettera", 0.6),
+    ("hint troncato", 0.4),
+    ("testo in inglese su domanda italiana", SEVERE),
+)
+
+np = None
+
+
+def require_numpy() -> None:
+    global np
+    try:
+        import numpy
+    except ImportError:
+        print("❌ Libreria 'numpy' mancante! Installa con: pip install numpy")
+        sys.exit(1)
+    np = numpy
+
+
+def quality_key(q: dict) -> str:
+    """Chiave della cache: contenuto della domanda + explanation + hint + versione delle euristiche."""
+    raw = "\0".join([
+        content_fingerprint(q), str(q.get("explanation", "")).strip(), str(q.get("hint", "")).strip(),
+        str(HEURISTICS_VERSION),
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def words(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def language(text: str) -> str:
+    tokens = words(text)
+    it = sum(t in _STOP_IT for t in tokens)
+    en = sum(t in _STOP_EN for t in tokens)
+    if it >= 2 and it > 1.5 * en:
+        return "it"
+    if en >= 2 and en > 1.5 * it:
+        return "en"
+    return ""
+
+
+def option_overlap(hint_words: list[str], option: str) -> float:
+    """Quota delle parole significative dell'opzione presenti nell'hint (1 se la contiene tutta)."""
+    option_norm = " ".join(words(option))
+    if len(option_norm) >= 4 and option_norm in " ".join(hint_words):
+        return 1.0
+    content = {w for w in words(option) if len(w) > 2 and w not in _SHORT_WORDS}
+    if len(content) < 3:  # troppo poche parole per distinguere un indizio da una citazione
+        return 0.0
+    return len(content & set(hint_words)) / len(content)
+
+
+def answer_overlap(hint: str, answer: str, others: list[str] | None = None) -> float:
+    """
+    Quanto l'hint punta alla risposta corretta più che alle altre opzioni.
+
+    Un hint che cita la risposta corretta insieme alle alternative (es. un confronto) non la
+    rivela: conta solo lo scarto rispetto all'opzione sbagliata più citata.
+    """
+    hint_words = words(hint)
+    overlap = option_overlap(hint_words, answer)
+    if overlap and others:
+        overlap -= max(option_overlap(hint_words, o) for o in others)
+    return max(overlap, 0.0)
+
+
+def extract_features(items: list[dict]) -> dict:
+    """Feature per domanda in array colonnari (l'unica parte non vettoriale è la tokenizzazione)."""
+    cols = {name: [] for name in (
+        "expl_len", "hint_len", "generic", "generic_rest", "expl_letter", "hint_letter",
+        "expl_truncated", "hint_truncated", "overlap", "wrong_language",
+    )}
+    for q in items:
+        explanation = str(q.get("explanation", "")).strip()
+        hint = str(q.get("hint", "")).strip()
+        options = q.get("options") or []
+        correct = q.get("correctIndex")
+        texts = [str(o.get("text", "")) if isinstance(o, dict) else "" for o in options]
+        answer, others = "", []
+        if isinstance(correct, int) and 0 <= correct < len(options):
+            answer, others = texts[correct], texts[:correct] + texts[correct + 1:]
+        generic = _GENERIC_RE.match(explanation)
+
+        cols["expl_len"].append(len(explanation))
+        cols["hint_len"].append(len(hint))
+        cols["generic"].append(generic is not None)
+        cols["generic_rest"].append(len(explanation) - generic.end() if generic else len(explanation))
+        cols["expl_letter"].append(bool(_LETTER_REF_RE.search(explanation)))
+        cols["hint_letter"].append(bool(_LETTER_REF_RE.search(hint)))
+        cols["expl_truncated"].append(bool(explanation) and not explanation.endswith(_TERMINAL))
+        cols["hint_truncated"].append(bool(hint) and not hint.endswith(_TERMINAL))
+        cols["overlap"].append(answer_overlap(hint, answer, others))
+        cols["wrong_language"].append(
+            language(f"{explanation} {hint}") == "en" and language(str(q.get("question", ""))) == "it"
+        )
+    return {name: np.asarray(values) for name, values in cols.items()}
+
+
+def score_features(f: dict) -> tuple[np.ndarray, np.ndarray]:
+    """Restituisce (penalità totale, matrice booleana domande × regole)."""
+    hits = np.column_stack([
+        f["expl_len"] < EXPLANATION_MIN,
+        (f["expl_len"] >= EXPLANATION_MIN) & (f["expl_len"] < EXPLANATION_SHORT),
+        f["expl_len"] > EXPLANATION_MAX,
+        f["generic"] & (f["generic_rest"] < EXPLANATION_MIN),
+        f["expl_letter"] & ~f["generic"],
+        f["expl_truncated"],
+        f["hint_len"] < HINT_MIN,
+        f["hint_len"] > HINT_MAX,
+        f["overlap"] >= 0.8,
+        (f["overlap"] >= 0.5) & (f["overlap"] < 0.8),
+        f["hint_letter"],
+        f["hint_truncated"],
+        f["wrong_language"],
+    ]) if len(f["expl_len"]) else np.zeros((0, len(RULES)), dtype=bool)
+    weights = np.array([w for _, w in RULES])
+    return hits @ weights, hits
+
+
+def heuristic_verdicts(items: list[dict]) -> list[tuple[str, list[str]]]:
+    """Esito euristico per ogni domanda: ("pass" | "borderline", regole colpite); bocciare spetta al giudice."""
+    if np is None:
+        require_numpy()
+    penalty, hits = score_features(extract_features(items))
+    verdicts = np.where(penalty >= BORDERLINE, "borderline", "pass")
+    names = [name for name, _ in RULES]
+    return [(str(v), [names[j] for j in np.flatnonzero(row)]) for v, row in zip(verdicts, hits)]
+
+
+class QualityCache:
+    """Esiti SQLite per chiave di qualità (contenuto + explanation + hint)."""
+
+    def __init__(self, path: Path = DEFAULT_DB):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            " key TEXT PRIMARY KEY, question_id TEXT NOT NULL, rel TEXT NOT NULL, idx INTEGER NOT NULL,"
+            " verdict TEXT NOT NULL, source TEXT NOT NULL, reasons TEXT NOT NULL, checked_at REAL NOT NULL)"
+        )
+
+    def verdicts(self) -> dict[str, tuple[str, str, list[str]]]:
+        cur = self.conn.execute("SELECT key, verdict, source, reasons FROM verdicts")
+        return {key: (verdict, source, json.loads(reasons)) for key, verdict, source, reasons in cur.fetchall()}
+
+    def failing(self) -> set[str]:
+        return {row[0] for row in self.conn.execute("SELECT key FROM verdicts WHERE verdict = 'fail'")}
+
+    def save(self, rows: list[tuple[str, str, str, int, str, str, list[str]]]) -> None:
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(key, qid, rel, idx, verdict, source, json.dumps(reasons, ensure_ascii=False), now)
+             for key, qid, rel, idx, verdict, source, reasons in rows],
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def build_judge_prompt(batch: list[dict]) -> str:
+    items = []
+    for i, item in enumerate(batch):
+        q = item["q"]
+        opts = "\n".join(f"  {chr(65 + j)}) {o.get('text', '')}" for j, o in enumerate(q["options"]))
+        items.append(
+            f"[{i}]\nDomanda: {q['question']}\nOpzioni:\n{opts}\n"
+            f"Risposta corretta: {chr(65 + q['correctIndex'])}\n"
+            f"Explanation: {q.get('explanation', '')}\nHint: {q.get('hint', '')}\n"
+            f"Possibili problemi rilevati: {', '.join(item['reasons']) or 'nessuno'}"
+        )
+    questions_text = "\n\n".join(items)
+    return f"""Sei un revisore di materiale didattico universitario. Per ogni domanda valuta explanation e hint.
+
+Sono ACCETTABILI se:
+- l'explanation spiega correttamente PERCHÉ la risposta è giusta (non si limita a dire quale lo è);
+- l'hint aiuta a ragionare SENZA rivelare la risposta;
+- entrambi sono completi (non troncati) e scritti in italiano o nella lingua della domanda.
+
+Rispondi SOLO con un array JSON valido, senza markdown, con un oggetto per domanda nell'ordine ricevuto:
+[
+  {{"index": 0, "ok": true, "reason": "breve motivazione"}}
+]
+
+DOMANDE:
+
+{questions_text}
+
+Rispondi SOLO con l'array JSON:"""
+
+
+def judge(args: argparse.Namespace, borderline: list[dict]) -> list[tuple[str, str, list[str]] | None]:
+    """Verdetto del giudice per ogni domanda dubbia; None se il batch è fallito."""
+    from ollama_enrich_quiz import chat, parse_response
+
+    verdicts: list[tuple[str, str, list[str]] | None] = [None] * len(borderline)
+    source = f"judge:{args.model}"
+    for start in range(0, len(borderline), args.batch_size):
+        batch = borderline[start:start + args.batch_size]
+        try:
+            results = parse_response(chat(args.base_url, args.api_key, args.model, build_judge_prompt(batch)))
+        except Exception as exc:
+            print(f"❌ Giudice, batch {start // args.batch_size + 1}: {exc}")
+            continue
+        for r in results or []:
+            idx = r.get("index") if isinstance(r, dict) else None
+            if isinstance(idx, int) and 0 <= idx < len(batch) and isinstance(r.get("ok"), bool):
+                reasons = batch[idx]["reasons"] + [f"giudice: {str(r.get('reason', '')).strip()}"]
+                verdicts[start + idx] = ("pass" if r["ok"] else "fail", source, reasons)
+        done = min(start + args.batch_size, len(borderline))
+        print(f"⚖️  Giudice: {done}/{len(borderline)} domande")
+    return verdicts
+
+
+def collect(args: argparse.Namespace) -> list[dict]:
+    items = []
+    for rel, qid, idx, q in iter_quiz_questions():
+        if args.quiz and not rel.startswith(args.quiz):
+            continue
+        if not (str(q.get("explanation", "")).strip() and str(q.get("hint", "")).strip()):
+            continue  # domande incomplete: se ne occupa già l'enrich
+        options = q.get("options")
+        if (not isinstance(q.get("question"), str) or not isinstance(options, list)
+                or not all(isinstance(o, dict) for o in options) or not isinstance(q.get("correctIndex"), int)):
+            continue
+        items.append({"rel": rel, "qid": qid, "idx": idx, "q": q, "key": quality_key(q)})
+    return items
+
+
+def write_report(items: list[dict], path: Path) -> None:
+    rows = [
+        {"rel": i["rel"], "idx": i["idx"], "question_id": i["qid"], "verdict": i["verdict"],
+         "source": i["source"], "reasons": i["reasons"]}
+        for i in items if i["verdict"] != "pass"
+    ]
+    if path.suffix == ".json":
+        path.write_text(json.dumps(rows, indent=2, ensure_ascii=False), encoding="utf-8")
+        return
+    lines = ["# Qualità di explanation e hint", "", "| File | # | Esito | Fonte | Motivi |", "|---|---|---|---|---|"]
+    for r in rows:
+        lines.append(f"| {r['rel']} | {r['idx']} | {r['verdict']} | {r['source']} | {'; '.join(r['reasons'])} |")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Controllo di qualità di explanation e hint (euristiche + giudice LLM).")
+    parser.add_argument("--quiz", default="", help="Limita il controllo ai quiz con questo prefisso di path (relativo a quizzes/)")
+    parser.add_argument("--model", default=None, help="Modello Ollama che giudica i casi dubbi (se omesso restano dubbi)")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help=f"URL base di Ollama (default: {DEFAULT_BASE_URL})")
+    parser.add_argument("--api-key", default=None, help="API key opzionale (per istanze Ollama con autenticazione)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Domande per chiamata al giudice (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--db", default=str(DEFAULT_DB), help=f"Cache SQLite degli esiti (default: {DEFAULT_DB})")
+    parser.add_argument("--report", default=None, help="Scrive le domande dubbie e bocciate in un report (.md o .json)")
+    args = parser.parse_args(argv)
+    require_numpy()
+
+    cache = QualityCache(Path(args.db))
+    known = cache.verdicts()
+    items = collect(args)
+    pending = [i for i in items if i["key"] not in known]
+
+    start = time.perf_counter()
+    for item, (verdict, reasons) in zip(pending, heuristic_verdicts([i["q"] for i in pending])):
+        item.update(verdict=verdict, source="euristiche", reasons=reasons)
+    elapsed = time.perf_counter() - start
+    print(f"🔎 Domande complete: {len(items)} | già valutate: {len(items) - len(pending)} | "
+          f"euristiche su {len(pending)} in {elapsed * 1000:.0f} ms")
+
+    borderline = [i for i in pending if i["verdict"] == "borderline"]
+    if borderline and args.model:
+        from ollama_enrich_quiz import verify_connection
+        verify_connection(args.base_url)
+        for item, result in zip(borderline, judge(args, borderline)):
+            if result is not None:
+                item["verdict"], item["source"], item["reasons"] = result
+
+    # Le dubbie senza giudizio non vanno in cache: saranno giudicate alla prossima esecuzione con --model.
+    cache.save([(i["key"], i["qid"], i["rel"], i["idx"], i["verdict"], i["source"], i["reasons"])
+                for i in pending if i["verdict"] != "borderline"])
+    cache.close()
+
+    for item in items:
+        if item["key"] in known:
+            item["verdict"], item["source"], item["reasons"] = known[item["key"]]
+    counts = Counter(i["verdict"] for i in items)
+    reasons = Counter(r for i in items if i["verdict"] != "pass" for r in i["reasons"] if not r.startswith("giudice"))
+    print(f"\n✅ Promosse: {counts['pass']} | ❓ dubbie: {counts['borderline']} | ❌ bocciate: {counts['fail']}")
+    for reason, n in reasons.most_common(8):
+        print(f"  - {reason}: {n}")
+    if counts["fail"]:
+        print("🔁 Le bocciate verranno rigenerate da ollama_enrich_quiz.py (motivo: qualità insufficiente).")
+    if args.report:
+        write_report(items, Path(args.report))
+        print(f"💾 Report salvato in: {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
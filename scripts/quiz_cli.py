@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 """
 CLI interattiva per eseguire gli script del progetto da un solo entry point.
+
+Gli script vengono importati ed eseguiti nello stesso processo (chiamando il loro `main(argv)`),
+senza avviare un nuovo interprete per ogni comando. Uso non interattivo:
+
+    python scripts/quiz_cli.py <comando> [argomenti...]    # es. quiz_cli.py validate
 """
 
 from __future__ import annotations
 
+import importlib
+import os
 import shlex
-import subprocess
 import sys
 from pathlib import Path
 
@@ -26,14 +32,122 @@ COMMANDS = [
         "key": "ollama-enrich",
         "label": "Arricchisci quiz (Ollama)",
         "script": "ollama_enrich_quiz.py",
-        "args_hint": "--quiz <path> --model <name> --walk-incomplete --plan-only --force --retries N",
+        "args_hint": "--quiz <path> --model <name> --walk-incomplete --since <ref> --queue --plan-only --force --retries N",
         "examples": [
             "--help",
             "--quiz sapienza/informatica/uniquizzes/so1.json --plan-only",
             "--quiz sapienza/informatica/uniquizzes/so1.json --model llama3.2 --retries 2",
             "--walk-incomplete --model llama3.2",
+            "--since origin/main --model llama3.2",
+            "--queue --model llama3.2 --usage-csv views.csv --budget-minutes 60",
+        ],
+    },
+    {
+        "key": "grade-open",
+        "label": "Valuta risposte aperte (Ollama)",
+        "script": "grade_open_answers.py",
+        "args_hint": "--answers <file> --out <file> --model <name> --workers N --batch-size N",
+        "examples": [
+            "--help",
+            "--list-questions",
+            "--answers risposte.jsonl --out voti.jsonl --model llama3.2 --workers 8",
+        ],
+    },
+    {
+        "key": "build-dist",
+        "label": "Build di distribuzione (minificata/compressa)",
+        "script": "build_dist.py",
+        "args_hint": "--out dist --compress none|gzip|zstd --no-dict",
+        "examples": ["--help", "--compress zstd", "--compress gzip --out dist-gz"],
+    },
+    {
+        "key": "verify-answers",
+        "label": "Verifica correctIndex alla cieca (Ollama)",
+        "script": "verify_answers.py",
+        "args_hint": "--model <name> --base-url URL [--base-url URL ...] --quiz <prefisso> --report <file>",
+        "examples": [
+            "--help",
+            "--model llama3.2 --quiz sapienza/informatica/uniquizzes/so1.json",
+            "--model llama3.2 --base-url http://gpu1:11434 --base-url http://gpu2:11434 --report sospette.md",
+            "--model llama3.2 --report-only --report sospette.md",
         ],
     },
+    {
+        "key": "serve",
+        "label": "Servizio HTTP di consultazione",
+        "script": "serve_quizzes.py",
+        "args_hint": "--host H --port P --workers N --poll S",
+        "examples": ["--help", "--port 8080", "--port 8080 --workers 4"],
+    },
+    {
+        "key": "embed-index",
+        "label": "Indice embedding: domande simili e cluster (Ollama)",
+        "script": "embed_index.py",
+        "args_hint": "build|search|similar|cluster|bench --model <name>",
+        "examples": [
+            "--help",
+            "build --model nomic-embed-text",
+            'search --model nomic-embed-text "scheduling round robin" -k 10',
+            "cluster --model nomic-embed-text --clusters 40",
+            "bench --rows 100000 --dim 768",
+        ],
+    },
+    {
+        "key": "stats",
+        "label": "Statistiche e report di qualità del corpus",
+        "script": "corpus_stats.py",
+        "args_hint": "--json F --markdown F --jobs N --synthetic N",
+        "examples": ["--help", "--markdown report.md", "--synthetic 1000000 --jobs 4"],
+    },
+    {
+        "key": "ingest-pdfs",
+        "label": "Converti in blocco i PDF di _docs",
+        "script": "ingest_pdfs.py",
+        "args_hint": "--backend gemini|ollama --model <name> --extract-workers N --generate-workers N",
+        "examples": [
+            "--help",
+            "--plan-only",
+            "--model gemini-2.0-flash --generate-workers 4",
+            "--backend ollama --model qwen2.5:14b",
+        ],
+    },
+    {
+        "key": "export-parquet",
+        "label": "Esporta il corpus in Parquet",
+        "script": "export_parquet.py",
+        "args_hint": "--out DIR --images hash|table|none --full",
+        "examples": ["--help", "--out exports/parquet", "--images table --full"],
+    },
+    {
+        "key": "quality-gate",
+        "label": "Controllo qualità di explanation e hint",
+        "script": "quality_gate.py",
+        "args_hint": "--quiz PREFIX --model <name> --report F",
+        "examples": [
+            "--help",
+            "--report qualita.md",
+            "--model llama3.2 --report qualita.json",
+        ],
+    },
+    {
+        "key": "study",
+        "label": "Ripasso con ripetizione dilazionata",
+        "script": "study.py",
+        "args_hint": "--user NAME --quiz PREFIX --limit N --new N --due N --stats",
+        "examples": [
+            "--help",
+            "--quiz sapienza/informatica/uniquizzes/so1.json",
+            "--due 20",
+            "--stats",
+        ],
+    },
+    {
+        "key": "courses",
+        "label": "Corsi canonici e viste unificate",
+        "script": "course_taxonomy.py",
+        "args_hint": "check|build|show <id>",
+        "examples": ["--help", "check", "build", "show sistemi-operativi-1"],
+    },
     {
         "key": "validate",
         "label": "Valida JSON quiz",
@@ -86,19 +200,60 @@ def ask_extra_args(cmd: dict) -> list[str]:
             print(f"Argomenti non validi: {exc}")
 
 
+def find_command(key: str) -> dict | None:
+    for cmd in COMMANDS:
+        if key in {cmd["key"], cmd["script"], Path(cmd["script"]).stem}:
+            return cmd
+    return None
+
+
 def run_script(script_name: str, extra_args: list[str]) -> int:
     script_path = SCRIPTS_DIR / script_name
     if not script_path.exists():
         print(f"❌ Script non trovato: {script_path}")
         return 1
 
-    cmd = [sys.executable, str(script_path), *extra_args]
-    print(f"\n▶ Eseguo: {' '.join(shlex.quote(c) for c in cmd)}\n")
-    completed = subprocess.run(cmd, cwd=str(ROOT))
-    return completed.returncode
+    print(f"\n▶ Eseguo: {shlex.join(['scripts/' + script_name, *extra_args])}\n")
+    saved_argv0 = sys.argv[0]
+    sys.argv[0] = str(script_path)  # così argparse mostra il nome dello script in --help
+    try:
+        code = importlib.import_module(script_path.stem).main(extra_args)
+    except SystemExit as exc:
+        code = exc.code
+    except KeyboardInterrupt:
+        print("\n❌ Interrotto.")
+        return 130
+    except Exception as exc:
+        print(f"\n❌ Errore in {script_name}: {type(exc).__name__}: {exc}")
+        return 1
+    finally:
+        sys.argv[0] = saved_argv0
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code)
+    return 1
+
 
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    os.chdir(ROOT)
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+
+    if argv:
+        if argv[0] in {"-h", "--help"}:
+            print(__doc__.strip())
+            print("\nComandi: " + ", ".join(cmd["key"] for cmd in COMMANDS))
+            return 0
+        selection = find_command(argv[0])
+        if selection is None:
+            print(f"❌ Comando sconosciuto: {argv[0]}")
+            print("Comandi: " + ", ".join(cmd["key"] for cmd in COMMANDS))
+            return 2
+        return run_script(selection["script"], argv[1:])
 
-def main() -> int:
     while True:
         print_menu()
         selection = ask_selection()
@@ -0,0 +1,112 @@
+"""
+quiz_corpus.py — Funzioni comuni per leggere il corpus di quiz e domande aperte.
+
+Gli script in questa cartella importano questo modulo per:
+- trovare i file JSON sotto `quizzes/` e `open-questions/` (ignorando le cartelle con prefisso `_`)
+- ricavare università/facoltà/sorgente dal path
+- calcolare ID stabili e fingerprint di contenuto per ogni domanda
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Iterator
+
+ROOT = Path(__file__).resolve().parents[1]
+QUIZZES_DIR = ROOT / "quizzes"
+OPEN_QUESTIONS_DIR = ROOT / "open-questions"
+CACHE_DIR = ROOT / ".cache"
+
+_WS_RE = re.compile(r"\s+")
+
+
+def iter_json_files(base_dir: Path) -> Iterator[Path]:
+    """Restituisce i file .json sotto base_dir in ordine stabile, saltando le cartelle `_*`."""
+    if not base_dir.exists():
+        return
+    for root, dirs, files in os.walk(base_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("_"))
+        for name in sorted(files):
+            if name.endswith(".json"):
+                yield Path(root) / name
+
+
+def load_json_list(path: Path) -> list[dict] | None:
+    """Carica un file del corpus; None se non è leggibile o il root non è un array."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(data, list):
+        return None
+    return data
+
+
+def rel_path(path: Path, base_dir: Path) -> str:
+    return path.relative_to(base_dir).as_posix()
+
+
+def path_parts(rel: str) -> dict:
+    """Scompone `<università>/<facoltà>/<sorgente>/<file>.json` (la sorgente può mancare)."""
+    parts = rel.split("/")
+    return {
+        "university": parts[0] if len(parts) > 1 else "",
+        "faculty": parts[1] if len(parts) > 2 else "",
+        "source_dir": parts[2] if len(parts) > 3 else "",
+        "course": Path(parts[-1]).stem,
+    }
+
+
+def normalize_text(text: str) -> str:
+    return _WS_RE.sub(" ", str(text or "")).strip().lower()
+
+
+def question_ids(rel: str, items: list[dict], text_field: str = "question") -> list[str]:
+    """
+    ID stabili per le domande di un file: hash di path + testo normalizzato.
+
+    Non cambiano se si riordinano le domande o si correggono opzioni/spiegazioni;
+    eventuali testi duplicati nello stesso file vengono distinti con un contatore.
+    """
+    seen: dict[str, int] = {}
+    ids = []
+    for item in items:
+        text = normalize_text(item.get(text_field, "")) if isinstance(item, dict) else ""
+        occurrence = seen.get(text, 0)
+        seen[text] = occurrence + 1
+        key = f"{rel}\0{text}\0{occurrence}" if occurrence else f"{rel}\0{text}"
+        ids.append(hashlib.sha1(key.encode("utf-8")).hexdigest()[:16])
+    return ids
+
+
+def content_fingerprint(q: dict) -> str:
+    """Fingerprint del contenuto 'sorgente' di una domanda (testo, codice, immagine, opzioni, risposta)."""
+    payload = {
+        "question": str(q.get("question", "")).strip(),
+        "code": str(q.get("code", "")).strip(),
+        "image": str(q.get("image", "")).strip(),
+        "options": [
+            [str(o.get("text", "")).strip(), str(o.get("image", "")).strip()] if isinstance(o, dict) else [str(o), ""]
+            for o in q.get("options", [])
+        ],
+        "correctIndex": q.get("correctIndex"),
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def iter_quiz_questions(quizzes_root: Path = QUIZZES_DIR) -> Iterator[tuple[str, str, int, dict]]:
+    """Scorre tutte le domande a risposta multipla: (rel, id, indice, domanda)."""
+    for path in iter_json_files(quizzes_root):
+        data = load_json_list(path)
+        if data is None:
+            continue
+        rel = rel_path(path, quizzes_root)
+        for idx, (qid, q) in enumerate(zip(question_ids(rel, data), data)):
+            if isinstance(q, dict):
+                yield rel, qid, idx, q
@@ -0,0 +1,175 @@
+"""
+quiz_dist.py — Lettore della build di distribuzione creata da `build_dist.py`.
+
+Esempio:
+    from quiz_dist import DistReader
+
+    reader = DistReader("dist")
+    for entry in reader.files(kind="quiz"):
+        print(entry["path"], entry["questions"])
+    for q in reader.iter_questions("quizzes/sapienza/informatica/uniquizzes/so1.json.zst"):
+        print(q["question"])
+
+Il manifest viene letto all'apertura; i file vengono decompressi solo quando servono
+e `iter_questions` decodifica l'array in streaming, una domanda alla volta.
+"""
+
+from __future__ import annotations
+
+import codecs
+import gzip
+import hashlib
+import io
+import json
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WS = " \t\r\n"
+
+
+class DistError(Exception):
+    pass
+
+
+class DistReader:
+    def __init__(self, dist_dir: str | Path, verify: bool = False):
+        self.dist_dir = Path(dist_dir)
+        self.verify = verify
+        manifest_path = self.dist_dir / MANIFEST_NAME
+        if not manifest_path.exists():
+            raise DistError(f"Manifest non trovato: {manifest_path}")
+        with open(manifest_path, encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.compression = self.manifest.get("compression", "none")
+        self._by_path = {}
+        for entry in self.manifest.get("files", []):
+            self._by_path[entry["path"]] = entry
+            self._by_path.setdefault(entry["source"], entry)
+        self._zstd_dict = None
+
+    def files(self, kind: str | None = None) -> list[dict]:
+        """Voci del manifest, opzionalmente filtrate per tipo (`quiz` o `open`)."""
+        return [e for e in self.manifest.get("files", []) if kind is None or e["kind"] == kind]
+
+    def entry(self, name: str) -> dict:
+        """Cerca una voce per path nella build o per path sorgente (es. `quizzes/.../so1.json`)."""
+        try:
+            return self._by_path[name]
+        except KeyError:
+            raise DistError(f"File non presente nel manifest: {name}") from None
+
+    def _decompressor(self):
+        if zstandard is None:
+            raise DistError("Libreria 'zstandard' mancante! Installa con: pip install zstandard")
+        if self._zstd_dict is None:
+            info = self.manifest.get("dictionary")
+            if info:
+                dict_bytes = (self.dist_dir / info["path"]).read_bytes()
+                self._zstd_dict = zstandard.ZstdCompressionDict(dict_bytes)
+            else:
+                self._zstd_dict = False
+        if self._zstd_dict:
+            return zstandard.ZstdDecompressor(dict_data=self._zstd_dict)
+        return zstandard.ZstdDecompressor()
+
+    def open_stream(self, name: str) -> io.BufferedIOBase:
+        """Apre un file della build restituendo uno stream binario già decompresso."""
+        path = self.dist_dir / self.entry(name)["path"]
+        if self.compression == "gzip":
+            return gzip.open(path, "rb")
+        if self.compression == "zstd":
+            return self._decompressor().stream_reader(open(path, "rb"), closefd=True)
+        return open(path, "rb")
+
+    def read_bytes(self, name: str) -> bytes:
+        entry = self.entry(name)
+        with self.open_stream(name) as stream:
+            payload = stream.read()
+        if self.verify and hashlib.sha256(payload).hexdigest() != entry["sha256"]:
+            raise DistError(f"Hash non corrispondente per {entry['path']}")
+        return payload
+
+    def load(self, name: str) -> list[dict]:
+        """Decomprime e decodifica l'intero file."""
+        return json.loads(self.read_bytes(name))
+
+    def iter_questions(self, name: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict]:
+        """Restituisce le domande una alla volta senza caricare in memoria l'intero array."""
+        with self.open_stream(name) as stream:
+            yield from iter_json_array(stream, chunk_size)
+
+
+def iter_json_array(stream: io.BufferedIOBase, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator:
+    """Decodifica incrementale di un array JSON letto a blocchi da uno stream binario."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+            buf = buf[pos:] + utf8.decode(b"", final=True)
+        else:
+            buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+        return True
+
+    def skip(chars: str) -> None:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or not fill():
+                return
+
+    skip(_WS)
+    if pos >= len(buf) or buf[pos] != "[":
+        raise DistError("Il contenuto non è un array JSON.")
+    pos += 1
+
+    skip(_WS)
+    if pos < len(buf) and buf[pos] == "]":
+        return
+    while True:
+        skip(_WS)
+        if pos >= len(buf):
+            raise DistError("Array JSON non terminato.")
+        if buf[pos] in ",]":
+            raise DistError("Array JSON non valido: valore mancante.")
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+            if end >= len(buf) and not eof:
+                # Il valore potrebbe proseguire nel blocco successivo (es. numeri).
+                fill()
+                continue
+            pos = end
+            yield value
+            break
+        # Tra due valori esattamente una virgola; dopo l'ultimo la parentesi di chiusura.
+        skip(_WS)
+        if pos >= len(buf):
+            raise DistError("Array JSON non terminato.")
+        if buf[pos] == "]":
+            return
+        if buf[pos] != ",":
+            raise DistError("Array JSON non valido: atteso ',' o ']'.")
+        pos += 1
@@ -0,0 +1,406 @@
+"""
+serve_quizzes.py — Servizio HTTP in sola lettura sul corpus di quiz e domande aperte.
+
+Uso:
+    python scripts/serve_quizzes.py [--host 127.0.0.1] [--port 8080] [--workers 1] [--poll 2]
+
+Endpoint (risposte JSON):
+    GET /v1/universities
+    GET /v1/faculties?university=sapienza
+    GET /v1/courses?university=sapienza&faculty=informatica&kind=quiz|open
+    GET /v1/questions?course=quizzes/sapienza/informatica/uniquizzes/so1.json&offset=0&limit=50
+    GET /v1/questions/<id>
+    GET /v1/exam?course=<course>[&course=<course>...]&n=30[&seed=42]
+    GET /v1/merged/courses
+    GET /v1/merged/questions?course=sistemi-operativi-1&offset=0&limit=50
+    GET /health
+
+Tutto il corpus è caricato in memoria con indici per corso e per ID domanda. Le risposte
+hanno un ETag (richieste con `If-None-Match` ricevono 304) e vengono memorizzate finché
+il corpus non cambia. Un thread controlla periodicamente gli mtime dei file e ricarica
+solo quelli modificati. I corsi canonici di `taxonomy.json` (vedi `course_taxonomy.py`) sono
+viste che puntano alle domande già in memoria: a ogni ricarica si ricostruiscono solo quelle
+dei corsi che includono un file cambiato. Con `--workers N` (Linux/macOS) più processi condividono la porta
+tramite SO_REUSEPORT.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from course_taxonomy import MergedCourse, TaxonomyError, ViewBuilder, load_taxonomy
+from quiz_corpus import OPEN_QUESTIONS_DIR, QUIZZES_DIR, iter_json_files, load_json_list, path_parts, question_ids, rel_path
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 1
+DEFAULT_POLL = 2.0
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+DEFAULT_EXAM_SIZE = 30
+RESPONSE_CACHE_SIZE = 2048
+
+SOURCES = (("quiz", "quizzes", QUIZZES_DIR, "question"), ("open", "open-questions", OPEN_QUESTIONS_DIR, "text"))
+
+
+class CourseFile:
+    """Un file del corpus già caricato: metadati, domande e relativi ID."""
+
+    __slots__ = ("course", "kind", "rel", "parts", "mtime", "questions", "ids")
+
+    def __init__(self, kind: str, top: str, base: Path, path: Path, text_field: str):
+        self.kind = kind
+        self.rel = rel_path(path, base)
+        self.course = f"{top}/{self.rel}"
+        self.parts = path_parts(self.rel)
+        self.mtime = path.stat().st_mtime_ns
+        self.questions = load_json_list(path) or []
+        self.ids = question_ids(self.rel, self.questions, text_field=text_field)
+
+    def summary(self) -> dict:
+        return {
+            "course": self.course,
+            "kind": self.kind,
+            "university": self.parts["university"],
+            "faculty": self.parts["faculty"],
+            "source_dir": self.parts["source_dir"],
+            "name": self.parts["course"],
+            "questions": len(self.questions),
+        }
+
+
+class Snapshot:
+    """Vista immutabile del corpus: i thread delle richieste leggono sempre uno snapshot coerente."""
+
+    def __init__(self, files: dict[str, CourseFile], generation: int, merged: dict[str, MergedCourse] | None = None):
+        self.files = files
+        self.generation = generation
+        self.merged = merged or {}
+        self.by_id: dict[str, tuple[CourseFile, int]] = {}
+        for cf in files.values():
+            for idx, qid in enumerate(cf.ids):
+                self.by_id[qid] = (cf, idx)
+        self.courses = sorted((cf.summary() for cf in files.values()), key=lambda c: c["course"])
+
+
+class Corpus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.snapshot = Snapshot({}, 0)
+        try:
+            self.views = ViewBuilder(load_taxonomy())
+        except TaxonomyError as exc:
+            print(f"⚠️  Corsi canonici non disponibili: {exc}", flush=True)
+            self.views = None
+        self.reload()
+
+    def _scan(self) -> dict[str, tuple[str, str, Path, Path, str]]:
+        found = {}
+        for kind, top, base, text_field in SOURCES:
+            for path in iter_json_files(base):
+                found[f"{top}/{rel_path(path, base)}"] = (kind, top, base, path, text_field)
+        return found
+
+    def reload(self) -> list[str]:
+        """Ricarica i file nuovi/modificati/rimossi; restituisce i corsi cambiati."""
+        with self._lock:
+            old = self.snapshot.files
+            files = {}
+            changed = []
+            for course, (kind, top, base, path, text_field) in self._scan().items():
+                current = old.get(course)
+                try:
+                    mtime = path.stat().st_mtime_ns
+                except OSError:
+                    continue
+                if current is not None and current.mtime == mtime:
+                    files[course] = current
+                    continue
+                files[course] = CourseFile(kind, top, base, path, text_field)
+                changed.append(course)
+            changed.extend(c for c in old if c not in files)
+            if changed or not old:
+                merged = self.snapshot.merged
+                if self.views is not None:
+                    stamps = {course: cf.mtime for course, cf in files.items()}
+                    if self.views.update(stamps, lambda c: (files[c].questions, files[c].ids)):
+                        merged = dict(self.views.views)
+                self.snapshot = Snapshot(files, self.snapshot.generation + 1, merged)
+            return changed
+
+    def watch(self, interval: float) -> None:
+        def loop() -> None:
+            while True:
+                time.sleep(interval)
+                try:
+                    changed = self.reload()
+                except Exception as exc:
+                    # Il polling continua: il prossimo giro riprova con i file corretti.
+                    print(f"⚠️  [{os.getpid()}] Ricarica non riuscita: {exc}", flush=True)
+                    continue
+                if changed:
+                    print(f"🔄 [{os.getpid()}] Ricaricati: {', '.join(changed)}", flush=True)
+        threading.Thread(target=loop, daemon=True).start()
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def param(query: dict, name: str, default: str | None = None) -> str | None:
+    values = query.get(name)
+    return values[0] if values else default
+
+
+def int_param(query: dict, name: str, default: int, lo: int, hi: int) -> int:
+    raw = param(query, name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise HttpError(400, f"'{name}' deve essere un intero") from None
+    return min(max(value, lo), hi)
+
+
+def question_payload(cf: CourseFile, idx: int) -> dict:
+    return {"id": cf.ids[idx], "course": cf.course, "index": idx, **cf.questions[idx]}
+
+
+def merged_payload(snap: Snapshot, entry: tuple[str, str, tuple, bool]) -> dict:
+    qid, _, duplicates, conflict = entry
+    return {**question_payload(*snap.by_id[qid]), "duplicates": list(duplicates), "conflict": conflict}
+
+
+def get_course(snap: Snapshot, query: dict) -> CourseFile:
+    course = param(query, "course")
+    if not course:
+        raise HttpError(400, "Parametro 'course' obbligatorio")
+    cf = snap.files.get(course)
+    if cf is None:
+        raise HttpError(404, f"Corso non trovato: {course}")
+    return cf
+
+
+def route(snap: Snapshot, path: str, query: dict) -> tuple[object, bool]:
+    """Restituisce (payload, cacheable)."""
+    if path == "/health":
+        return {"status": "ok", "generation": snap.generation, "courses": len(snap.files), "questions": len(snap.by_id)}, False
+
+    if path == "/v1/universities":
+        counts: dict[str, int] = {}
+        for c in snap.courses:
+            counts[c["university"]] = counts.get(c["university"], 0) + c["questions"]
+        return [{"university": u, "questions": n} for u, n in sorted(counts.items())], True
+
+    if path == "/v1/faculties":
+        university = param(query, "university")
+        counts = {}
+        for c in snap.courses:
+            if university is None or c["university"] == university:
+                key = (c["university"], c["faculty"])
+                counts[key] = counts.get(key, 0) + c["questions"]
+        return [{"university": u, "faculty": f, "questions": n} for (u, f), n in sorted(counts.items())], True
+
+    if path == "/v1/courses":
+        filters = {k: param(query, k) for k in ("university", "faculty", "kind")}
+        return [c for c in snap.courses if all(v is None or c[k] == v for k, v in filters.items())], True
+
+    if path == "/v1/questions":
+        cf = get_course(snap, query)
+        offset = int_param(query, "offset", 0, 0, len(cf.questions))
+        limit = int_param(query, "limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        items = [question_payload(cf, i) for i in range(offset, min(offset + limit, len(cf.questions)))]
+        next_offset = offset + limit if offset + limit < len(cf.questions) else None
+        return {"course": cf.course, "total": len(cf.questions), "offset": offset, "next": next_offset, "items": items}, True
+
+    if path.startswith("/v1/questions/"):
+        qid = path.rsplit("/", 1)[1]
+        found = snap.by_id.get(qid)
+        if found is None:
+            raise HttpError(404, f"Domanda non trovata: {qid}")
+        return question_payload(*found), True
+
+    if path == "/v1/exam":
+        courses = query.get("course") or []
+        if not courses:
+            raise HttpError(400, "Parametro 'course' obbligatorio (ripetibile)")
+        pool = []
+        for course in courses:
+            cf = get_course(snap, {"course": [course]})
+            pool.extend((cf, i) for i in range(len(cf.questions)))
+        n = int_param(query, "n", DEFAULT_EXAM_SIZE, 1, MAX_PAGE_SIZE)
+        seed = param(query, "seed")
+        rng = random.Random(seed) if seed is not None else random
+        picked = rng.sample(pool, min(n, len(pool)))
+        return {"seed": seed, "items": [question_payload(cf, i) for cf, i in picked]}, seed is not None
+
+    if path == "/v1/merged/courses":
+        return [view.summary() for view in snap.merged.values()], True
+
+    if path == "/v1/merged/questions":
+        course = param(query, "course")
+        if not course:
+            raise HttpError(400, "Parametro 'course' obbligatorio")
+        view = snap.merged.get(course)
+        if view is None:
+            raise HttpError(404, f"Corso canonico non trovato: {course}")
+        total = len(view.entries)
+        offset = int_param(query, "offset", 0, 0, total)
+        limit = int_param(query, "limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        items = [merged_payload(snap, e) for e in view.entries[offset:offset + limit]]
+        next_offset = offset + limit if offset + limit < total else None
+        return {"course": view.id, "title": view.title, "total": total, "offset": offset, "next": next_offset,
+                "items": items}, True
+
+    raise HttpError(404, f"Endpoint non trovato: {path}")
+
+
+class ResponseCache:
+    """LRU delle risposte serializzate, invalidata al cambio di generazione del corpus."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._items: OrderedDict[tuple, tuple[bytes, str]] = OrderedDict()
+
+    def get(self, key: tuple) -> tuple[bytes, str] | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key: tuple, value: tuple[bytes, str]) -> None:
+        with self._lock:
+            self._items[key] = value
+            if len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+def make_handler(corpus: Corpus, cache: ResponseCache):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version = "uni-quiz-data"
+        # Header e body vengono scritti separatamente: senza TCP_NODELAY le connessioni
+        # keep-alive pagano ~40 ms di delayed ACK a ogni risposta.
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):  # noqa: A002 - firma di BaseHTTPRequestHandler
+            pass
+
+        def send_body(self, status: int, body: bytes, etag: str | None, cacheable: bool) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if etag:
+                self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache" if cacheable else "no-store")
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            snap = corpus.snapshot
+            url = urlsplit(self.path)
+            key = (snap.generation, url.path, url.query)
+            cached = cache.get(key)
+            if cached is None:
+                try:
+                    payload, cacheable = route(snap, url.path, parse_qs(url.query))
+                except HttpError as exc:
+                    body = json.dumps({"error": str(exc)}, ensure_ascii=False).encode("utf-8")
+                    self.send_body(exc.status, body, None, False)
+                    return
+                body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                if not cacheable:
+                    self.send_body(200, body, None, False)
+                    return
+                cached = (body, f'"{hashlib.sha1(body).hexdigest()}"')
+                cache.put(key, cached)
+
+            body, etag = cached
+            if self.headers.get("If-None-Match") == etag:
+                self.send_body(304, b"", etag, True)
+            else:
+                self.send_body(200, body, etag, True)
+
+    return Handler
+
+
+class ReusePortServer(ThreadingHTTPServer):
+    daemon_threads = True
+    reuse_port = False
+
+    def server_bind(self):
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def serve(host: str, port: int, poll: float, reuse_port: bool) -> None:
+    corpus = Corpus()
+    if poll > 0:
+        corpus.watch(poll)
+    ReusePortServer.reuse_port = reuse_port
+    server = ReusePortServer((host, port), make_handler(corpus, ResponseCache(RESPONSE_CACHE_SIZE)))
+    snap = corpus.snapshot
+    print(f"🌐 [{os.getpid()}] In ascolto su http://{host}:{port} "
+          f"({len(snap.files)} file, {len(snap.by_id)} domande)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Servizio HTTP in sola lettura sul corpus di quiz.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Indirizzo di ascolto (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Porta (default: {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Processi che condividono la porta con SO_REUSEPORT (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL,
+                        help=f"Intervallo in secondi per il controllo dei file modificati, 0 = disattivato (default: {DEFAULT_POLL})")
+    args = parser.parse_args(argv)
+
+    if args.workers <= 1:
+        serve(args.host, args.port, args.poll, reuse_port=False)
+        return 0
+
+    if not hasattr(socket, "SO_REUSEPORT") or not hasattr(os, "fork"):
+        print("❌ --workers > 1 richiede SO_REUSEPORT e fork (Linux/macOS)")
+        return 1
+
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            serve(args.host, args.port, args.poll, reuse_port=True)
+            os._exit(0)
+        children.append(pid)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        print("\nInterrotto.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+structured_output.py — Schemi JSON per l'output vincolato dei modelli e decoder con validazione.
+
+- `generation_schema()`: schema di un quiz, letto da `schema/schema.json` (per Gemini `response_schema`).
+- `ENRICH_SCHEMA`: schema della risposta di enrich `[{index, explanation, hint}]` (per Ollama `format`).
+- `decode(text, schema)`: decodifica la risposta del modello e la valida contro lo schema.
+
+Il validatore copre il sottoinsieme di JSON Schema usato dagli schemi del progetto
+(type, properties, required, items, minItems, enum) e viene compilato una sola volta
+in una catena di funzioni, così la validazione di ogni risposta costa poco.
+"""
+
+from __future__ import annotations
+
+import json
+from functools import lru_cache
+from typing import Callable
+
+from quiz_corpus import ROOT
+
+SCHEMA_PATH = ROOT / "schema" / "schema.json"
+
+ENRICH_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "index": {"type": "integer"},
+            "explanation": {"type": "string"},
+            "hint": {"type": "string"},
+        },
+        "required": ["index", "explanation", "hint"],
+    },
+}
+
+# Chiavi di JSON Schema non accettate da `response_schema` di Gemini.
+_GEMINI_UNSUPPORTED = {"$schema", "title", "minItems", "maxItems", "additionalProperties"}
+
+Validator = Callable[[object, str, list], None]
+
+
+@lru_cache(maxsize=1)
+def generation_schema() -> dict:
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def to_gemini_schema(schema: dict) -> dict:
+    """Rimuove ricorsivamente le chiavi non supportate da Gemini."""
+    if isinstance(schema, dict):
+        return {k: to_gemini_schema(v) for k, v in schema.items() if k not in _GEMINI_UNSUPPORTED}
+    if isinstance(schema, list):
+        return [to_gemini_schema(v) for v in schema]
+    return schema
+
+
+_TYPE_CHECKS = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+}
+
+
+def compile_validator(schema: dict) -> Validator:
+    """Compila lo schema in una funzione `check(value, path, errors)` che accumula gli errori."""
+    checks: list[Validator] = []
+
+    type_name = schema.get("type")
+    if type_name:
+        type_check = _TYPE_CHECKS[type_name]
+
+        def check_type(value, path, errors, _t=type_name, _c=type_check):
+            if not _c(value):
+                errors.append(f"{path}: atteso {_t}")
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path}: valore non ammesso {value!r}")
+        checks.append(check_enum)
+
+    if type_name == "object":
+        required = schema.get("required", [])
+        props = {k: compile_validator(v) for k, v in schema.get("properties", {}).items()}
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for key in required:
+                if key not in value:
+                    errors.append(f"{path}: manca '{key}'")
+            for key, sub in props.items():
+                if key in value:
+                    sub(value[key], f"{path}.{key}", errors)
+        checks.append(check_object)
+
+    if type_name == "array":
+        min_items = schema.get("minItems")
+        item_check = compile_validator(schema["items"]) if "items" in schema else None
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                return
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{path}: almeno {min_items} elementi")
+            if item_check is not None:
+                for i, item in enumerate(value):
+                    item_check(item, f"{path}[{i}]", errors)
+        checks.append(check_array)
+
+    def check(value, path, errors):
+        for c in checks:
+            c(value, path, errors)
+    return check
+
+
+# id(schema) → (schema, validatore). Il riferimento allo schema lo tiene in vita, quindi l'id non
+# può essere riusato da un altro oggetto; gli schemi del progetto sono costanti, la cache resta piccola.
+_VALIDATORS: dict[int, tuple[dict, Validator]] = {}
+
+
+def validator_for(schema: dict) -> Validator:
+    cached = _VALIDATORS.get(id(schema))
+    if cached is None:
+        cached = _VALIDATORS[id(schema)] = (schema, compile_validator(schema))
+    return cached[1]
+
+
+def extract_json(text: str):
+    """Decodifica diretta; se fallisce ripiega sull'estrazione da blocchi ``` o dal primo `[`/`{`."""
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    if "```" in text:
+        inner = text.split("```json", 1)[1] if "```json" in text else text.split("```", 1)[1]
+        text = inner.split("```", 1)[0].strip()
+    starts = [i for i in (text.find("["), text.find("{")) if i != -1]
+    if not starts:
+        raise ValueError("nessun JSON nella risposta")
+    start = min(starts)
+    end = max(text.rfind("]"), text.rfind("}"))
+    return json.loads(text[start:end + 1])
+
+
+def decode(text: str, schema: dict) -> tuple[object | None, list[str]]:
+    """Restituisce (valore, errori). Con errori non vuoti il valore non va usato."""
+    if not isinstance(text, str):
+        return None, [f"risposta non testuale: {type(text).__name__}"]
+    try:
+        value = extract_json(text)
+    except (ValueError, json.JSONDecodeError) as exc:
+        return None, [f"JSON non valido: {exc}"]
+    # Alcuni backend restituiscono l'array avvolto in un oggetto ({"items": [...]}).
+    if schema.get("type") == "array" and isinstance(value, dict) and len(value) == 1:
+        (only,) = value.values()
+        if isinstance(only, list):
+            value = only
+    errors: list[str] = []
+    validator_for(schema)(value, "$", errors)
+    return (value if not errors else None), errors
@@ -0,0 +1,325 @@
+"""
+study.py — Ripasso dei quiz con ripetizione dilazionata (SM-2).
+
+Uso:
+    python scripts/study.py --user mario --quiz sapienza/informatica/uniquizzes/so1.json
+    python scripts/study.py --user mario --due 20        # prossime 20 carte in scadenza
+    python scripts/study.py --user mario --stats
+
+Ogni domanda a risposta multipla è una carta identificata dal suo ID stabile
+(`quiz_corpus.question_ids`), quindi lo stato sopravvive al riordino delle domande e alle correzioni
+di opzioni e spiegazioni. Se invece cambia il testo della domanda o il file che la contiene, l'ID
+cambia: la vecchia carta resta orfana e viene eliminata alla prima sessione che la incontra, la
+domanda riparte come carta nuova.
+Dopo ogni risposta la carta viene ripianificata con SM-2 (variante a quattro voti, come Anki):
+sbagliata -> di nuovo fra 10 minuti; giusta -> intervallo di 1, 6, poi intervallo × facilità giorni.
+
+Lo stato di tutti gli utenti sta in `.cache/study.sqlite`, una riga di soli interi per
+(utente, carta) in una tabella WITHOUT ROWID con indice (utente, scadenza): le prossime N carte
+in scadenza di un utente, su tutti i suoi corsi, costano O(log n + N). Le domande vengono lette
+dal corpus solo quando servono, un file alla volta.
+"""
+
+from __future__ import annotations
+
+import argparse
+import getpass
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator
+
+from quiz_corpus import CACHE_DIR, QUIZZES_DIR, iter_json_files, load_json_list, question_ids, rel_path
+
+DEFAULT_DB = CACHE_DIR / "study.sqlite"
+DEFAULT_LIMIT = 20
+DEFAULT_NEW = 10
+FILE_CACHE_SIZE = 8
+
+DAY = 86400
+RELEARN_DELAY = 600  # secondi prima di riproporre una carta sbagliata
+
+AGAIN, HARD, GOOD, EASY = 1, 2, 3, 4
+GRADE_NAMES = {AGAIN: "di nuovo", HARD: "difficile", GOOD: "buona", EASY: "facile"}
+
+# Facilità in millesimi (2500 = ×2,5), come il "factor" di Anki: resta un intero compatto.
+START_EASE = 2500
+MIN_EASE = 1300
+EASE_DELTA = {AGAIN: -200, HARD: -150, GOOD: 0, EASY: 150}
+HARD_FACTOR = 1.2
+EASY_BONUS = 1.3
+
+
+def schedule(card: tuple[int, int, int, int] | None, grade: int, now: int) -> tuple[int, int, int, int, int]:
+    """
+    Nuovo stato SM-2 dopo un voto.
+
+    `card` è (intervallo in giorni, facilità, ripetizioni, errori) oppure None per una carta nuova;
+    restituisce (scadenza, intervallo, facilità, ripetizioni, errori).
+    """
+    interval, ease, reps, lapses = card or (0, START_EASE, 0, 0)
+    ease = max(MIN_EASE, ease + EASE_DELTA[grade])
+    if grade == AGAIN:
+        return now + RELEARN_DELAY, 0, ease, 0, lapses + (1 if reps else 0)
+    if reps == 0:
+        interval = 4 if grade == EASY else 1
+    elif reps == 1:
+        interval = {HARD: 3, GOOD: 6, EASY: 8}[grade]
+    elif grade == HARD:
+        interval = max(interval + 1, round(interval * HARD_FACTOR))
+    else:
+        interval = max(interval + 1, round(interval * ease / 1000 * (EASY_BONUS if grade == EASY else 1)))
+    return now + interval * DAY, interval, ease, reps + 1, lapses
+
+
+class StudyStore:
+    """Stato di ripasso di tutti gli utenti (SQLite, solo interi)."""
+
+    def __init__(self, path: Path = DEFAULT_DB):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript(
+            "PRAGMA journal_mode = WAL;"
+            "CREATE TABLE IF NOT EXISTS users (num INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);"
+            "CREATE TABLE IF NOT EXISTS questions ("
+            " num INTEGER PRIMARY KEY, question_id TEXT NOT NULL UNIQUE, rel TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS cards ("
+            " user INTEGER NOT NULL, question INTEGER NOT NULL, due INTEGER NOT NULL,"
+            " interval INTEGER NOT NULL, ease INTEGER NOT NULL, reps INTEGER NOT NULL, lapses INTEGER NOT NULL,"
+            " PRIMARY KEY (user, question)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS cards_due ON cards (user, due);"
+        )
+
+    def user(self, name: str) -> int:
+        self.conn.execute("INSERT OR IGNORE INTO users (name) VALUES (?)", (name,))
+        return self.conn.execute("SELECT num FROM users WHERE name = ?", (name,)).fetchone()[0]
+
+    def question(self, question_id: str, rel: str) -> int:
+        """Numero interno della domanda (l'ID include già il file, quindi `rel` non cambia mai)."""
+        self.conn.execute("INSERT OR IGNORE INTO questions (question_id, rel) VALUES (?, ?)", (question_id, rel))
+        return self.conn.execute("SELECT num FROM questions WHERE question_id = ?", (question_id,)).fetchone()[0]
+
+    def due(self, user: int, until: int, n: int, prefix: str = "") -> list[tuple[str, str, int]]:
+        """Le prossime `n` carte con scadenza entro `until`, le più vecchie prima: (question_id, rel, scadenza)."""
+        return self.conn.execute(
+            "SELECT q.question_id, q.rel, c.due FROM cards c JOIN questions q ON q.num = c.question"
+            " WHERE c.user = ? AND c.due <= ? AND substr(q.rel, 1, ?) = ? ORDER BY c.due LIMIT ?",
+            (user, until, len(prefix), prefix, n),
+        ).fetchall()
+
+    def known(self, user: int) -> set[str]:
+        cur = self.conn.execute(
+            "SELECT q.question_id FROM cards c JOIN questions q ON q.num = c.question WHERE c.user = ?", (user,)
+        )
+        return {row[0] for row in cur}
+
+    def forget(self, user: int, question_ids: list[str]) -> None:
+        """Elimina le carte dell'utente per domande che non esistono più nel corpus."""
+        self.conn.executemany(
+            "DELETE FROM cards WHERE user = ? AND question = (SELECT num FROM questions WHERE question_id = ?)",
+            [(user, qid) for qid in question_ids],
+        )
+        self.conn.commit()
+
+    def review(self, user: int, question_id: str, rel: str, grade: int, now: int) -> tuple[int, int, int, int, int]:
+        num = self.question(question_id, rel)
+        card = self.conn.execute(
+            "SELECT interval, ease, reps, lapses FROM cards WHERE user = ? AND question = ?", (user, num)
+        ).fetchone()
+        state = schedule(card, grade, now)
+        self.conn.execute("INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?)", (user, num, *state))
+        self.conn.commit()
+        return state
+
+    def stats(self, user: int, now: int) -> dict:
+        total, due, lapses, mature = self.conn.execute(
+            "SELECT count(*), coalesce(sum(due <= ?), 0), coalesce(sum(lapses), 0), coalesce(sum(interval >= 21), 0)"
+            " FROM cards WHERE user = ?",
+            (now, user),
+        ).fetchone()
+        tomorrow = self.conn.execute(
+            "SELECT count(*) FROM cards WHERE user = ? AND due > ? AND due <= ?", (user, now, now + DAY)
+        ).fetchone()[0]
+        return {"cards": total, "due": due, "due_tomorrow": tomorrow, "mature": mature, "lapses": lapses}
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+
+class QuestionSource:
+    """Legge le domande dal corpus su richiesta, tenendo in memoria solo gli ultimi file usati."""
+
+    def __init__(self, quizzes_root: Path = QUIZZES_DIR, max_files: int = FILE_CACHE_SIZE):
+        self.root = quizzes_root
+        self.max_files = max_files
+        self.files: OrderedDict[str, dict[str, dict]] = OrderedDict()
+
+    def _file(self, rel: str) -> dict[str, dict]:
+        if rel in self.files:
+            self.files.move_to_end(rel)
+            return self.files[rel]
+        data = load_json_list(self.root / rel) or []
+        by_id = {qid: q for qid, q in zip(question_ids(rel, data), data) if is_playable(q)}
+        self.files[rel] = by_id
+        if len(self.files) > self.max_files:
+            self.files.popitem(last=False)
+        return by_id
+
+    def get(self, rel: str, question_id: str) -> dict | None:
+        return self._file(rel).get(question_id)
+
+    def new_cards(self, prefix: str, known: set[str]) -> Iterator[tuple[str, str, dict]]:
+        """Domande mai viste sotto il prefisso, nell'ordine dei file: (question_id, rel, domanda)."""
+        for path in iter_json_files(self.root):
+            rel = rel_path(path, self.root)
+            if not rel.startswith(prefix):
+                continue
+            for qid, q in self._file(rel).items():
+                if qid not in known:
+                    yield qid, rel, q
+
+
+def is_playable(q) -> bool:
+    return (
+        isinstance(q, dict) and isinstance(q.get("options"), list) and q["options"]
+        and isinstance(q.get("correctIndex"), int) and 0 <= q["correctIndex"] < len(q["options"])
+    )
+
+
+def option_text(o) -> str:
+    return str(o.get("text", "")) if isinstance(o, dict) else str(o)
+
+
+def ask(q: dict, position: str) -> int | None:
+    """Mostra una carta e restituisce il voto (None = esci)."""
+    print(f"\n{'─' * 50}\n{position}  {q.get('question', '')}")
+    if q.get("code"):
+        print(f"\n{q['code']}")
+    letters = [chr(65 + i) for i in range(len(q["options"]))]
+    for letter, o in zip(letters, q["options"]):
+        print(f"  {letter}) {option_text(o)}")
+    while True:
+        raw = input(f"\nRisposta [{'/'.join(letters)}, h = hint, q = esci]: ").strip().upper()
+        if raw == "Q":
+            return None
+        if raw == "H":
+            print(f"💡 {q.get('hint') or 'Nessun hint disponibile.'}")
+            continue
+        if raw in letters:
+            break
+    correct = q["correctIndex"]
+    if letters.index(raw) != correct:
+        print(f"❌ Sbagliata: la risposta corretta è {letters[correct]}) {option_text(q['options'][correct])}")
+        if q.get("explanation"):
+            print(f"📖 {q['explanation']}")
+        return AGAIN
+    print("✅ Corretta!")
+    if q.get("explanation"):
+        print(f"📖 {q['explanation']}")
+    raw = input("Com'è andata? [d = difficile, invio = buona, f = facile]: ").strip().lower()
+    return {"d": HARD, "f": EASY}.get(raw, GOOD)
+
+
+def due_cards(store: StudyStore, source: QuestionSource, user: int, now: int, prefix: str,
+              limit: int) -> list[tuple[str, str, dict]]:
+    """
+    Fino a `limit` carte scadute ancora presenti nel corpus: (question_id, rel, domanda).
+
+    Se ne leggono più di `limit` perché alcune possono essere orfane; le orfane vengono eliminate
+    e, se la sessione non è piena, si legge di nuovo.
+    """
+    session: list[tuple[str, str, dict]] = []
+    seen: set[str] = set()
+    fetch = limit * 2
+    removed = 0
+    while len(session) < limit:
+        rows = store.due(user, now, fetch, prefix)
+        orphans = []
+        for qid, rel, _ in rows:
+            if qid in seen:
+                continue
+            seen.add(qid)
+            q = source.get(rel, qid)
+            if q is None:
+                orphans.append(qid)
+            elif len(session) < limit:
+                session.append((qid, rel, q))
+        if not orphans:
+            break
+        store.forget(user, orphans)
+        removed += len(orphans)
+        if len(rows) < fetch:
+            break
+    if removed:
+        print(f"🧹 {removed} carte eliminate: domande modificate o spostate, non più presenti nel corpus.")
+    return session
+
+
+def study(store: StudyStore, source: QuestionSource, user: int, prefix: str, limit: int, new: int) -> int:
+    now = int(time.time())
+    session = due_cards(store, source, user, now, prefix, limit)
+    if len(session) < limit and new > 0:
+        fresh = source.new_cards(prefix, store.known(user))
+        for card in fresh:
+            if len(session) >= limit or new <= 0:
+                break
+            session.append(card)
+            new -= 1
+    if not session:
+        print("🎉 Nessuna carta da ripassare adesso.")
+        return 0
+
+    reviewed = 0
+    for i, (qid, rel, q) in enumerate(session, 1):
+        grade = ask(q, f"[{i}/{len(session)}] {rel}")
+        if grade is None:
+            break
+        due, interval, *_ = store.review(user, qid, rel, grade, int(time.time()))
+        when = "fra 10 minuti" if grade == AGAIN else f"fra {interval} giorn{'o' if interval == 1 else 'i'}"
+        print(f"🗓️  {GRADE_NAMES[grade].capitalize()}: prossimo ripasso {when}")
+        reviewed += 1
+    return reviewed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Ripasso dei quiz con ripetizione dilazionata (SM-2).")
+    parser.add_argument("--user", default=getpass.getuser(), help="Nome utente (default: utente di sistema)")
+    parser.add_argument("--quiz", default="", help="Limita il ripasso ai quiz con questo prefisso di path (relativo a quizzes/)")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help=f"Carte per sessione (default: {DEFAULT_LIMIT})")
+    parser.add_argument("--new", type=int, default=DEFAULT_NEW, help=f"Massimo di carte nuove per sessione (default: {DEFAULT_NEW})")
+    parser.add_argument("--due", type=int, default=None, metavar="N", help="Mostra le prossime N carte in scadenza e termina")
+    parser.add_argument("--stats", action="store_true", help="Mostra il riepilogo dell'utente e termina")
+    parser.add_argument("--db", default=str(DEFAULT_DB), help=f"Database dello stato di ripasso (default: {DEFAULT_DB})")
+    args = parser.parse_args(argv)
+
+    store = StudyStore(Path(args.db))
+    user = store.user(args.user)
+    now = int(time.time())
+    try:
+        if args.stats:
+            s = store.stats(user, now)
+            print(f"👤 {args.user}: {s['cards']} carte | da ripassare: {s['due']} | entro domani: {s['due_tomorrow']} "
+                  f"| mature (≥ 21 giorni): {s['mature']} | errori: {s['lapses']}")
+        elif args.due is not None:
+            rows = store.due(user, sys.maxsize, args.due, args.quiz)
+            if not rows:
+                print("Nessuna carta in programma.")
+            for qid, rel, due in rows:
+                when = "adesso" if due <= now else time.strftime("%Y-%m-%d %H:%M", time.localtime(due))
+                print(f"  - {when:<16}  {rel}  {qid}")
+        else:
+            reviewed = study(store, QuestionSource(), user, args.quiz, args.limit, args.new)
+            s = store.stats(user, int(time.time()))
+            print(f"\n📚 Ripassate: {reviewed} | ancora da ripassare: {s['due']} | entro domani: {s['due_tomorrow']}")
+    except (KeyboardInterrupt, EOFError):
+        print("\n👋 Sessione interrotta, progressi salvati.")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,31 +1,37 @@
+import argparse
 import json
 import os
 import sys
 
-def validate_quiz_file(file_path):
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+def validate_quiz_data(data):
+    if not isinstance(data, list):
+        return False, "Il root deve essere un array di oggetti."
 
-        if not isinstance(data, list):
-            return False, "Il root deve essere un array di oggetti."
+    for idx, item in enumerate(data):
+        if not isinstance(item, dict):
+            return False, f"Elemento all'indice {idx} non è un oggetto."
 
-        for idx, item in enumerate(data):
-            # Campi obbligatori
-            if 'question' not in item or 'options' not in item or 'correctIndex' not in item:
-                return False, f"Oggetto all'indice {idx} manca di campi obbligatori (question, options, correctIndex)."
+        # Campi obbligatori
+        if 'question' not in item or 'options' not in item or 'correctIndex' not in item:
+            return False, f"Oggetto all'indice {idx} manca di campi obbligatori (question, options, correctIndex)."
 
-            if not isinstance(item['options'], list) or len(item['options']) == 0:
-                return False, f"Oggetto all'indice {idx} deve avere un array 'options' non vuoto."
+        if not isinstance(item['options'], list) or len(item['options']) == 0:
+            return False, f"Oggetto all'indice {idx} deve avere un array 'options' non vuoto."
 
-            # Controllo tipo e range di correctIndex
-            if not isinstance(item['correctIndex'], int):
-                return False, f"Oggetto all'indice {idx}: 'correctIndex' deve essere un intero."
+        # Controllo tipo e range di correctIndex
+        if not isinstance(item['correctIndex'], int):
+            return False, f"Oggetto all'indice {idx}: 'correctIndex' deve essere un intero."
 
-            if item['correctIndex'] < 0 or item['correctIndex'] >= len(item['options']):
-                return False, f"Oggetto all'indice {idx} ha un 'correctIndex' non valido ({item['correctIndex']})."
+        if item['correctIndex'] < 0 or item['correctIndex'] >= len(item['options']):
+            return False, f"Oggetto all'indice {idx} ha un 'correctIndex' non valido ({item['correctIndex']})."
 
-        return True, None
+    return True, None
+
+def validate_quiz_file(file_path):
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return validate_quiz_data(data)
     except json.JSONDecodeError as e:
         return False, f"Errore di parsing JSON: {e}"
     except Exception as e:
@@ -83,7 +89,12 @@ def validate_directory(base_dir, validator, label):
 
     return files_checked, errors
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Valida la struttura dei file JSON in quizzes/ e open-questions/ (exit code 1 se ci sono errori)."
+    )
+    parser.parse_args(argv)
+
     total_files = 0
     total_errors = 0
 
@@ -104,8 +115,7 @@ def main():
         print("  Nessun file trovato.")
 
     print(f"\nVerifica completata: {total_files} file controllati, {total_errors} errori trovati.")
-    if total_errors > 0:
-        sys.exit(1)
+    return 1 if total_errors > 0 else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
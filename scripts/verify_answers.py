@@ -0,0 +1,323 @@
+"""
+verify_answers.py — Controlla la coerenza dei `correctIndex` facendo rispondere "alla cieca" un modello Ollama.
+
+Uso:
+    python scripts/verify_answers.py --model llama3.2 [--base-url URL ...] [--quiz sapienza/informatica]
+    python scripts/verify_answers.py --model llama3.2 --report-only --report sospette.md
+
+Per ogni domanda il modello riceve testo e opzioni SENZA la risposta corretta e indica
+l'opzione che ritiene giusta con una confidenza 0-1. Il risultato (accordo con `correctIndex`
+e confidenza) viene salvato nell'indice `.cache/answer_checks.sqlite`, insieme al fingerprint
+del contenuto: le esecuzioni successive verificano solo domande nuove o modificate.
+
+Con più `--base-url` il lavoro viene distribuito in parallelo su tutte le istanze Ollama.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from ollama_enrich_quiz import DEFAULT_BASE_URL, chat, parse_response, verify_connection
+from quiz_corpus import CACHE_DIR, content_fingerprint, iter_quiz_questions
+
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_WORKERS = 2
+DEFAULT_RETRIES = 1
+DEFAULT_MIN_CONFIDENCE = 0.7
+DEFAULT_DB = CACHE_DIR / "answer_checks.sqlite"
+
+
+class CheckIndex:
+    """Indice SQLite dei risultati per (ID domanda, modello)."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS checks ("
+            " question_id TEXT NOT NULL, model TEXT NOT NULL, rel TEXT NOT NULL, idx INTEGER NOT NULL,"
+            " fingerprint TEXT NOT NULL, correct_index INTEGER NOT NULL, predicted INTEGER,"
+            " confidence REAL, agree INTEGER, checked_at REAL NOT NULL,"
+            " PRIMARY KEY (question_id, model))"
+        )
+
+    def fingerprints(self, model: str) -> dict[str, str]:
+        rows = self.conn.execute("SELECT question_id, fingerprint FROM checks WHERE model = ?", (model,))
+        return dict(rows.fetchall())
+
+    def save(self, rows: list[tuple], model: str) -> None:
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO checks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(qid, model, rel, idx, fp, correct, pred, conf, agree, now)
+             for qid, rel, idx, fp, correct, pred, conf, agree in rows],
+        )
+        self.conn.commit()
+
+    def results(self, model: str, current: dict[str, str], prefix: str = "") -> list[dict]:
+        """Risultati delle sole domande ancora nel corpus e non modificate dopo la verifica."""
+        cur = self.conn.execute(
+            "SELECT question_id, rel, idx, fingerprint, correct_index, predicted, confidence, agree FROM checks"
+            " WHERE model = ? AND substr(rel, 1, ?) = ? ORDER BY rel, idx",
+            (model, len(prefix), prefix),
+        )
+        cols = [c[0] for c in cur.description]
+        rows = (dict(zip(cols, row)) for row in cur.fetchall())
+        return [r for r in rows if current.get(r["question_id"]) == r.pop("fingerprint")]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def build_blind_prompt(batch: list[dict]) -> str:
+    items = []
+    for i, q in enumerate(batch):
+        opts = "\n".join(f"  {chr(65 + j)}) {o.get('text', '')}" for j, o in enumerate(q["options"]))
+        code_block = f"\nCodice:\n{q['code']}" if q.get("code") else ""
+        items.append(f"[{i}]\nDomanda: {q['question']}{code_block}\nOpzioni:\n{opts}")
+    questions_text = "\n\n".join(items)
+
+    return f"""Sei uno studente universitario molto preparato. Rispondi a ciascuna domanda a scelta multipla.
+
+Per ogni domanda indica:
+- "answer": la lettera dell'opzione corretta (A, B, C, ...);
+- "confidence": quanto sei sicuro, da 0.0 (tiro a caso) a 1.0 (certo).
+
+Rispondi SOLO con un array JSON valido, senza markdown, con un oggetto per domanda nell'ordine ricevuto:
+[
+  {{"index": 0, "answer": "B", "confidence": 0.9}}
+]
+
+DOMANDE:
+
+{questions_text}
+
+Rispondi SOLO con l'array JSON:"""
+
+
+def parse_answer(value, n_options: int) -> int | None:
+    if isinstance(value, int) and not isinstance(value, bool):
+        idx = value
+    elif isinstance(value, str) and value.strip():
+        letter = value.strip().upper()[0]
+        idx = ord(letter) - 65
+    else:
+        return None
+    return idx if 0 <= idx < n_options else None
+
+
+def parse_confidence(value) -> float | None:
+    try:
+        return min(max(float(value), 0.0), 1.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def ask_batch(base_url: str, args: argparse.Namespace, batch: list[dict]) -> list[tuple[int | None, float | None]] | None:
+    prompt = build_blind_prompt([item["q"] for item in batch])
+    for attempt in range(args.retries + 1):
+        try:
+            results = parse_response(chat(base_url, args.api_key, args.model, prompt))
+        except Exception:
+            results = None
+        if results is not None:
+            answers: list[tuple[int | None, float | None]] = [(None, None)] * len(batch)
+            for item in results:
+                idx = item.get("index") if isinstance(item, dict) else None
+                if not isinstance(idx, int) or not (0 <= idx < len(batch)):
+                    continue
+                n_options = len(batch[idx]["q"]["options"])
+                answers[idx] = (parse_answer(item.get("answer"), n_options), parse_confidence(item.get("confidence")))
+            if any(pred is not None for pred, _ in answers):
+                return answers
+        if attempt < args.retries:
+            time.sleep(1)
+    return None
+
+
+def corpus_questions(prefix: str = "") -> list[dict]:
+    """Domande verificabili (con opzioni e correctIndex) dei quiz sotto `prefix`."""
+    found = []
+    for rel, qid, idx, q in iter_quiz_questions():
+        if prefix and not rel.startswith(prefix):
+            continue
+        if not isinstance(q, dict):
+            continue
+        options = q.get("options")
+        if (not isinstance(q.get("question"), str) or not isinstance(options, list) or not options
+                or not all(isinstance(o, dict) for o in options) or not isinstance(q.get("correctIndex"), int)):
+            continue
+        found.append({"qid": qid, "rel": rel, "idx": idx, "fp": content_fingerprint(q), "q": q})
+    return found
+
+
+def collect_pending(index: CheckIndex, args: argparse.Namespace, questions: list[dict]) -> list[dict]:
+    known = index.fingerprints(args.model)
+    pending = [item for item in questions if args.force or known.get(item["qid"]) != item["fp"]]
+    if args.limit is not None:
+        pending = pending[: args.limit]
+    return pending
+
+
+def run_checks(index: CheckIndex, args: argparse.Namespace, pending: list[dict]) -> None:
+    batches: queue.Queue = queue.Queue()
+    for start in range(0, len(pending), args.batch_size):
+        batches.put(pending[start:start + args.batch_size])
+    total_batches = batches.qsize()
+    done: queue.Queue = queue.Queue()
+
+    def worker(base_url: str) -> None:
+        while True:
+            try:
+                batch = batches.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                answers = ask_batch(base_url, args, batch)
+            except Exception:
+                # Il batch va sempre riportato al thread principale, che altrimenti resterebbe in attesa.
+                answers = None
+            done.put((batch, answers))
+
+    threads = [
+        threading.Thread(target=worker, args=(url,), daemon=True)
+        for url in args.base_url
+        for _ in range(args.workers)
+    ]
+    for t in threads:
+        t.start()
+
+    failed = unanswered = 0
+    for n in range(1, total_batches + 1):
+        batch, answers = done.get()
+        if answers is None:
+            failed += 1
+            print(f"⚠️  Batch {n}/{total_batches}: risposta non parsabile dopo {args.retries + 1} tentativi")
+            continue
+        rows = []
+        agreed = 0
+        for item, (pred, conf) in zip(batch, answers):
+            q = item["q"]
+            if pred is None:
+                # Non salvata: senza risposta la domanda va ritentata alla prossima esecuzione.
+                unanswered += 1
+                continue
+            agree = int(pred == q["correctIndex"])
+            agreed += agree
+            rows.append((item["qid"], item["rel"], item["idx"], item["fp"], q["correctIndex"], pred, conf, agree))
+        # Il salvataggio avviene solo nel thread principale: sqlite3 non va condiviso tra thread.
+        index.save(rows, args.model)
+        print(f"✅ Batch {n}/{total_batches}: {agreed}/{len(rows)} in accordo con correctIndex")
+
+    for t in threads:
+        t.join()
+    if failed:
+        print(f"⚠️  Batch falliti: {failed} (verranno ritentati alla prossima esecuzione)")
+    if unanswered:
+        print(f"⚠️  Domande senza risposta valida: {unanswered} (verranno ritentate alla prossima esecuzione)")
+
+
+def summarize(results: list[dict], min_confidence: float) -> dict:
+    per_file: dict[str, dict] = {}
+    suspects = []
+    for r in results:
+        stats = per_file.setdefault(r["rel"], {"checked": 0, "agree": 0, "disagree": 0})
+        stats["checked"] += 1
+        if r["agree"]:
+            stats["agree"] += 1
+        else:
+            stats["disagree"] += 1
+            if (r["confidence"] or 0) >= min_confidence:
+                suspects.append(r)
+    suspects.sort(key=lambda r: (-(r["confidence"] or 0), r["rel"], r["idx"]))
+    return {"files": per_file, "suspects": suspects}
+
+
+def format_confidence(value: float | None) -> str:
+    return "n/d" if value is None else f"{value:.2f}"
+
+
+def write_report(summary: dict, path: Path, model: str) -> None:
+    if path.suffix == ".json":
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"model": model, **summary}, f, indent=2, ensure_ascii=False)
+        return
+    lines = [f"# Verifica correctIndex ({model})", "", "| File | Verificate | Accordo | Disaccordo |",
+             "|---|---|---|---|"]
+    for rel, s in summary["files"].items():
+        rate = s["agree"] / s["checked"] * 100 if s["checked"] else 0
+        lines.append(f"| {rel} | {s['checked']} | {s['agree']} ({rate:.0f}%) | {s['disagree']} |")
+    lines += ["", "## Risposte sospette", "", "| File | Indice | correctIndex | Modello | Confidenza |", "|---|---|---|---|---|"]
+    for r in summary["suspects"]:
+        lines.append(f"| {r['rel']} | {r['idx']} | {chr(65 + r['correct_index'])} | "
+                     f"{chr(65 + r['predicted'])} | {format_confidence(r['confidence'])} |")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Verifica i correctIndex del corpus facendo rispondere alla cieca un modello Ollama.")
+    parser.add_argument("--model", required=True, help="Modello Ollama da usare come verificatore")
+    parser.add_argument("--base-url", action="append", default=None,
+                        help=f"URL di un'istanza Ollama, ripetibile per lavorare in parallelo (default: {DEFAULT_BASE_URL})")
+    parser.add_argument("--api-key", default=None, help="API key opzionale (per istanze Ollama con autenticazione)")
+    parser.add_argument("--quiz", default="", help="Limita la verifica ai quiz con questo prefisso di path (relativo a quizzes/)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Domande per chiamata (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Chiamate concorrenti per ogni istanza (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help=f"Tentativi extra per batch su errore/parse fail (default: {DEFAULT_RETRIES})")
+    parser.add_argument("--limit", type=int, default=None, help="Numero massimo di domande da verificare in questa esecuzione")
+    parser.add_argument("--force", action="store_true", help="Riverifica anche le domande già verificate e non modificate")
+    parser.add_argument("--db", default=str(DEFAULT_DB), help=f"Indice SQLite dei risultati (default: {DEFAULT_DB})")
+    parser.add_argument("--report", default=None, help="Scrive un report (.md o .json) con accordo per file e risposte sospette")
+    parser.add_argument("--min-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE,
+                        help=f"Confidenza minima per segnalare un disaccordo come sospetto (default: {DEFAULT_MIN_CONFIDENCE})")
+    parser.add_argument("--report-only", action="store_true", help="Non chiama il modello, genera solo il report")
+    args = parser.parse_args(argv)
+    args.base_url = args.base_url or [DEFAULT_BASE_URL]
+
+    if args.batch_size <= 0 or args.workers <= 0 or args.retries < 0:
+        print("❌ --batch-size e --workers devono essere > 0, --retries >= 0")
+        return 1
+    if not 0.0 <= args.min_confidence <= 1.0:
+        print("❌ --min-confidence deve essere compreso tra 0 e 1")
+        return 1
+
+    index = CheckIndex(Path(args.db))
+    questions = corpus_questions(args.quiz)
+    if not args.report_only:
+        pending = collect_pending(index, args, questions)
+        print(f"🔎 Domande nel corpus: {len(questions)} | da verificare: {len(pending)}")
+        if pending:
+            for url in args.base_url:
+                verify_connection(url)
+            print(f"🤖 Modello: {args.model} | 🌐 Istanze: {len(args.base_url)} × {args.workers} worker\n")
+            start = time.perf_counter()
+            run_checks(index, args, pending)
+            elapsed = time.perf_counter() - start
+            print(f"⏱️  {len(pending)} domande in {elapsed:.1f}s ({len(pending) / elapsed:.1f} domande/s)")
+
+    current = {item["qid"]: item["fp"] for item in questions}
+    summary = summarize(index.results(args.model, current, args.quiz), args.min_confidence)
+    index.close()
+    checked = sum(s["checked"] for s in summary["files"].values())
+    agree = sum(s["agree"] for s in summary["files"].values())
+    print(f"\n📊 Verificate: {checked} | in accordo: {agree} | sospette: {len(summary['suspects'])}")
+    for r in summary["suspects"][:10]:
+        print(f"  - {r['rel']} #{r['idx']}: correctIndex {chr(65 + r['correct_index'])}, "
+              f"modello {chr(65 + r['predicted'])} ({format_confidence(r['confidence'])})")
+    if args.report:
+        write_report(summary, Path(args.report), args.model)
+        print(f"💾 Report salvato in: {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())